@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+SWAP LOG AGGREGATOR
+===================
+Streams raw Uniswap swap logs (the updater/static/test_logs.csv format):
+  Transaction Hash,Contract Address,Input Token,Output Token,Block Number,Protocol,Pool ID,Sender,Fee
+
+into per-pool daily rows for hermetik_model.py and load_daily_metrics.py:
+  poolAddress,date,tx_count,unique_users,protocol,fee,fee_percentage,
+  tx_count_cumulative,days_since_start,day_number
+
+Logs only carry block numbers; they are dated through block_index.bin
+(block_index.py), which is extended over JSON-RPC when a chunk has blocks it
+does not cover yet. A transaction counts once per pool no matter how many
+times it was logged, and unique_users counts distinct senders (transaction
+hashes when Sender is empty, as in the processors).
+
+Memory stays bounded: each --chunk_rows chunk is dated and spilled to one of
+--partitions temporary files by transaction hash, so every copy of a
+transaction lands in the same file. Each file is deduplicated and counted on
+its own and the counts are summed, which is exact. When the logs have
+senders, the deduplicated (pool, day, sender) rows go through a second
+spill keyed by sender, so distinct users are counted the same way.
+
+  python aggregate_swap_logs.py ../updater/static/test_logs.csv --output pool_swap_dataset.csv
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from block_index import BlockClock, BlockIndex, default_rpc_url
+
+# profiling helpers are shared with the model CLI
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'model'))
+import profiling
+
+LOG_COLUMNS = {
+    'Transaction Hash': 'tx_hash',
+    'Contract Address': 'pool',
+    'Block Number': 'block',
+    'Protocol': 'protocol',
+    'Sender': 'sender',
+    'Fee': 'fee',
+}
+
+# Uniswap V2 pools all charge 0.3%; V3 fee tiers come from the Fee column when present
+V2_FEE = 3000
+
+
+def scan_logs(path, index, clock, spill_dir, partitions, chunk_rows):
+    """Date, normalize and partition the logs chunk by chunk; returns per-pool metadata and row counts."""
+    spill_paths = [spill_dir / f"tx_{i:03d}.csv" for i in range(partitions)]
+    pools = []
+    stats = {'rows': 0, 'undated': 0, 'senders': 0}
+
+    reader = pd.read_csv(path, usecols=lambda c: c in LOG_COLUMNS, dtype=str, chunksize=chunk_rows)
+    for chunk in reader:
+        chunk = chunk.rename(columns=LOG_COLUMNS)
+        for column in set(LOG_COLUMNS.values()) - set(chunk.columns):
+            chunk[column] = None
+        stats['rows'] += len(chunk)
+
+        blocks = pd.to_numeric(chunk['block'], errors='coerce').fillna(-1).astype(np.int64).to_numpy()
+        valid = blocks[blocks >= 0]
+        if clock is not None and len(valid) and not index.covers(valid.min(), valid.max()):
+            added = index.extend(clock, valid.min(), valid.max())
+            print(f"   🧱 Block index extended by {added} anchors: {index.describe()}")
+        days = index.dates(blocks)
+        dated = ~np.isnat(days)
+        stats['undated'] += int((~dated).sum())
+
+        df = pd.DataFrame({
+            'pool': chunk['pool'].str.lower(),
+            'day': days.astype(np.int64),
+            'tx_hash': chunk['tx_hash'].str.lower(),
+            'sender': chunk['sender'].str.lower().fillna(''),
+        })[dated]
+        stats['senders'] += int((df['sender'] != '').sum())
+
+        fee = pd.to_numeric(chunk['fee'], errors='coerce')
+        fee = fee.where(fee.notna() | (chunk['protocol'] != 'Uniswap V2'), V2_FEE)
+        pools.append(
+            pd.DataFrame({'pool': df['pool'], 'protocol': chunk['protocol'][dated], 'fee': fee[dated]})
+            .sort_values('fee', na_position='first')
+            .drop_duplicates('pool', keep='last')
+        )
+
+        spill(df, 'tx_hash', spill_paths)
+
+    pools = pd.concat(pools, ignore_index=True) if pools else pd.DataFrame(columns=['pool', 'protocol', 'fee'])
+    pools = pools.sort_values('fee', na_position='first').drop_duplicates('pool', keep='last')
+    return pools.set_index('pool'), spill_paths, stats
+
+
+def spill(df, key, paths):
+    """Append df's rows to the partition file of their `key` value."""
+    part = pd.util.hash_array(df[key].to_numpy(dtype=object)) % np.uint64(len(paths))
+    for i, rows in df.groupby(part.astype(np.intp)):
+        rows.to_csv(paths[i], mode='a', header=not paths[i].exists(), index=False)
+
+
+def add_counts(totals, counts):
+    return counts if totals is None else totals.add(counts, fill_value=0)
+
+
+def count_partitions(spill_paths, senders):
+    """Per (pool, day) distinct transactions and users, summed over the partitions."""
+    user_paths = [path.with_name(path.name.replace('tx_', 'user_')) for path in spill_paths]
+    tx_counts, user_counts = None, None
+    duplicates = 0
+    for path in spill_paths:
+        if not path.exists():
+            continue
+        df = pd.read_csv(path, dtype={'pool': str, 'day': np.int64, 'tx_hash': str, 'sender': str}, keep_default_na=False)
+        # keep a copy that has the sender when some copies lack it
+        deduped = df.sort_values('sender', ascending=False, kind='stable').drop_duplicates(['pool', 'tx_hash'])
+        duplicates += len(df) - len(deduped)
+        deduped = deduped.assign(user=deduped['sender'].where(deduped['sender'] != '', deduped['tx_hash']))
+        groups = deduped.groupby(['pool', 'day'])
+        tx_counts = add_counts(tx_counts, groups.size().rename('tx_count'))
+        if senders:
+            spill(deduped[['pool', 'day', 'user']].drop_duplicates(), 'user', user_paths)
+        else:
+            # users are transaction hashes, already partitioned
+            user_counts = add_counts(user_counts, groups['user'].nunique().rename('unique_users'))
+
+    for path in user_paths if senders else []:
+        if path.exists():
+            df = pd.read_csv(path, dtype={'pool': str, 'day': np.int64, 'user': str}).drop_duplicates()
+            user_counts = add_counts(user_counts, df.groupby(['pool', 'day']).size().rename('unique_users'))
+
+    if tx_counts is None:
+        return pd.DataFrame(columns=['pool', 'day', 'tx_count', 'unique_users']), 0
+    counts = pd.concat([tx_counts, user_counts], axis=1).fillna(0).astype(np.int64)
+    return counts.reset_index(), duplicates
+
+
+def daily_rows(counts, pools):
+    """Dataset rows: every day from each pool's first to last active day, with the cumulative columns."""
+    frames = []
+    for pool, group in counts.groupby('pool', sort=True):
+        days = np.arange(group['day'].min(), group['day'].max() + 1)
+        df = pd.DataFrame({'day': days}).merge(group[['day', 'tx_count', 'unique_users']], on='day', how='left')
+        df.insert(0, 'poolAddress', pool)
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame()
+    df = pd.concat(frames, ignore_index=True)
+    df[['tx_count', 'unique_users']] = df[['tx_count', 'unique_users']].fillna(0).astype(np.int64)
+    df['date'] = df.pop('day').astype('datetime64[D]').astype(str)
+
+    df['protocol'] = df['poolAddress'].map(pools['protocol'])
+    df['fee'] = df['poolAddress'].map(pools['fee'])
+    df['fee_percentage'] = df['fee'] / 1000000
+    groups = df.groupby('poolAddress', sort=False)
+    df['tx_count_cumulative'] = groups['tx_count'].cumsum()
+    df['days_since_start'] = groups.cumcount()
+    df['day_number'] = df['days_since_start'] + 1
+    return df[['poolAddress', 'date', 'tx_count', 'unique_users', 'protocol', 'fee', 'fee_percentage',
+               'tx_count_cumulative', 'days_since_start', 'day_number']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("logs", nargs="+", help="raw swap log CSVs")
+    parser.add_argument("--output", default="pool_swap_dataset.csv", help="per-pool daily dataset to write")
+    parser.add_argument("--block_index", default=None,
+                        help="block -> timestamp index (default: block_index.bin next to the first log)")
+    parser.add_argument("--rpc_url", default=default_rpc_url(),
+                        help="JSON-RPC endpoint for extending the block index (default: $ETH_RPC_URL or Alchemy "
+                             "with $ALCHEMY_API_KEY); without one, blocks outside the index are skipped")
+    parser.add_argument("--chunk_rows", type=int, default=500_000, help="log rows read per chunk")
+    parser.add_argument("--partitions", type=int, default=16, help="spill files; more means less memory per file")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.configure(args)
+
+    print("=" * 80)
+    print("SWAP LOG AGGREGATOR")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    index = BlockIndex.open(args.block_index or Path(args.logs[0]).parent / 'block_index.bin')
+    clock = BlockClock(args.rpc_url) if args.rpc_url else None
+    print(f"🧱 Block index: {index.describe()}")
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="swap_logs_") as spill_dir:
+            pools, stats = [], {'rows': 0, 'undated': 0, 'senders': 0}
+            with profiling.stage("scan"):
+                for path in args.logs:
+                    print(f"📂 Scanning {path}...")
+                    file_pools, spill_paths, file_stats = scan_logs(
+                        path, index, clock, Path(spill_dir), args.partitions, args.chunk_rows)
+                    pools.append(file_pools)
+                    stats = {k: stats[k] + file_stats[k] for k in stats}
+            pools = pd.concat(pools).sort_values('fee', na_position='first')
+            pools = pools[~pools.index.duplicated(keep='last')]
+
+            print(f"   ✅ {stats['rows']:,} log rows, {len(pools):,} pools")
+            if stats['undated']:
+                print(f"   ⚠️  {stats['undated']:,} rows outside the block index were skipped (set --rpc_url)")
+
+            with profiling.stage("count") as s:
+                counts, duplicates = count_partitions(spill_paths, stats['senders'] > 0)
+                s.frame(counts)
+            print(f"   🧹 {duplicates:,} duplicate (pool, transaction) rows dropped")
+
+        with profiling.stage("daily_rows") as s:
+            df = daily_rows(counts, pools)
+            s.frame(df)
+        with profiling.stage("save"):
+            df.to_csv(args.output, index=False)
+
+        if clock is not None:
+            print(f"   🌐 {clock.calls} RPC calls")
+        print(f"\n💾 Saved {args.output}: {len(df):,} pool-days, "
+              f"{df['poolAddress'].nunique() if len(df) else 0} pools")
+        print(f"✅ Aggregated in {time.perf_counter() - start:.1f}s")
+    finally:
+        profiling.report()
+
+if __name__ == "__main__":
+    main()
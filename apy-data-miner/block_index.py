@@ -0,0 +1,149 @@
+"""
+BLOCK INDEX
+===========
+Compact block number -> timestamp index for dating raw swap logs, which only
+carry block numbers.
+
+block_index.bin is a sorted array of little-endian int64 (block, timestamp)
+anchors: the first block of every UTC day in the covered range, plus the
+first and last covered blocks. Every block between two anchors shares the
+date of the lower one, so dating a column of blocks is one searchsorted:
+
+    index = BlockIndex.open("block_index.bin")
+    index.extend(BlockClock(rpc_url), 23_600_000, 23_700_000)   # fetches missing day boundaries
+    days = index.dates(df["Block Number"])                      # datetime64[D], NaT when not covered
+
+The covered range is always contiguous: extending fills the gap to the
+existing range, so a year of blocks is about 365 anchors (~6 KB).
+"""
+
+import json
+import os
+import urllib.request
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+DAY_SECONDS = 86_400
+RECORD = np.dtype([("block", "<i8"), ("timestamp", "<i8")])
+
+
+def default_rpc_url():
+    """Mainnet RPC from ETH_RPC_URL, or Alchemy with the updater's ALCHEMY_API_KEY."""
+    if os.environ.get("ETH_RPC_URL"):
+        return os.environ["ETH_RPC_URL"]
+    if os.environ.get("ALCHEMY_API_KEY"):
+        return f"https://eth-mainnet.g.alchemy.com/v2/{os.environ['ALCHEMY_API_KEY']}"
+    return None
+
+
+class BlockClock:
+    """Block timestamps over JSON-RPC (eth_getBlockByNumber), memoized."""
+
+    def __init__(self, rpc_url, timeout=30):
+        self.rpc_url = rpc_url
+        self.timeout = timeout
+        self.calls = 0
+        self._cache = {}
+
+    def timestamp(self, block):
+        block = int(block)
+        if block not in self._cache:
+            payload = json.dumps({
+                "jsonrpc": "2.0", "id": 1, "method": "eth_getBlockByNumber", "params": [hex(block), False],
+            }).encode()
+            request = urllib.request.Request(self.rpc_url, data=payload, headers={"Content-Type": "application/json"})
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                result = json.load(response).get("result")
+            self.calls += 1
+            if result is None:
+                raise ValueError(f"block {block} not found")
+            self._cache[block] = int(result["timestamp"], 16)
+        return self._cache[block]
+
+    def first_block_at(self, timestamp, lo, hi):
+        """First block in [lo, hi] with a timestamp >= `timestamp`; hi itself must qualify."""
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp(mid) < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+class BlockIndex:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.anchors = np.empty(0, dtype=RECORD)
+
+    @classmethod
+    def open(cls, path):
+        index = cls(path)
+        if index.path.exists():
+            index.anchors = np.fromfile(index.path, dtype=RECORD)
+        return index
+
+    @property
+    def first_block(self):
+        return int(self.anchors["block"][0]) if len(self.anchors) else None
+
+    @property
+    def last_block(self):
+        return int(self.anchors["block"][-1]) if len(self.anchors) else None
+
+    def covers(self, lo, hi) -> bool:
+        return len(self.anchors) > 0 and self.first_block <= lo and hi <= self.last_block
+
+    def dates(self, blocks) -> np.ndarray:
+        """UTC date of each block as datetime64[D]; NaT outside the covered range."""
+        blocks = np.asarray(blocks, dtype=np.int64)
+        result = np.full(len(blocks), np.datetime64("NaT"), dtype="datetime64[D]")
+        if len(self.anchors) == 0:
+            return result
+        position = np.searchsorted(self.anchors["block"], blocks, side="right") - 1
+        covered = (position >= 0) & (blocks <= self.last_block)
+        days = self.anchors["timestamp"][position[covered]] // DAY_SECONDS
+        result[covered] = days.astype("datetime64[D]")
+        return result
+
+    def extend(self, clock, lo, hi) -> int:
+        """Cover blocks lo..hi (and any gap to the current range); returns the anchors added."""
+        if len(self.anchors):
+            if self.covers(lo, hi):
+                return 0
+            lo, hi = min(lo, self.first_block), max(hi, self.last_block)
+        lo, hi = int(lo), int(hi)
+
+        existing = dict(zip(self.anchors["block"].tolist(), self.anchors["timestamp"].tolist()))
+        anchors = {**existing, lo: clock.timestamp(lo), hi: clock.timestamp(hi)}
+        covered = (min(existing.values()), max(existing.values())) if existing else None
+        day = anchors[lo] // DAY_SECONDS + 1
+        while day * DAY_SECONDS <= anchors[hi]:
+            start = day * DAY_SECONDS
+            day += 1
+            if covered and covered[0] < start <= covered[1]:
+                continue  # already an anchor
+            # search between the known anchors around the day start
+            below = max(b for b, t in anchors.items() if t < start)
+            above = min(b for b, t in anchors.items() if t >= start)
+            block = clock.first_block_at(start, below, above)
+            anchors.setdefault(block, clock.timestamp(block))
+
+        added = len(anchors) - len(self.anchors)
+        self.anchors = np.array(sorted(anchors.items()), dtype=RECORD)
+        self.save()
+        return added
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self.anchors.tofile(tmp_path)
+        os.replace(tmp_path, self.path)
+
+    def describe(self) -> str:
+        if len(self.anchors) == 0:
+            return "empty"
+        first, last = (datetime.fromtimestamp(int(t), timezone.utc).date() for t in self.anchors["timestamp"][[0, -1]])
+        return f"blocks {self.first_block:,}-{self.last_block:,} ({first} to {last}, {len(self.anchors)} anchors)"
@@ -6,10 +6,16 @@ Creates stablecoin-specialized datasets from March-June 2025 data,
 optimized for stablecoin APY prediction modeling.
 """
 
+import argparse
+import sys
 import pandas as pd
 import numpy as np
 from pathlib import Path
 
+# profiling helpers are shared with the model CLI
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'model'))
+import profiling
+
 def load_data():
     """Load the March-June dataset"""
     print("📂 Loading March-June 2025 dataset...")
@@ -163,30 +169,45 @@ def save_stablecoin_datasets(train_df, test_df, full_df):
 
 def main():
     """Main execution function for March-June dataset"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    profiling.add_arguments(parser)
+    profiling.configure(parser.parse_args())
+
     print("=" * 80)
     print("MARCH-JUNE 2025 STABLECOIN DATASET CREATION")
     print("=" * 80)
     
     try:
         # Load data
-        df = load_data()
+        with profiling.stage("load") as s:
+            df = load_data()
+            s.frame(df)
         
         # Filter for stablecoin pools only
-        stablecoin_df = filter_stablecoin_pools(df)
+        with profiling.stage("filter") as s:
+            stablecoin_df = filter_stablecoin_pools(df)
+            s.frame(stablecoin_df)
         if stablecoin_df is None:
             return
         
         # Analyze stablecoin pairs
-        stablecoin_df = analyze_stablecoin_pairs(stablecoin_df)
+        with profiling.stage("pairs") as s:
+            stablecoin_df = analyze_stablecoin_pairs(stablecoin_df)
+            s.frame(stablecoin_df)
         
         # Verify specialized features
-        stablecoin_df = create_stablecoin_features(stablecoin_df)
+        with profiling.stage("features") as s:
+            stablecoin_df = create_stablecoin_features(stablecoin_df)
+            s.frame(stablecoin_df)
         
         # Split into train/test
-        train_df, test_df = split_stablecoin_data(stablecoin_df)
+        with profiling.stage("split") as s:
+            train_df, test_df = split_stablecoin_data(stablecoin_df)
+            s.frame(train_df)
         
         # Save datasets
-        save_stablecoin_datasets(train_df, test_df, stablecoin_df)
+        with profiling.stage("save"):
+            save_stablecoin_datasets(train_df, test_df, stablecoin_df)
         
         print("\n" + "=" * 80)
         print("✅ MARCH-JUNE 2025 STABLECOIN DATASET CREATION COMPLETE!")
@@ -205,6 +226,8 @@ def main():
     except Exception as e:
         print(f"\n❌ Error: {e}")
         raise
+    finally:
+        profiling.report()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
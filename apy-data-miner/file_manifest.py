@@ -0,0 +1,139 @@
+"""
+RAW FILE MANIFEST
+=================
+Persistent catalog of the raw stablecoin_txs_*.csv files, so coverage
+questions (which days have data, where the gaps are, how many rows a range
+holds) are answered without opening the CSVs.
+
+    manifest = FileManifest("updater/static/stablecoin_txs_manifest.json")
+    changed = manifest.update(glob.glob("updater/static/stablecoin_txs_2025-*.csv"))
+    manifest.coverage("2025-01-01", "2025-03-01")     # rows per day, 0 where missing
+    manifest.gaps("2025-01-01", "2025-03-01")         # [(first, last), ...] missing runs
+
+Each entry records the file's (mtime_ns, size) stamp, sha256 checksum, row
+count, distinct pools and rows per date. update() only reads files whose stamp
+moved, and a file rewritten with the same bytes (a re-run fetcher) keeps its
+checksum and is not reported as changed, so callers can skip it. Files that
+cannot be read (empty, or cut off by a fetcher that died mid-write) are left
+out of the manifest and listed in errors.
+"""
+
+import hashlib
+import io
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+DEFAULT_MANIFEST = Path(__file__).parent / 'updater' / 'static' / 'stablecoin_txs_manifest.json'
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def describe_file(path) -> dict:
+    """Manifest entry of one raw transaction CSV (one read: checksum and parse share the bytes)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    df = pd.read_csv(io.BytesIO(data), usecols=['poolAddress', 'date'], dtype=str)
+    days = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d').value_counts().sort_index()
+    return {
+        "stamp": file_stamp(path),
+        "size": len(data),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "rows": len(df),
+        "pools": int(df['poolAddress'].str.lower().nunique()),
+        "days": {day: int(rows) for day, rows in days.items()},
+    }
+
+
+class FileManifest:
+    def __init__(self, path=DEFAULT_MANIFEST):
+        self.path = Path(path)
+        self.errors = {}  # file -> why the last update() could not read it
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+
+    def _key(self, path):
+        """Files next to the manifest are keyed by name, others by absolute path."""
+        path = Path(path).resolve()
+        return path.name if path.parent == self.path.parent.resolve() else str(path)
+
+    def entry(self, path):
+        return self.entries.get(self._key(path))
+
+    def update(self, files) -> list:
+        """Refresh entries of `files` and drop entries of files that no longer exist.
+
+        Returns the files whose contents are new or changed since the last update.
+        Unreadable files are dropped from the manifest and reported in errors.
+        """
+        changed = []
+        self.errors = {}
+        for path in files:
+            key = self._key(path)
+            old = self.entries.get(key)
+            if old is not None and old["stamp"] == file_stamp(path):
+                continue
+            try:
+                entry = describe_file(path)
+            except Exception as e:
+                self.errors[path] = e
+                self.entries.pop(key, None)
+                continue
+            self.entries[key] = entry
+            if old is None or old["sha256"] != entry["sha256"]:
+                changed.append(path)
+
+        for key in list(self.entries):
+            path = Path(key) if os.path.isabs(key) else self.path.parent / key
+            if not path.exists():
+                del self.entries[key]
+        self.save()
+        return changed
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def checksums(self, files) -> dict:
+        """{file: sha256} of files already in the manifest."""
+        return {path: self.entry(path)["sha256"] for path in files if self.entry(path) is not None}
+
+    def date_range(self):
+        """(first, last) day with rows over all files, or (None, None)."""
+        days = [day for entry in self.entries.values() for day in entry["days"]]
+        return (min(days), max(days)) if days else (None, None)
+
+    def coverage(self, start=None, end=None) -> pd.Series:
+        """Rows per calendar day from start to end (inclusive ISO dates, default: the covered range)."""
+        first, last = self.date_range()
+        start, end = start or first, end or last
+        if start is None:
+            return pd.Series(dtype='int64', name='rows')
+        rows = pd.Series(0, index=pd.date_range(start, end).strftime('%Y-%m-%d'), name='rows')
+        for entry in self.entries.values():
+            for day, count in entry["days"].items():
+                if day in rows.index:
+                    rows[day] += count
+        return rows
+
+    def gaps(self, start=None, end=None) -> list:
+        """Runs of days without rows between start and end, as [(first, last), ...]."""
+        missing = self.coverage(start, end) == 0
+        runs = (missing != missing.shift()).cumsum()[missing]
+        return [(days.index[0], days.index[-1]) for _, days in runs.groupby(runs)]
+
+    def files_for(self, start, end) -> list:
+        """Files (manifest keys) holding rows between start and end."""
+        return sorted(key for key, entry in self.entries.items()
+                      if any(start <= day <= end for day in entry["days"]))
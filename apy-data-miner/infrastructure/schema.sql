@@ -37,10 +37,12 @@ CREATE TABLE IF NOT EXISTS daily_metrics (
     unique_users    INTEGER NOT NULL DEFAULT 0,
     volume_token0   NUMERIC(78, 0),  -- Raw token amounts (can be huge)
     volume_token1   NUMERIC(78, 0),
+    user_sketch     BYTEA,           -- HyperLogLog of the day's users (model/user_sketch.py), mergeable across days
     created_at      TIMESTAMP DEFAULT NOW(),
     updated_at      TIMESTAMP DEFAULT NOW(),
     UNIQUE(pool_address, date)
 );
+ALTER TABLE daily_metrics ADD COLUMN IF NOT EXISTS user_sketch BYTEA;
 
 -- Optional: Raw transactions table (if you need granular data)
 -- Warning: This table will grow very large (~240K rows/day)
@@ -58,6 +60,29 @@ CREATE TABLE IF NOT EXISTS transactions (
     UNIQUE(tx_hash, pool_address)
 );
 
+-- Pool features: rolling statistics per pool-day, materialized from daily_metrics
+-- and kept up to date incrementally by update_pool_features.py
+CREATE TABLE IF NOT EXISTS pool_features (
+    pool_address        VARCHAR(42) NOT NULL,
+    date                DATE NOT NULL,
+    tx_count            INTEGER NOT NULL,
+    unique_users        INTEGER NOT NULL,
+    tx_count_7d_avg     DOUBLE PRECISION NOT NULL,
+    tx_count_3d_avg     DOUBLE PRECISION NOT NULL,
+    tx_count_7d_std     DOUBLE PRECISION NOT NULL,
+    tx_count_cumulative BIGINT NOT NULL,
+    days_since_start    INTEGER NOT NULL,
+    tx_growth_rate      DOUBLE PRECISION NOT NULL,
+    updated_at          TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (pool_address, date)
+);
+
+-- Feature updater state (last daily_metrics.updated_at processed)
+CREATE TABLE IF NOT EXISTS feature_state (
+    key     VARCHAR(64) PRIMARY KEY,
+    value   TEXT
+);
+
 -- Collection runs: Track each daily collection job
 CREATE TABLE IF NOT EXISTS collection_runs (
     id              SERIAL PRIMARY KEY,
@@ -82,6 +107,9 @@ CREATE INDEX IF NOT EXISTS idx_daily_metrics_date ON daily_metrics(date);
 CREATE INDEX IF NOT EXISTS idx_daily_metrics_pool ON daily_metrics(pool_address);
 CREATE INDEX IF NOT EXISTS idx_daily_metrics_pool_date ON daily_metrics(pool_address, date);
 
+-- Pool feature indexes (the primary key covers pool + date range reads)
+CREATE INDEX IF NOT EXISTS idx_pool_features_date ON pool_features(date);
+
 -- Pool indexes
 CREATE INDEX IF NOT EXISTS idx_pools_type ON pools(pool_type);
 CREATE INDEX IF NOT EXISTS idx_pools_fee ON pools(fee_tier);
@@ -96,51 +124,29 @@ CREATE INDEX IF NOT EXISTS idx_transactions_block ON transactions(block_number);
 -----------------------------------------------------------
 
 -- View: Latest metrics with rolling statistics
--- This is what the ML team queries for training data
+-- This is what the ML team queries for training data. The statistics are read
+-- from pool_features (run update_pool_features.py after loading daily_metrics),
+-- so a query is an indexed range read instead of window functions over the
+-- whole daily_metrics table.
 CREATE OR REPLACE VIEW v_pool_features AS
-WITH rolling_stats AS (
-    SELECT
-        dm.pool_address,
-        dm.date,
-        dm.tx_count,
-        dm.unique_users,
-        -- Rolling averages
-        AVG(dm.tx_count) OVER w7 as tx_count_7d_avg,
-        AVG(dm.tx_count) OVER w3 as tx_count_3d_avg,
-        -- Volatility
-        STDDEV(dm.tx_count) OVER w7 as tx_count_7d_std,
-        -- Cumulative
-        SUM(dm.tx_count) OVER (PARTITION BY dm.pool_address ORDER BY dm.date) as tx_count_cumulative,
-        -- Growth rate
-        LAG(dm.tx_count, 1) OVER (PARTITION BY dm.pool_address ORDER BY dm.date) as prev_tx_count,
-        -- Days since first activity
-        ROW_NUMBER() OVER (PARTITION BY dm.pool_address ORDER BY dm.date) as days_since_start
-    FROM daily_metrics dm
-    WINDOW
-        w7 AS (PARTITION BY dm.pool_address ORDER BY dm.date ROWS BETWEEN 6 PRECEDING AND CURRENT ROW),
-        w3 AS (PARTITION BY dm.pool_address ORDER BY dm.date ROWS BETWEEN 2 PRECEDING AND CURRENT ROW)
-)
 SELECT
-    rs.pool_address,
-    rs.date,
-    rs.tx_count,
-    rs.unique_users,
-    rs.tx_count_7d_avg,
-    rs.tx_count_3d_avg,
-    COALESCE(rs.tx_count_7d_std, 0) as tx_count_7d_std,
-    rs.tx_count_cumulative,
-    rs.days_since_start,
-    CASE
-        WHEN rs.prev_tx_count > 0 THEN (rs.tx_count - rs.prev_tx_count)::float / rs.prev_tx_count
-        ELSE 0
-    END as tx_growth_rate,
+    pf.pool_address,
+    pf.date,
+    pf.tx_count,
+    pf.unique_users,
+    pf.tx_count_7d_avg,
+    pf.tx_count_3d_avg,
+    pf.tx_count_7d_std,
+    pf.tx_count_cumulative,
+    pf.days_since_start,
+    pf.tx_growth_rate,
     p.token0_symbol,
     p.token1_symbol,
     p.fee_tier,
     p.pool_type,
     p.fee_tier::float / 10000 as fee_percentage
-FROM rolling_stats rs
-JOIN pools p ON rs.pool_address = p.pool_address;
+FROM pool_features pf
+JOIN pools p ON pf.pool_address = p.pool_address;
 
 -- View: Training-ready dataset (last 30 days with targets)
 CREATE OR REPLACE VIEW v_training_data AS
@@ -192,18 +198,19 @@ RETURNS TABLE (
 ) AS $$
 BEGIN
     RETURN QUERY
+    -- pool_features stores DOUBLE PRECISION / INTEGER; cast to the declared result types
     SELECT
-        f.pool_address,
-        f.tx_count,
-        f.unique_users,
-        f.tx_count_7d_avg,
-        f.tx_count_3d_avg,
-        f.tx_count_7d_std,
-        f.tx_count_cumulative,
-        f.days_since_start,
+        f.pool_address::VARCHAR(42),
+        f.tx_count::INTEGER,
+        f.unique_users::INTEGER,
+        f.tx_count_7d_avg::NUMERIC,
+        f.tx_count_3d_avg::NUMERIC,
+        f.tx_count_7d_std::NUMERIC,
+        f.tx_count_cumulative::BIGINT,
+        f.days_since_start::BIGINT,
         f.tx_growth_rate::NUMERIC,
-        f.fee_tier,
-        f.pool_type
+        f.fee_tier::INTEGER,
+        f.pool_type::VARCHAR(20)
     FROM v_pool_features f
     WHERE f.pool_address = LOWER(p_pool_address)
     ORDER BY f.date DESC
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+DAILY METRICS BULK LOADER
+=========================
+Loads the per-pool daily output of the stablecoin processors
+(pool_full_dataset.csv, pool_march_june_dataset.csv) into the `pools` and
+`daily_metrics` tables of infrastructure/schema.sql.
+
+Each batch is copied into a staging table and merged with one
+INSERT ... SELECT ... ON CONFLICT statement, instead of one upsert per row:
+
+  Postgres: COPY into a temporary staging table, batches run in parallel
+            on pooled connections (--workers)
+  SQLite:   the same merge against a local file, for testing without a
+            server (--dsn sqlite:///apyminer.db)
+
+Rows whose values did not change are skipped by the merge, so re-running a
+backfill over the same months only writes what is new.
+"""
+
+import argparse
+import io
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import psycopg2
+    import psycopg2.pool
+except ImportError:  # only needed for Postgres targets
+    psycopg2 = None
+
+# profiling and user sketch helpers are shared with the model CLI
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'model'))
+import profiling
+import user_sketch
+
+POOL_TYPES = {'eth_paired', 'stablecoin', 'other'}
+
+POOL_COLUMNS = ['pool_address', 'token0', 'token1', 'token0_symbol', 'token1_symbol', 'fee_tier', 'pool_type']
+METRIC_COLUMNS = ['pool_address', 'date', 'tx_count', 'unique_users', 'user_sketch']
+
+#----------------------------------------------------------------------
+# Postgres: staging tables are per connection and emptied on commit
+#----------------------------------------------------------------------
+PG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pools (
+    pool_address    VARCHAR(42) PRIMARY KEY,
+    token0          VARCHAR(42) NOT NULL,
+    token1          VARCHAR(42) NOT NULL,
+    token0_symbol   VARCHAR(20),
+    token1_symbol   VARCHAR(20),
+    fee_tier        INTEGER NOT NULL,
+    pool_type       VARCHAR(20) NOT NULL CHECK (pool_type IN ('eth_paired', 'stablecoin', 'other')),
+    created_at      TIMESTAMP DEFAULT NOW(),
+    updated_at      TIMESTAMP DEFAULT NOW()
+);
+CREATE TABLE IF NOT EXISTS daily_metrics (
+    id              SERIAL PRIMARY KEY,
+    pool_address    VARCHAR(42) NOT NULL REFERENCES pools(pool_address),
+    date            DATE NOT NULL,
+    tx_count        INTEGER NOT NULL DEFAULT 0,
+    unique_users    INTEGER NOT NULL DEFAULT 0,
+    volume_token0   NUMERIC(78, 0),
+    volume_token1   NUMERIC(78, 0),
+    user_sketch     BYTEA,
+    created_at      TIMESTAMP DEFAULT NOW(),
+    updated_at      TIMESTAMP DEFAULT NOW(),
+    UNIQUE(pool_address, date)
+);
+ALTER TABLE daily_metrics ADD COLUMN IF NOT EXISTS user_sketch BYTEA;
+CREATE INDEX IF NOT EXISTS idx_daily_metrics_date ON daily_metrics(date);
+CREATE INDEX IF NOT EXISTS idx_daily_metrics_pool ON daily_metrics(pool_address);
+"""
+
+PG_STAGING = """
+CREATE TEMP TABLE IF NOT EXISTS staging_pools (
+    pool_address VARCHAR(42), token0 VARCHAR(42), token1 VARCHAR(42),
+    token0_symbol VARCHAR(20), token1_symbol VARCHAR(20), fee_tier INTEGER, pool_type VARCHAR(20)
+) ON COMMIT DELETE ROWS;
+CREATE TEMP TABLE IF NOT EXISTS staging_daily_metrics (
+    pool_address VARCHAR(42), date DATE, tx_count INTEGER, unique_users INTEGER, user_sketch TEXT
+) ON COMMIT DELETE ROWS;
+"""
+
+PG_MERGE_POOLS = """
+INSERT INTO pools (pool_address, token0, token1, token0_symbol, token1_symbol, fee_tier, pool_type)
+SELECT pool_address, token0, token1, token0_symbol, token1_symbol, fee_tier, pool_type FROM staging_pools
+ON CONFLICT (pool_address) DO UPDATE SET
+    token0_symbol = EXCLUDED.token0_symbol,
+    token1_symbol = EXCLUDED.token1_symbol,
+    updated_at = NOW()
+WHERE (pools.token0_symbol, pools.token1_symbol) IS DISTINCT FROM (EXCLUDED.token0_symbol, EXCLUDED.token1_symbol)
+"""
+
+PG_MERGE_METRICS = """
+INSERT INTO daily_metrics (pool_address, date, tx_count, unique_users, user_sketch)
+SELECT pool_address, date, tx_count, unique_users, decode(user_sketch, 'base64') FROM staging_daily_metrics
+ON CONFLICT (pool_address, date) DO UPDATE SET
+    tx_count = EXCLUDED.tx_count,
+    unique_users = EXCLUDED.unique_users,
+    user_sketch = EXCLUDED.user_sketch,
+    updated_at = NOW()
+WHERE (daily_metrics.tx_count, daily_metrics.unique_users, daily_metrics.user_sketch)
+    IS DISTINCT FROM (EXCLUDED.tx_count, EXCLUDED.unique_users, EXCLUDED.user_sketch)
+"""
+
+#----------------------------------------------------------------------
+# SQLite stand-in: same tables and merge, SQLite dialect
+#----------------------------------------------------------------------
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pools (
+    pool_address    TEXT PRIMARY KEY,
+    token0          TEXT NOT NULL,
+    token1          TEXT NOT NULL,
+    token0_symbol   TEXT,
+    token1_symbol   TEXT,
+    fee_tier        INTEGER NOT NULL,
+    pool_type       TEXT NOT NULL CHECK (pool_type IN ('eth_paired', 'stablecoin', 'other')),
+    created_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS daily_metrics (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    pool_address    TEXT NOT NULL REFERENCES pools(pool_address),
+    date            DATE NOT NULL,
+    tx_count        INTEGER NOT NULL DEFAULT 0,
+    unique_users    INTEGER NOT NULL DEFAULT 0,
+    volume_token0   NUMERIC,
+    volume_token1   NUMERIC,
+    user_sketch     BLOB,
+    created_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(pool_address, date)
+);
+CREATE INDEX IF NOT EXISTS idx_daily_metrics_date ON daily_metrics(date);
+CREATE INDEX IF NOT EXISTS idx_daily_metrics_pool ON daily_metrics(pool_address);
+"""
+
+SQLITE_STAGING = """
+CREATE TEMP TABLE IF NOT EXISTS staging_pools (
+    pool_address TEXT, token0 TEXT, token1 TEXT, token0_symbol TEXT, token1_symbol TEXT, fee_tier INTEGER, pool_type TEXT
+);
+CREATE TEMP TABLE IF NOT EXISTS staging_daily_metrics (
+    pool_address TEXT, date DATE, tx_count INTEGER, unique_users INTEGER, user_sketch BLOB
+);
+"""
+
+# "WHERE true" keeps SQLite from reading ON CONFLICT as part of the SELECT
+SQLITE_MERGE_POOLS = """
+INSERT INTO pools (pool_address, token0, token1, token0_symbol, token1_symbol, fee_tier, pool_type)
+SELECT pool_address, token0, token1, token0_symbol, token1_symbol, fee_tier, pool_type FROM staging_pools WHERE true
+ON CONFLICT (pool_address) DO UPDATE SET
+    token0_symbol = excluded.token0_symbol,
+    token1_symbol = excluded.token1_symbol,
+    updated_at = CURRENT_TIMESTAMP
+WHERE pools.token0_symbol IS NOT excluded.token0_symbol OR pools.token1_symbol IS NOT excluded.token1_symbol
+"""
+
+SQLITE_MERGE_METRICS = """
+INSERT INTO daily_metrics (pool_address, date, tx_count, unique_users, user_sketch)
+SELECT pool_address, date, tx_count, unique_users, user_sketch FROM staging_daily_metrics WHERE true
+ON CONFLICT (pool_address, date) DO UPDATE SET
+    tx_count = excluded.tx_count,
+    unique_users = excluded.unique_users,
+    user_sketch = excluded.user_sketch,
+    updated_at = CURRENT_TIMESTAMP
+WHERE daily_metrics.tx_count IS NOT excluded.tx_count OR daily_metrics.unique_users IS NOT excluded.unique_users
+    OR daily_metrics.user_sketch IS NOT excluded.user_sketch
+"""
+
+
+class PostgresTarget:
+    """Pooled Postgres connections; each batch is COPYed into staging and merged in one transaction."""
+
+    def __init__(self, dsn, workers):
+        if psycopg2 is None:
+            raise RuntimeError("Postgres targets need psycopg2 (pip install psycopg2-binary)")
+        self.workers = workers
+        self.pool = psycopg2.pool.ThreadedConnectionPool(1, workers, dsn)
+
+    def init_schema(self):
+        self._run(lambda cur: cur.execute(PG_SCHEMA))
+
+    def _run(self, work):
+        conn = self.pool.getconn()
+        try:
+            with conn:  # commits, or rolls back on error
+                with conn.cursor() as cur:
+                    cur.execute(PG_STAGING)
+                    return work(cur)
+        finally:
+            self.pool.putconn(conn)
+
+    def _merge(self, table, columns, df, merge_sql):
+        buffer = io.StringIO()
+        df[columns].to_csv(buffer, header=False, index=False)
+        buffer.seek(0)
+
+        def work(cur):
+            cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cur.execute(merge_sql)
+            return cur.rowcount
+
+        return self._run(work)
+
+    def merge_pools(self, df):
+        return self._merge('staging_pools', POOL_COLUMNS, df, PG_MERGE_POOLS)
+
+    def merge_metrics(self, df):
+        return self._merge('staging_daily_metrics', METRIC_COLUMNS, df, PG_MERGE_METRICS)
+
+    def close(self):
+        self.pool.closeall()
+
+
+class SQLiteTarget:
+    """Embedded stand-in with the same tables and merge; batches run one at a time."""
+
+    def __init__(self, path):
+        self.workers = 1
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+
+    def init_schema(self):
+        self.conn.executescript(SQLITE_SCHEMA)
+
+    def _merge(self, table, columns, df, merge_sql):
+        rows = df[columns].astype(object).where(df[columns].notna(), None).itertuples(index=False, name=None)
+        with self.conn:  # one transaction per batch
+            self.conn.executescript(SQLITE_STAGING)
+            self.conn.execute(f"DELETE FROM {table}")
+            self.conn.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})", rows
+            )
+            count = self.conn.execute(merge_sql).rowcount
+            self.conn.execute(f"DELETE FROM {table}")
+        return count
+
+    def merge_pools(self, df):
+        return self._merge('staging_pools', POOL_COLUMNS, df, SQLITE_MERGE_POOLS)
+
+    def merge_metrics(self, df):
+        # Postgres decodes the base64 sketches in the merge; SQLite stores the bytes as they are
+        df = df.assign(user_sketch=user_sketch.to_bytes(df['user_sketch']))
+        return self._merge('staging_daily_metrics', METRIC_COLUMNS, df, SQLITE_MERGE_METRICS)
+
+    def close(self):
+        self.conn.close()
+
+
+def connect(dsn, workers):
+    """Target for a DSN: sqlite:///relative.db or sqlite:////absolute.db for the embedded stand-in,
+    anything else is Postgres."""
+    if dsn.startswith('sqlite:///'):
+        return SQLiteTarget(dsn[len('sqlite:///'):])
+    return PostgresTarget(dsn, workers)
+
+
+def load_processed(files):
+    """Pool-day rows of the processed datasets; later files win on duplicate (pool, date)."""
+    print("📂 Loading processed datasets...")
+    usecols = {'poolAddress', 'date', 'tx_count', 'unique_users', 'user_sketch', 'token0', 'token1',
+               'token0Symbol', 'token1Symbol', 'fee', 'poolType'}
+    dfs = []
+    for file in files:
+        df = pd.read_csv(file, usecols=lambda c: c in usecols)
+        print(f"   {file}: {len(df):,} rows")
+        dfs.append(df)
+    df = pd.concat(dfs, ignore_index=True)
+    df['poolAddress'] = df['poolAddress'].str.lower()
+    df = df.drop_duplicates(['poolAddress', 'date'], keep='last')
+    print(f"   ✅ {len(df):,} pool-days, {df['poolAddress'].nunique()} pools")
+    return df
+
+
+def pool_rows(df):
+    """One `pools` row per pool, from its latest day."""
+    latest = df.sort_values('date', kind='stable').drop_duplicates('poolAddress', keep='last')
+    pools = pd.DataFrame({'pool_address': latest['poolAddress']})
+    # the processors do not keep token addresses; the columns are NOT NULL
+    for column in ['token0', 'token1']:
+        pools[column] = latest[column].fillna('') if column in latest.columns else ''
+    pools['token0_symbol'] = latest.get('token0Symbol')
+    pools['token1_symbol'] = latest.get('token1Symbol')
+    pools['fee_tier'] = latest['fee'].fillna(0).astype(int) if 'fee' in latest.columns else 0
+    pool_type = latest['poolType'] if 'poolType' in latest.columns else pd.Series('other', index=latest.index)
+    pools['pool_type'] = pool_type.where(pool_type.isin(POOL_TYPES), 'other')
+    return pools
+
+
+def metric_rows(df):
+    return pd.DataFrame({
+        'pool_address': df['poolAddress'],
+        'date': pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d'),
+        'tx_count': df['tx_count'].fillna(0).astype(int),
+        'unique_users': df['unique_users'].fillna(0).astype(int) if 'unique_users' in df.columns else 0,
+        # base64 HyperLogLog of the day's users, absent in datasets processed before sketches existed
+        'user_sketch': df['user_sketch'] if 'user_sketch' in df.columns else None,
+    })
+
+
+def load(target, df, batch_size):
+    """Merge pools first (daily_metrics references them), then metric batches across the pool."""
+    with profiling.stage("pools"):
+        changed = target.merge_pools(pool_rows(df))
+    print(f"   🏊 pools: {changed:,} inserted or updated")
+
+    metrics = metric_rows(df)
+    batches = [metrics.iloc[i:i + batch_size] for i in range(0, len(metrics), batch_size)]
+    with profiling.stage("daily_metrics"):
+        with ThreadPoolExecutor(max_workers=target.workers) as executor:
+            changed = sum(executor.map(target.merge_metrics, batches))
+    print(f"   📊 daily_metrics: {changed:,} of {len(metrics):,} rows inserted or updated "
+          f"({len(batches)} batches of up to {batch_size:,})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="*", default=['pool_full_dataset.csv'],
+                        help="processed per-pool daily datasets (default: pool_full_dataset.csv)")
+    parser.add_argument("--dsn", default=os.environ.get('DATABASE_URL'),
+                        help="Postgres DSN or sqlite:///path.db (default: $DATABASE_URL)")
+    parser.add_argument("--batch_size", type=int, default=50_000, help="rows per COPY + merge")
+    parser.add_argument("--workers", type=int, default=4, help="pooled connections loading batches in parallel")
+    parser.add_argument("--init_schema", action="store_true", help="create the pools and daily_metrics tables first")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.configure(args)
+    if not args.dsn:
+        parser.error("--dsn or DATABASE_URL is required")
+
+    print("=" * 80)
+    print("DAILY METRICS BULK LOADER")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    target = connect(args.dsn, args.workers)
+    try:
+        if args.init_schema:
+            target.init_schema()
+        with profiling.stage("load") as s:
+            df = load_processed(args.files)
+            s.frame(df)
+        load(target, df, args.batch_size)
+        print(f"\n✅ Loaded in {time.perf_counter() - start:.1f}s")
+    finally:
+        target.close()
+        profiling.report()
+
+if __name__ == "__main__":
+    main()
@@ -8,15 +8,28 @@ into full feature dataset with all required fields for APY prediction modeling.
 This script can process data incrementally as it becomes available.
 """
 
+import argparse
+import sys
 import pandas as pd
 import numpy as np
 import glob
 import os
-from datetime import datetime
+from datetime import date, datetime
 from pathlib import Path
 
-def load_march_june_stablecoin_data():
-    """Load all stablecoin transaction files from March-June 2025"""
+# profiling and user sketch helpers are shared with the model CLI
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'model'))
+import profiling
+import user_sketch
+from tx_archive import DEFAULT_ARCHIVE, HASH_COLUMNS, TxArchive, binary_frame
+import tx_dedup
+from file_manifest import FileManifest
+
+# windows (days) of the unique_users_{n}d columns, merged from the daily user sketches
+USER_WINDOWS = [7, 30]
+
+def load_march_june_stablecoin_data(archive_dir=None):
+    """Load all stablecoin transaction files from March-June 2025, through the binary archive when archive_dir is set"""
     print("📂 Loading March-June 2025 stablecoin transaction files...")
     
     # Find all stablecoin transaction files for March-June 2025
@@ -37,23 +50,56 @@ def load_march_june_stablecoin_data():
     
     print(f"   Found {len(all_files)} transaction files for March-June 2025")
     
-    # Load and combine all files
-    dfs = []
-    for file in sorted(all_files):
-        try:
-            df = pd.read_csv(file)
-            dfs.append(df)
-            print(f"   📁 Loaded {len(df)} transactions from {os.path.basename(file)}")
-        except Exception as e:
+    # Catalog rows/days/checksums; only files whose stamp moved are read
+    manifest = FileManifest()
+    changed = manifest.update(all_files)
+    print(f"   🗂️  {len(changed)} new or changed since the last run")
+    gaps = manifest.gaps("2025-03-01", "2025-06-30")
+    if gaps:
+        print(f"   ⚠️  {sum(len(pd.date_range(first, last)) for first, last in gaps)} days without data, "
+              f"first gap {gaps[0][0]} to {gaps[0][1]}")
+    
+    if archive_dir is not None:
+        # Convert new or changed files, then memory-map the archive instead of parsing CSV text
+        archive = TxArchive(archive_dir)
+        synced = archive.sync(all_files, manifest.checksums(all_files))
+        for file, e in archive.errors.items():
             print(f"   ⚠️  Error loading {file}: {e}")
-    
-    if not dfs:
-        print("❌ No valid transaction files loaded!")
-        return None
-    
-    # Combine all dataframes
-    combined_df = pd.concat(dfs, ignore_index=True)
-    
+        if synced:
+            print(f"   📦 Archived {len(synced)} new or changed days into {archive_dir}")
+        # hashes stay binary and pools / days stay ids until the pool-day rows are built
+        archive_df = archive.frame(days=archive.source_days(all_files), with_source=True, binary=True)
+        # rows of these files only, file by file in name order like the CSV path, so
+        # transactions repeated by overlapping backfills are reported against their file
+        names = sorted(os.path.basename(f) for f in all_files)
+        archive_df = archive_df[archive_df['source'].isin(names)].sort_values('source', kind='stable')
+        sources = pd.Categorical(archive_df.pop('source'))
+        combined_df, report = tx_dedup.drop_duplicates([(sources, archive_df)])
+        del archive_df, sources
+    else:
+        # Load and combine all files
+        dfs = []
+        for file in sorted(all_files):
+            try:
+                df = pd.read_csv(file)
+                dfs.append((os.path.basename(file), df))
+                print(f"   📁 Loaded {len(df)} transactions from {os.path.basename(file)}")
+            except Exception as e:
+                print(f"   ⚠️  Error loading {file}: {e}")
+        
+        if not dfs:
+            print("❌ No valid transaction files loaded!")
+            return None
+        
+        # Combine all dataframes into the archive's binary layout, dropping transactions
+        # repeated across overlapping backfills file by file
+        sources = pd.Categorical.from_codes(np.repeat(np.arange(len(dfs)), [len(df) for _, df in dfs]),
+                                            [name for name, _ in dfs])
+        combined_df = binary_frame(pd.concat([df for _, df in dfs], ignore_index=True))
+        del dfs
+        combined_df, report = tx_dedup.drop_duplicates([(sources, combined_df)])
+    
+    tx_dedup.print_report(report)
     print(f"   ✅ Loaded {len(combined_df):,} total transactions")
     print(f"   📅 Date range: {combined_df['date'].min()} to {combined_df['date'].max()}")
     print(f"   🏊 Unique pools: {combined_df['poolAddress'].nunique()}")
@@ -79,34 +125,35 @@ def calculate_daily_metrics(df):
     """Calculate daily transaction metrics for each pool"""
     print("\n📊 Calculating daily transaction metrics...")
     
-    # Group by pool and date to calculate daily metrics
-    daily_metrics = []
-    
-    for pool_address in df['poolAddress'].unique():
-        pool_data = df[df['poolAddress'] == pool_address].copy()
-        pool_data['date'] = pd.to_datetime(pool_data['date'])
-        pool_data = pool_data.sort_values('date')
-        
-        # Get unique dates for this pool
-        date_range = pd.date_range(start=pool_data['date'].min(), 
-                                 end=pool_data['date'].max(), 
-                                 freq='D')
-        
-        for date in date_range:
-            day_data = pool_data[pool_data['date'].dt.date == date.date()]
-            
-            # Basic metrics
-            tx_count = len(day_data)
-            unique_users = day_data['transactionHash'].nunique() if tx_count > 0 else 0
-            
-            daily_metrics.append({
-                'poolAddress': pool_address,
-                'date': date.strftime('%Y-%m-%d'),
-                'tx_count': tx_count,
-                'unique_users': unique_users
-            })
-    
-    metrics_df = pd.DataFrame(daily_metrics)
+    # Group by pool and date on the binary layout: pool / day codes and hash words
+    df = binary_frame(df)
+    pools, days = df['poolAddress'].cat, df['date'].cat
+    ordinals = pd.to_datetime(days.categories).map(pd.Timestamp.toordinal).to_numpy()
+    rows = pd.DataFrame({
+        'pool': pools.codes.to_numpy(),
+        'day': ordinals[days.codes.to_numpy()],
+        **{column: df[column].to_numpy() for column in HASH_COLUMNS},
+    })
+    rows['first'] = ~rows.duplicated()
+    daily = rows.groupby(['pool', 'day'], sort=False)['first'].agg(['size', 'sum'])
+    del rows
+    
+    # Every date from each pool's first to last day, pools in order of appearance
+    span = daily.index.to_frame(index=False).groupby('pool', sort=False)['day'].agg(['min', 'max'])
+    lengths = (span['max'] - span['min'] + 1).to_numpy()
+    pool = np.repeat(span.index.to_numpy(), lengths)
+    day = np.repeat(span['min'].to_numpy(), lengths) + np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    counts = daily.reindex(pd.MultiIndex.from_arrays([pool, day]), fill_value=0)
+    
+    # Only the pool-day rows are turned back into addresses and ISO dates
+    unique_days, day_index = np.unique(day, return_inverse=True)
+    metrics_df = pd.DataFrame({
+        'poolAddress': np.asarray(pools.categories, dtype=object)[pool],
+        'date': np.array([date.fromordinal(int(d)).isoformat() for d in unique_days], dtype=object)[day_index],
+        'tx_count': counts['size'].to_numpy(),
+        'unique_users': counts['sum'].to_numpy(),
+    })
+    metrics_df = user_sketch.add_user_sketches(metrics_df, df, USER_WINDOWS, HASH_COLUMNS)
     print(f"   ✅ Calculated metrics for {len(metrics_df)} pool-days")
     
     return metrics_df
@@ -125,6 +172,8 @@ def add_pool_metadata(df):
             'symbol0': 'token0Symbol', 
             'symbol1': 'token1Symbol'
         })
+        # transaction pool addresses are lowercase (the archive stores them that way)
+        metadata['poolAddress'] = metadata['poolAddress'].str.lower()
         df = df.merge(metadata[['poolAddress', 'pool_name', 'token0Symbol', 'token1Symbol', 'fee']], 
                      on='poolAddress', how='left')
         
@@ -262,36 +311,57 @@ def add_derived_features(df):
 
 def main():
     """Main processing function for March-June 2025 data"""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--archive", default=str(DEFAULT_ARCHIVE),
+                        help="binary transaction archive (tx_archive.py), updated from the CSVs before reading")
+    parser.add_argument("--csv", action="store_true", help="parse the raw CSVs directly instead of the archive")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.configure(args)
+
     print("=" * 80)
     print("STABLECOIN TRANSACTION PROCESSOR (MARCH-JUNE 2025)")
     print("=" * 80)
     
     try:
         # Step 1: Load raw transaction data for March-June 2025
-        raw_df = load_march_june_stablecoin_data()
+        with profiling.stage("load") as s:
+            raw_df = load_march_june_stablecoin_data(None if args.csv else args.archive)
+            s.frame(raw_df)
         if raw_df is None:
             print("\n❌ No March-June 2025 data found. Please run the data fetcher first:")
             print("   node fetch_march_to_june_2025.mjs")
             return
         
         # Step 2: Calculate daily metrics
-        daily_df = calculate_daily_metrics(raw_df)
+        with profiling.stage("daily_metrics") as s:
+            daily_df = calculate_daily_metrics(raw_df)
+            s.frame(daily_df)
         
         # Step 3: Add pool metadata
-        daily_df = add_pool_metadata(daily_df)
+        with profiling.stage("metadata") as s:
+            daily_df = add_pool_metadata(daily_df)
+            s.frame(daily_df)
         
         # Step 4: Calculate rolling metrics
-        daily_df = calculate_rolling_metrics(daily_df)
+        with profiling.stage("rolling") as s:
+            daily_df = calculate_rolling_metrics(daily_df)
+            s.frame(daily_df)
         
         # Step 5: Calculate target features
-        daily_df = calculate_target_features(daily_df)
+        with profiling.stage("targets") as s:
+            daily_df = calculate_target_features(daily_df)
+            s.frame(daily_df)
         
         # Step 6: Add derived features
-        daily_df = add_derived_features(daily_df)
+        with profiling.stage("derived") as s:
+            daily_df = add_derived_features(daily_df)
+            s.frame(daily_df)
         
         # Step 7: Save processed dataset
         output_file = 'pool_march_june_dataset.csv'
-        daily_df.to_csv(output_file, index=False)
+        with profiling.stage("save"):
+            daily_df.to_csv(output_file, index=False)
         
         print(f"\n💾 Saved processed dataset: {output_file}")
         print(f"   📊 {len(daily_df):,} rows")
@@ -310,6 +380,8 @@ def main():
     except Exception as e:
         print(f"\n❌ Error: {e}")
         raise
+    finally:
+        profiling.report()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,67 @@
+"""
+get_pool_features() must return rows whose column types match its RETURNS TABLE.
+
+The static test checks that every selected column is cast to its declared type
+(pool_features stores DOUBLE PRECISION / INTEGER while the function declares
+NUMERIC / BIGINT). The live test runs the function against Postgres when
+TEST_DATABASE_URL is set and psycopg2 is installed.
+"""
+
+import os
+import re
+import uuid
+from pathlib import Path
+
+import pytest
+
+SCHEMA = Path(__file__).resolve().parent.parent / 'infrastructure' / 'schema.sql'
+
+
+def function_body(sql, name):
+    start = sql.index(f"CREATE OR REPLACE FUNCTION {name}")
+    return sql[start:sql.index("$$ LANGUAGE", start)]
+
+
+def returns_table(body):
+    columns = body[body.index("RETURNS TABLE (") + len("RETURNS TABLE ("):body.index(") AS $$")]
+    return [tuple(line.strip().rstrip(',').split(None, 1)) for line in columns.strip().splitlines()]
+
+
+def select_list(body):
+    select = body[body.index("SELECT") + len("SELECT"):body.index("FROM v_pool_features")]
+    return [line.strip().rstrip(',') for line in select.strip().splitlines() if not line.strip().startswith('--')]
+
+
+def test_get_pool_features_casts_to_declared_types():
+    body = function_body(SCHEMA.read_text(), "get_pool_features")
+    declared = returns_table(body)
+    selected = select_list(body)
+    assert len(declared) == len(selected)
+    for (name, sql_type), expression in zip(declared, selected):
+        match = re.fullmatch(r"f\.(\w+)::(.+)", expression)
+        assert match, f"{expression} is not cast to {sql_type}"
+        assert match.group(1) == name
+        assert match.group(2) == sql_type
+
+
+@pytest.mark.skipif(not os.environ.get('TEST_DATABASE_URL'), reason="needs TEST_DATABASE_URL (Postgres)")
+def test_get_pool_features_runs_on_postgres():
+    psycopg2 = pytest.importorskip('psycopg2')
+    conn = psycopg2.connect(os.environ['TEST_DATABASE_URL'])
+    schema = f"test_{uuid.uuid4().hex[:8]}"
+    try:
+        cur = conn.cursor()
+        cur.execute(f"CREATE SCHEMA {schema}; SET search_path TO {schema}")
+        cur.execute(SCHEMA.read_text())
+        pool = '0x' + 'ab' * 20
+        cur.execute("INSERT INTO pools (pool_address, token0, token1, fee_tier, pool_type) "
+                    "VALUES (%s, %s, %s, 500, 'stablecoin')", (pool, pool, pool))
+        cur.execute("INSERT INTO pool_features VALUES (%s, '2025-03-01', 10, 4, 9.5, 10.0, 1.25, 100, 7, 0.1)", (pool,))
+        cur.execute("SELECT * FROM get_pool_features(%s)", (pool,))
+        row = cur.fetchone()
+        assert row[0] == pool and row[1] == 10 and row[7] == 7
+    finally:
+        conn.rollback()
+        conn.cursor().execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+        conn.commit()
+        conn.close()
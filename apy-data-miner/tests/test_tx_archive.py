@@ -0,0 +1,123 @@
+"""
+The transaction archive round-trips its CSV sources: hashes encode and decode
+losslessly, day files read back what write_day wrote, and a sync after a
+source changes rewrites only the days it touches.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import tx_archive
+
+
+def transactions(rows=400, pools=5, days=4, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'blockNumber': rng.integers(1, 2 ** 31 - 1, rows),
+        'transactionHash': ["0x" + rng.bytes(32).hex() for _ in range(rows)],
+        'poolAddress': [f"0x{p:040X}" for p in rng.integers(0, pools, rows)],
+        'date': (pd.Timestamp('2025-03-01') + pd.to_timedelta(rng.integers(0, days, rows), 'D')).strftime('%Y-%m-%d'),
+    })
+
+
+def write_csv(path, df):
+    df.to_csv(path, index=False)
+    # a distinct stamp even when rewritten within the filesystem's time resolution
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def canonical(df):
+    return (df.assign(poolAddress=df['poolAddress'].astype(str).str.lower(), date=df['date'].astype(str))
+              [['blockNumber', 'transactionHash', 'poolAddress', 'date']]
+              .sort_values(['transactionHash', 'poolAddress']).reset_index(drop=True))
+
+
+@pytest.fixture
+def sources(tmp_path):
+    df = transactions()
+    first, second = df.iloc[:250], df.iloc[250:]  # both hold rows of every day
+    paths = [tmp_path / "stablecoin_txs_2025-03-a.csv", tmp_path / "stablecoin_txs_2025-03-b.csv"]
+    write_csv(paths[0], first)
+    write_csv(paths[1], second)
+    return paths, df
+
+
+def test_hashes_round_trip():
+    hashes = transactions(rows=50)['transactionHash']
+    encoded = tx_archive.encode_hashes(hashes.str.upper().str.replace('0X', '0x'))
+    assert encoded.shape == (50, tx_archive.HASH_BYTES)
+    assert list(tx_archive.decode_hashes(encoded)) == list(hashes)
+    with pytest.raises(ValueError):
+        tx_archive.encode_hashes(["0x1234"])
+
+
+def test_day_file_reads_back_what_was_written(tmp_path):
+    rng = np.random.default_rng(1)
+    rows = 300
+    hashes = rng.integers(0, 256, (rows, tx_archive.HASH_BYTES), dtype=np.uint8)
+    pools = rng.integers(0, 7, rows)
+    blocks = rng.integers(0, 2 ** 31 - 1, rows)
+    source_ids = rng.integers(0, 3, rows)
+    path = tmp_path / "2025-03-02.txa"
+    tx_archive.write_day(path, "2025-03-02", hashes, pools, blocks, source_ids)
+
+    f = tx_archive.DayFile(path)
+    assert (f.date, f.rows) == ("2025-03-02", rows)
+    order = np.lexsort((blocks, pools))
+    np.testing.assert_array_equal(f.hashes, hashes[order])
+    np.testing.assert_array_equal(f.pools, pools[order])
+    np.testing.assert_array_equal(f.blocks, blocks[order])
+    np.testing.assert_array_equal(f.sources, source_ids[order])
+    for pool in range(7):
+        np.testing.assert_array_equal(np.sort(f.blocks[f.rows_of([pool])]), np.sort(blocks[pools == pool]))
+
+    empty = tmp_path / "2025-03-03.txa"
+    tx_archive.write_day(empty, "2025-03-03", hashes[:0], pools[:0], blocks[:0], source_ids[:0])
+    assert tx_archive.DayFile(empty).rows == 0
+
+
+def test_frame_matches_the_csv_rows(tmp_path, sources):
+    paths, df = sources
+    archive = tx_archive.TxArchive(tmp_path / "archive")
+    assert archive.sync(paths) == sorted(df['date'].unique())
+
+    pd.testing.assert_frame_equal(canonical(archive.frame()), canonical(df))
+    binary = archive.frame(with_source=True, binary=True)
+    expected = tx_archive.binary_frame(df)
+    assert list(binary.columns) == list(expected.columns) + ['source']
+    key = ['blockNumber'] + tx_archive.HASH_COLUMNS
+    got = binary.sort_values(key).reset_index(drop=True)
+    want = expected.sort_values(key).reset_index(drop=True)
+    pd.testing.assert_frame_equal(got[key], want[key])
+    for column in ('poolAddress', 'date'):
+        assert list(got[column].astype(str)) == list(want[column].astype(str))
+    assert list(binary['source'].cat.categories) == [p.name for p in paths]
+    assert (binary['source'].value_counts()[[p.name for p in paths]] == [250, 150]).all()
+
+
+def test_sync_after_a_source_changes(tmp_path, sources):
+    paths, df = sources
+    archive = tx_archive.TxArchive(tmp_path / "archive")
+    archive.sync(paths)
+    assert archive.sync(paths) == []
+
+    # the second source now only holds rows of the first day, with new contents
+    replaced = transactions(rows=80, days=1, seed=7)
+    write_csv(paths[1], replaced)
+    before = {day: archive.day(day).rows for day in archive.days()}
+    affected = archive.sync(paths)
+    assert affected == sorted(df.iloc[250:]['date'].unique())
+
+    expected = pd.concat([df.iloc[:250], replaced], ignore_index=True)
+    pd.testing.assert_frame_equal(canonical(archive.frame()), canonical(expected))
+    after = {day: archive.day(day).rows for day in archive.days()}
+    assert after == expected['date'].value_counts().to_dict()
+    assert after != before
+    assert archive.source_days([paths[1]]) == {'2025-03-01'}
@@ -0,0 +1,64 @@
+"""
+update_pool_features.update() recomputes only what changed since the last run:
+a rerun does nothing, rows committed late inside the overlap window are still
+picked up, and the result always equals a rebuild.
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import load_daily_metrics
+import update_pool_features
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / "features.db"
+    conn = sqlite3.connect(path)
+    conn.executescript(load_daily_metrics.SQLITE_SCHEMA)
+    conn.close()
+    db = update_pool_features.Database(f"sqlite:///{path}")
+    db.init_schema()
+    yield db
+    db.close()
+
+
+def write(db, pool, date, tx_count, updated_at):
+    db.execute("INSERT OR REPLACE INTO daily_metrics (pool_address, date, tx_count, unique_users, updated_at) "
+               "VALUES (?, ?, ?, 1, ?)", (pool, date, tx_count, updated_at))
+    db.conn.commit()
+
+
+def features(db):
+    return db.frame("SELECT * FROM pool_features ORDER BY pool_address, date").drop(columns='updated_at')
+
+
+def test_rerun_does_not_replay_the_previous_batch(db):
+    for day in range(1, 11):
+        write(db, '0xa', f'2025-03-{day:02d}', day, '2025-03-20 10:00:00')
+        write(db, '0xb', f'2025-03-{day:02d}', 2 * day, '2025-03-20 10:00:01')
+    assert update_pool_features.update(db) == (2, 20)
+    assert update_pool_features.update(db) == (0, 0)
+
+
+def test_late_and_rewritten_rows_are_picked_up(db):
+    for day in range(1, 11):
+        write(db, '0xa', f'2025-03-{day:02d}', day, '2025-03-20 10:00:00')
+        write(db, '0xb', f'2025-03-{day:02d}', 2 * day, '2025-03-20 10:00:01')
+    update_pool_features.update(db)
+
+    # committed late by a transaction that started before the last run
+    write(db, '0xa', '2025-03-11', 5, '2025-03-20 09:58:00')
+    assert update_pool_features.update(db) == (1, 1)
+    # rewritten within the same second as the previous batch
+    write(db, '0xb', '2025-03-05', 50, '2025-03-20 10:00:01')
+    assert update_pool_features.update(db) == (1, 6)
+    assert update_pool_features.update(db) == (0, 0)
+
+    incremental = features(db)
+    update_pool_features.update(db, rebuild=True)
+    assert incremental.equals(features(db))
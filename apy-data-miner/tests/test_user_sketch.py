@@ -0,0 +1,54 @@
+"""
+Sparse user sketches give the same sketches and windowed estimates as dense
+registers, whatever the chunking of windowed() (chunks cut through pools).
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent / 'model'))
+import user_sketch
+
+
+def transactions(rows=5_000, pools=12, days=60, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'poolAddress': [f"0x{p:040x}" for p in rng.integers(0, pools, rows)],
+        'date': (pd.Timestamp('2025-03-01') + pd.to_timedelta(rng.integers(0, days, rows), 'D')).strftime('%Y-%m-%d'),
+        # few users per pool-day on most days
+        'transactionHash': [f"0x{u:064x}" for u in rng.zipf(1.5, rows)],
+    })
+
+
+def dense_windowed(pools, dates, registers, days):
+    """Reference: merge every row's window from dense registers directly."""
+    frame = pd.DataFrame({'pool': pools, 'day': pd.to_datetime(dates).map(pd.Timestamp.toordinal)})
+    result = np.empty(len(frame))
+    for i, (pool, day) in enumerate(zip(frame['pool'], frame['day'])):
+        inside = ((frame['pool'] == pool) & (frame['day'] <= day) & (frame['day'] > day - days)).to_numpy()
+        result[i] = user_sketch.estimate(user_sketch.merge(registers[inside]))
+    return result
+
+
+def test_sparse_matches_dense():
+    df = transactions()
+    keys, sketches = user_sketch.build(df, ['poolAddress', 'date'], 'transactionHash')
+    registers = sketches.dense()
+    assert (registers > 0).sum() == len(sketches.cells)
+
+    # every pool's days, including days without transactions, in shuffled order
+    metrics = pd.MultiIndex.from_product([keys['poolAddress'].unique(), sorted(keys['date'].unique())])
+    metrics = metrics.to_frame(index=False, name=['poolAddress', 'date']).sample(frac=1, random_state=1)
+    position = pd.MultiIndex.from_frame(keys).get_indexer(pd.MultiIndex.from_frame(metrics))
+    expected = np.where((position >= 0)[:, None], registers[position], 0).astype(np.uint8)
+    taken = sketches.take(position)
+    assert np.array_equal(taken.dense(), expected)
+    assert user_sketch.encode(taken) == user_sketch.encode(expected)
+
+    reference = dense_windowed(metrics['poolAddress'], metrics['date'], expected, 7)
+    for chunk_rows in (5, 64, user_sketch.CHUNK_ROWS):
+        got = user_sketch.windowed(metrics['poolAddress'], metrics['date'], taken, 7, chunk_rows)
+        assert np.allclose(got, reference)
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+RAW TRANSACTION ARCHIVE
+=======================
+Compact, memory-mapped copy of the raw stablecoin_txs_*.csv files
+(blockNumber,transactionHash,poolAddress,date), so the processors stop
+re-parsing hex text on every run.
+
+    tx_archive/
+        pool_ids.bin        20-byte pool addresses; a pool's id is its record index (model/pool_ids.py)
+        sources.json        CSV file -> source id, (mtime_ns, size) or sha256, and the days it holds
+        2025-03-02.txa      one file per day
+
+A day file holds its rows sorted by (pool id, block) as raw little-endian
+columns, followed by a footer index and a fixed trailer:
+
+    hashes      rows x 32 bytes     binary transaction hashes
+    pools       rows x int32        pool ids
+    blocks      rows x int32        block numbers
+    sources     rows x int32        id of the CSV the row came from (sources.json)
+    index       pools x (int32 pool id, int32 first row, int32 rows)
+    trailer     b"TXARCH02", uint64 rows, uint64 index entries, int64 day ordinal
+
+About 44 bytes a row instead of ~125 of CSV text. Readers memory-map the
+columns and use the index to read only the pools they ask for:
+
+    archive = TxArchive("updater/static/tx_archive")
+    archive.sync(glob.glob("updater/static/stablecoin_txs_2025-*.csv"))   # converts new or changed CSVs
+    df = archive.frame(start="2025-03-01", end="2025-06-30")            # same columns as the CSVs
+    df = archive.frame(days=..., with_source=True)                      # plus each row's CSV file name
+    df = archive.frame(days=..., binary=True)                           # hashes and pool ids left undecoded
+
+Binary frames keep each transaction hash as four uint64 columns (HASH_COLUMNS,
+one 32-byte block in pandas) and poolAddress / date as categoricals whose codes
+are the archive's pool and day ids, so deduplication and daily aggregation run
+on integers and only the per pool-day results are turned back into text.
+binary_frame() puts parsed CSV rows into the same layout.
+
+  python tx_archive.py build updater/static/stablecoin_txs_2025-*.csv
+  python tx_archive.py info
+"""
+
+import argparse
+import glob
+import json
+import os
+import struct
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# pool id dictionary and profiling helpers are shared with the model CLI
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'model'))
+import profiling
+from pool_ids import PoolIds
+
+DEFAULT_ARCHIVE = Path(__file__).parent / 'updater' / 'static' / 'tx_archive'
+DEFAULT_SOURCES = str(Path(__file__).parent / 'updater' / 'static' / 'stablecoin_txs_2025-*.csv')
+
+MAGIC = b"TXARCH02"
+TRAILER = struct.Struct("<8sQQq")
+HASH_BYTES = 32
+INDEX = np.dtype([("pool", "<i4"), ("start", "<i4"), ("rows", "<i4")])
+HASH_COLUMNS = [f"transactionHash_{i}" for i in range(HASH_BYTES // 8)]
+
+_HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+
+
+def encode_hashes(hashes) -> np.ndarray:
+    """(n, 32) uint8 array of 0x-prefixed 66-character transaction hashes."""
+    text = pd.Series(hashes, copy=False).astype(str).str.lower().str.removeprefix('0x')
+    if len(text) and not (text.str.len() == HASH_BYTES * 2).all():
+        raise ValueError("transaction hashes must be 32-byte hex strings")
+    return np.frombuffer(bytes.fromhex(''.join(text)), dtype=np.uint8).reshape(-1, HASH_BYTES)
+
+
+def decode_hashes(hashes) -> np.ndarray:
+    """0x-prefixed lowercase hex strings (object array) of an (n, 32) uint8 array."""
+    hashes = np.asarray(hashes)
+    text = np.empty((len(hashes), 2 + HASH_BYTES * 2), dtype=np.uint8)
+    text[:, 0], text[:, 1] = ord('0'), ord('x')
+    text[:, 2::2] = _HEX_DIGITS[hashes >> 4]
+    text[:, 3::2] = _HEX_DIGITS[hashes & 15]
+    return text.view(f"S{text.shape[1]}").ravel().astype(str).astype(object)
+
+
+def _categorical(values, normalize, ordered=False) -> pd.Categorical:
+    """Categorical of normalize(value) per row, normalizing each distinct value once."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    mapped, categories = pd.factorize(normalize(pd.Index(uniques)), sort=ordered)
+    return pd.Categorical.from_codes(np.where(codes >= 0, mapped[codes], -1), categories, ordered=ordered)
+
+
+def binary_frame(df) -> pd.DataFrame:
+    """Raw CSV rows (blockNumber, transactionHash, poolAddress, date) in the binary frame layout.
+
+    Frames already in it (TxArchive.frame(binary=True)) are returned as they are.
+    """
+    if HASH_COLUMNS[0] in df.columns:
+        return df
+    words = encode_hashes(df['transactionHash']).view("<u8")
+    return pd.DataFrame({
+        'blockNumber': df['blockNumber'].to_numpy(dtype=np.int64),
+        **{column: words[:, i] for i, column in enumerate(HASH_COLUMNS)},
+        'poolAddress': _categorical(df['poolAddress'], lambda pools: pools.str.lower()),
+        'date': _categorical(df['date'], lambda dates: pd.to_datetime(dates).strftime('%Y-%m-%d'), ordered=True),
+    })
+
+
+class DayFile:
+    """Memory-mapped columns of one day file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        size = self.path.stat().st_size
+        with open(self.path, "rb") as f:
+            f.seek(size - TRAILER.size)
+            magic, self.rows, entries, day = TRAILER.unpack(f.read(TRAILER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a transaction archive day file")
+        self.date = date.fromordinal(day).isoformat()
+
+        n = self.rows
+        self.hashes = self._map(0, np.uint8, (n, HASH_BYTES))
+        self.pools = self._map(n * HASH_BYTES, np.dtype("<i4"), (n,))
+        self.blocks = self._map(n * (HASH_BYTES + 4), np.dtype("<i4"), (n,))
+        self.sources = self._map(n * (HASH_BYTES + 8), np.dtype("<i4"), (n,))
+        self.index = self._map(n * (HASH_BYTES + 12), INDEX, (entries,))
+
+    def _map(self, offset, dtype, shape):
+        if 0 in shape:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=offset, shape=shape)
+
+    def rows_of(self, pool_ids) -> np.ndarray:
+        """Row numbers of the given pools, through the footer index."""
+        entries = self.index[np.isin(self.index["pool"], pool_ids)]
+        if len(entries) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(e["start"], e["start"] + e["rows"]) for e in entries])
+
+
+def write_day(path, day, hashes, pools, blocks, sources):
+    """Write one day file (rows sorted by pool, block) atomically."""
+    if len(blocks) and not 0 <= blocks.min() <= blocks.max() < 2 ** 31:
+        raise ValueError("block numbers must fit in int32")
+    order = np.lexsort((blocks, pools))
+    hashes, pools, blocks = hashes[order], pools[order].astype("<i4"), blocks[order].astype("<i4")
+    sources = sources[order].astype("<i4")
+    ids, starts, counts = np.unique(pools, return_index=True, return_counts=True)
+    index = np.empty(len(ids), dtype=INDEX)
+    index["pool"], index["start"], index["rows"] = ids, starts, counts
+
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        for column in (hashes, pools, blocks, sources, index):
+            f.write(np.ascontiguousarray(column).tobytes())
+        f.write(TRAILER.pack(MAGIC, len(pools), len(index), date.fromisoformat(day).toordinal()))
+    os.replace(tmp_path, path)
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class TxArchive:
+    def __init__(self, root):
+        self.root = Path(root)
+        self.pool_ids = PoolIds(self.root / "pool_ids.bin")
+        self.errors = {}  # CSV file -> why the last sync() could not read it
+
+    def _day_path(self, day):
+        return self.root / f"{day}.txa"
+
+    def sources(self) -> dict:
+        try:
+            with open(self.root / "sources.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_sources(self, sources):
+        tmp_path = self.root / "sources.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(sources, f, indent=4)
+        os.replace(tmp_path, self.root / "sources.json")
+
+    def days(self) -> list:
+        return sorted(p.stem for p in self.root.glob("*.txa"))
+
+    def day(self, day) -> DayFile:
+        return DayFile(self._day_path(day))
+
+    def sync(self, csv_files, checksums=None) -> list:
+        """Convert the CSVs that are new or changed since the last sync; returns the days rewritten.
+
+        A day is rebuilt from every source that holds rows for it, so days split
+        across several CSVs stay whole. checksums ({file: sha256}, e.g. from
+        file_manifest.py) decide what changed when given, so a CSV rewritten with
+        the same bytes is not converted again; otherwise the file stamps do.
+        Sources that cannot be read are left out of the archive and listed in errors.
+        """
+        self.errors = {}
+        self.root.mkdir(parents=True, exist_ok=True)
+        sources = self.sources()
+        if any("id" not in meta for meta in sources.values()):
+            # written before day files carried source ids: rebuild every day
+            for path in self.root.glob("*.txa"):
+                path.unlink()
+            sources = {}
+        checksums = {str(Path(f).resolve()): c for f, c in (checksums or {}).items()}
+
+        def unchanged(path):
+            meta = sources.get(path, {})
+            if path in checksums:
+                return meta.get("sha256") == checksums[path]
+            return meta.get("stamp") == file_stamp(path)
+
+        changed = [path for path in (str(Path(f).resolve()) for f in csv_files) if not unchanged(path)]
+        if not changed:
+            return []
+
+        by_day = {}  # source path -> {day: rows}, None if unreadable
+
+        def load(path):
+            if path not in by_day:
+                try:
+                    by_day[path] = dict(tuple(read_source(path).groupby('date', sort=False)))
+                except Exception as e:
+                    self.errors[path] = e
+                    by_day[path] = None
+            return by_day[path]
+
+        affected = set()
+        for path in changed:
+            affected.update(sources.get(path, {}).get("days", []))
+            if load(path) is None:
+                sources.pop(path, None)
+                continue
+            source_id = sources.get(path, {}).get("id", max((m["id"] for m in sources.values()), default=-1) + 1)
+            sources[path] = {"id": source_id, "stamp": file_stamp(path), "days": sorted(by_day[path])}
+            if path in checksums:
+                sources[path]["sha256"] = checksums[path]
+            affected.update(sources[path]["days"])
+
+        # the other sources of those days, dropping (and rebuilding the days of) any that became unreadable
+        while True:
+            failed = [path for path, meta in sources.items() if affected.intersection(meta["days"]) and load(path) is None]
+            if not failed:
+                break
+            for path in failed:
+                affected.update(sources.pop(path)["days"])
+
+        for day in sorted(affected):
+            parts, source_ids = [], []
+            for path, meta in sources.items():
+                if day not in meta["days"]:
+                    continue
+                parts.append(by_day[path][day])
+                source_ids.append(np.full(len(parts[-1]), meta["id"]))
+            if not parts:
+                self._day_path(day).unlink(missing_ok=True)
+                continue
+            df = pd.concat(parts, ignore_index=True)
+            write_day(
+                self._day_path(day), day,
+                encode_hashes(df['transactionHash']),
+                self.pool_ids.assign(df['poolAddress']),
+                df['blockNumber'].to_numpy(dtype=np.int64),
+                np.concatenate(source_ids),
+            )
+        self._write_sources(sources)
+        return sorted(affected)
+
+    def source_days(self, csv_files) -> set:
+        """Days holding rows of the given (synced) CSVs."""
+        sources = self.sources()
+        return {day for f in csv_files for day in sources.get(str(Path(f).resolve()), {}).get("days", [])}
+
+    def frame(self, start=None, end=None, pools=None, days=None, with_source=False, binary=False) -> pd.DataFrame:
+        """Rows of the days between start and end (inclusive ISO dates), in the CSV columns.
+
+        days limits the read to a set of days, e.g. source_days() of the CSVs a run asked for.
+        with_source adds a categorical 'source' column with the file name of the CSV each
+        row came from (categories in name order). binary returns the binary frame layout.
+        """
+        pool_ids = None if pools is None else self.pool_ids.lookup(pools)
+        hashes, ids, blocks, day_codes, source_ids, read = [], [], [], [], [], []
+        for day in self.days():
+            if (start is not None and day < start) or (end is not None and day > end):
+                continue
+            if days is not None and day not in days:
+                continue
+            f = self.day(day)
+            rows = slice(None) if pool_ids is None else f.rows_of(pool_ids)
+            # decoded per day, so the hex text stays small
+            hashes.append(f.hashes[rows] if binary else decode_hashes(f.hashes[rows]))
+            ids.append(f.pools[rows])
+            blocks.append(f.blocks[rows])
+            source_ids.append(f.sources[rows])
+            day_codes.append(np.full(len(ids[-1]), len(read), dtype=np.int32))
+            read.append(day)
+        if not read:
+            columns = (['blockNumber'] + HASH_COLUMNS if binary else ['blockNumber', 'transactionHash'])
+            return pd.DataFrame(columns=columns + ['poolAddress', 'date'] + (['source'] if with_source else []))
+
+        ids = np.concatenate(ids)
+        day_codes = np.concatenate(day_codes)
+        if binary:
+            words = np.concatenate(hashes).view("<u8")
+            addresses = pd.Index(self.pool_ids.addresses(np.arange(len(self.pool_ids))))
+            df = pd.DataFrame({
+                'blockNumber': np.concatenate(blocks).astype(np.int64),
+                **{column: words[:, i] for i, column in enumerate(HASH_COLUMNS)},
+                'poolAddress': pd.Categorical.from_codes(ids, addresses),
+                'date': pd.Categorical.from_codes(day_codes, read, ordered=True),
+            })
+        else:
+            df = pd.DataFrame({
+                'blockNumber': np.concatenate(blocks).astype(np.int64),
+                'transactionHash': np.concatenate(hashes),
+                'poolAddress': self.pool_ids.addresses(ids),
+                'date': np.array(read, dtype=object)[day_codes],
+            })
+        if with_source:
+            names = {meta["id"]: Path(path).name for path, meta in self.sources().items()}
+            ordered = sorted(set(names.values()))
+            lookup = np.array([ordered.index(names[i]) if i in names else -1 for i in range(max(names, default=-1) + 1)])
+            df['source'] = pd.Categorical.from_codes(lookup[np.concatenate(source_ids)], ordered)
+        return df
+
+    def size(self) -> int:
+        return sum(p.stat().st_size for p in self.root.iterdir() if p.is_file())
+
+
+def read_source(path) -> pd.DataFrame:
+    df = pd.read_csv(path, usecols=['blockNumber', 'transactionHash', 'poolAddress', 'date'],
+                     dtype={'transactionHash': str, 'poolAddress': str, 'date': str})
+    df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("files", nargs="*", help=f"raw transaction CSVs (default: {DEFAULT_SOURCES})")
+    parser.add_argument("--archive", default=str(DEFAULT_ARCHIVE), help="archive directory")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.configure(args)
+
+    archive = TxArchive(args.archive)
+    files = args.files or sorted(glob.glob(DEFAULT_SOURCES))
+    try:
+        if args.command == "build":
+            start = time.perf_counter()
+            with profiling.stage("sync"):
+                days = archive.sync(files)
+            for path, e in archive.errors.items():
+                print(f"⚠️  Skipped {path}: {e}")
+            print(f"✅ {len(days)} days written from {len(files)} files in {time.perf_counter() - start:.1f}s")
+
+        days = archive.days()
+        if not days:
+            print("❌ Archive is empty")
+            return
+        rows = sum(archive.day(d).rows for d in days)
+        csv_bytes = sum(os.path.getsize(f) for f in archive.sources() if os.path.exists(f))
+        print(f"📦 {args.archive}: {len(days)} days ({days[0]} to {days[-1]}), {rows:,} transactions, "
+              f"{len(archive.pool_ids):,} pools")
+        print(f"   💾 {archive.size() / 1e6:.1f} MB archived vs {csv_bytes / 1e6:.1f} MB of CSV")
+    finally:
+        profiling.report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+TRANSACTION DEDUPLICATION
+=========================
+Drops repeated (transactionHash, poolAddress) rows across raw transaction
+files. The fetchers date blocks approximately and their backfill ranges
+overlap, so one transaction can land in several stablecoin_txs_*.csv files
+and would otherwise be counted once per copy in tx_count.
+
+Two passes over the files, in order:
+
+  1. scan    each row's key goes through a Bloom filter (~1.8 bytes a row at
+             the default 0.1% false-positive rate); rows that may have been
+             seen before only leave their 64-bit key hash behind
+  2. filter  rows whose hash is among those candidates are checked exactly
+             against the actual key strings; the first copy is kept, later
+             copies are dropped and counted against their file
+
+Memory is the filter plus one hash per candidate, so it scales to hundreds of
+millions of rows; the exact check only ever sees duplicates and the few
+false positives. Keys are taken from the binary frame layout of tx_archive.py
+(hash words and pool codes); CSV rows are converted to it on the fly.
+
+    df, report = drop_duplicates([(name, df), ...])     # frames already in memory
+    df, report = drop_duplicates([(sources, df)])       # one frame, reported per row's source
+    python tx_dedup.py updater/static/stablecoin_txs_2025-*.csv --output deduped.csv
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# profiling helpers are shared with the model CLI
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'model'))
+import profiling
+from tx_archive import HASH_COLUMNS, binary_frame
+
+KEY_COLUMNS = ['transactionHash', 'poolAddress']
+DEFAULT_ERROR_RATE = 0.001
+DEFAULT_SOURCES = str(Path(__file__).parent / 'updater' / 'static' / 'stablecoin_txs_2025-*.csv')
+
+# SipHash key (16 bytes) of the pool addresses
+_HASH_KEY = "txdedup-key-0001"
+# odd 64-bit multiplier (golden ratio) so the pool hash does not cancel the transaction hash
+_MIX = 0x9E3779B97F4A7C15
+
+# a raw CSV row is ~130 bytes; sizing the filter from file sizes with this over-estimates rows
+MIN_ROW_BYTES = 100
+
+
+def key_hashes(df, count=2):
+    """`count` independent 64-bit hashes of each row's (transactionHash, poolAddress), case-insensitive.
+
+    Transaction hashes are uniformly random already, so each of their first
+    `count` words is mixed with a hash of the pool (hashed once per pool).
+    """
+    df = binary_frame(df)
+    pools = df['poolAddress'].cat
+    pool_hash = pd.util.hash_array(np.asarray(pools.categories, dtype=object), hash_key=_HASH_KEY)
+    pool_hash = pool_hash[pools.codes.to_numpy()] * np.uint64(_MIX)
+    return tuple(df[column].to_numpy() ^ pool_hash for column in HASH_COLUMNS[:count])
+
+
+def exact_keys(df, rows):
+    """(hash bytes, lowercase pool address) of the given rows, to check candidates exactly."""
+    df = binary_frame(df)
+    words = df[HASH_COLUMNS].to_numpy()[rows]
+    pools = df['poolAddress'].cat
+    addresses = np.asarray(pools.categories, dtype=object)[pools.codes.to_numpy()[rows]]
+    return [(w.tobytes(), pool) for w, pool in zip(words, addresses)]
+
+
+class BloomFilter:
+    """Bit array with k positions per key, derived from two hashes (Kirsch-Mitzenmacher)."""
+
+    def __init__(self, capacity, error_rate=DEFAULT_ERROR_RATE):
+        capacity = max(int(capacity), 1)
+        self.bits = max(int(-capacity * np.log(error_rate) / np.log(2) ** 2), 64)
+        self.hashes = max(int(round(self.bits / capacity * np.log(2))), 1)
+        self.array = np.zeros((self.bits + 7) // 8, dtype=np.uint8)
+
+    @property
+    def nbytes(self):
+        return self.array.nbytes
+
+    def _positions(self, h1, h2):
+        h2 = h2 | np.uint64(1)
+        steps = np.arange(self.hashes, dtype=np.uint64)[:, None]
+        return (h1[None, :] + steps * h2[None, :]) % np.uint64(self.bits)
+
+    def contains(self, h1, h2) -> np.ndarray:
+        positions = self._positions(h1, h2)
+        found = (self.array[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return found.all(axis=0).astype(bool)
+
+    def add(self, h1, h2):
+        positions = np.unique(self._positions(h1, h2))
+        byte = positions >> np.uint64(3)
+        masks = np.left_shift(1, (positions & np.uint64(7)).astype(np.uint8)).astype(np.uint8)
+        # positions are sorted, so every byte's bits are one contiguous run
+        starts = np.flatnonzero(np.r_[True, byte[1:] != byte[:-1]])
+        self.array[byte[starts]] |= np.bitwise_or.reduceat(masks, starts)
+
+
+class Deduplicator:
+    """Keeps the first copy of every (transactionHash, poolAddress) over scan() then filter() passes.
+
+    Both passes must see the same rows in the same order.
+    """
+
+    def __init__(self, capacity, error_rate=DEFAULT_ERROR_RATE):
+        self.bloom = BloomFilter(capacity, error_rate)
+        self._candidates = []
+        self._seen = set()
+        self.report = {}  # name -> {'rows', 'duplicates'}
+
+    def scan(self, df):
+        h1, h2 = key_hashes(df)
+        maybe_seen = self.bloom.contains(h1, h2)
+        # copies within this chunk are not in the filter yet
+        pairs = pd.DataFrame({'h1': h1, 'h2': h2})
+        maybe_seen |= pairs.duplicated(keep='first').to_numpy()
+        self._candidates.append(h1[maybe_seen])
+        self.bloom.add(h1, h2)
+
+    def candidates(self) -> np.ndarray:
+        """Sorted unique hashes of keys that may repeat (all scans done)."""
+        if isinstance(self._candidates, list):
+            self._candidates = np.unique(np.concatenate(self._candidates or [np.empty(0, dtype=np.uint64)]))
+        return self._candidates
+
+    def filter(self, name, df) -> np.ndarray:
+        """Boolean mask of df's rows to keep; counts the dropped rows against `name`.
+
+        name is a file name, or an array / Categorical naming each row's source (e.g. its CSV file).
+        """
+        h1, = key_hashes(df, count=1)
+        keep = np.ones(len(df), dtype=bool)
+        check = np.flatnonzero(np.isin(h1, self.candidates()))
+        for row, key in zip(check, exact_keys(df, check)):
+            if key in self._seen:
+                keep[row] = False
+            else:
+                self._seen.add(key)
+
+        if isinstance(name, pd.Categorical):
+            names = pd.Series(name, copy=False)
+        else:
+            names = pd.Series(np.broadcast_to(np.asarray(name, dtype=object), len(df)), copy=False)
+        rows, dropped = names.value_counts(sort=False), names[~keep].value_counts(sort=False)
+        for source, count in rows[rows > 0].items():
+            stats = self.report.setdefault(source, {'rows': 0, 'duplicates': 0})
+            stats['rows'] += int(count)
+            stats['duplicates'] += int(dropped.get(source, 0))
+        return keep
+
+
+def drop_duplicates(frames, error_rate=DEFAULT_ERROR_RATE):
+    """(concatenated frame without repeated transactions, per-name report) of [(name, df), ...] in order."""
+    frames = list(frames)
+    dedup = Deduplicator(sum(len(df) for _, df in frames), error_rate)
+    for _, df in frames:
+        dedup.scan(df)
+    kept = [df[dedup.filter(name, df)] for name, df in frames]
+    if not kept:
+        return pd.DataFrame(columns=KEY_COLUMNS), dedup.report
+    return pd.concat(kept, ignore_index=True), dedup.report
+
+
+def print_report(report, limit=10):
+    """Files with duplicates (most first), then the total."""
+    dropped = sorted(((s['duplicates'], name) for name, s in report.items() if s['duplicates']), reverse=True)
+    for count, name in dropped[:limit]:
+        print(f"   🧹 {name}: {count:,} duplicates of {report[name]['rows']:,} rows")
+    if len(dropped) > limit:
+        print(f"   🧹 ... and {len(dropped) - limit} more sources with duplicates")
+    total = sum(count for count, _ in dropped)
+    rows = sum(s['rows'] for s in report.values())
+    print(f"   ✅ {total:,} duplicate transactions removed from {len(dropped)} of {len(report)} sources ({rows:,} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="*", help=f"raw transaction CSVs, in priority order (default: {DEFAULT_SOURCES})")
+    parser.add_argument("--output", default=None, help="write the deduplicated rows to this CSV")
+    parser.add_argument("--error_rate", type=float, default=DEFAULT_ERROR_RATE, help="Bloom filter false-positive rate")
+    parser.add_argument("--chunk_rows", type=int, default=1_000_000, help="rows read per chunk")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.configure(args)
+
+    files = args.files or sorted(glob.glob(DEFAULT_SOURCES))
+    if not files:
+        parser.error("no transaction files found")
+
+    print("=" * 80)
+    print("TRANSACTION DEDUPLICATION")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    dedup = Deduplicator(sum(os.path.getsize(f) for f in files) // MIN_ROW_BYTES, args.error_rate)
+    print(f"🌸 Bloom filter: {dedup.bloom.nbytes / 1e6:.1f} MB, {dedup.bloom.hashes} hashes")
+
+    def chunks(path):
+        return pd.read_csv(path, dtype={'transactionHash': str, 'poolAddress': str}, chunksize=args.chunk_rows)
+
+    try:
+        with profiling.stage("scan"):
+            for path in files:
+                for chunk in chunks(path):
+                    dedup.scan(chunk)
+        print(f"   🔍 {len(dedup.candidates()):,} candidate keys to verify")
+
+        with profiling.stage("filter"):
+            header = True
+            for path in files:
+                for chunk in chunks(path):
+                    keep = dedup.filter(os.path.basename(path), chunk)
+                    if args.output:
+                        chunk[keep].to_csv(args.output, mode='w' if header else 'a', header=header, index=False)
+                        header = False
+
+        print_report(dedup.report)
+        if args.output:
+            print(f"\n💾 Saved {args.output}")
+        print(f"✅ Deduplicated in {time.perf_counter() - start:.1f}s")
+    finally:
+        profiling.report()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+POOL FEATURE TABLE UPDATER
+==========================
+Maintains `pool_features`, a materialized copy of the rolling statistics the
+v_pool_features view used to recompute over all of daily_metrics on every
+query (3d/7d averages, 7d std, cumulative tx count, days since start, growth).
+
+Each run only looks at daily_metrics rows whose updated_at is newer than the
+last run. The window reaches back --overlap_minutes for rows committed late
+with an older updated_at; the keys of the rows already handled in that window
+are kept in feature_state and skipped, so the previous batch is not
+recomputed. For every pool with such rows, features are recomputed from its
+earliest changed date onward, seeded with the 6 rows before it (for the 7-day
+windows) and the last feature row before it (for the cumulative columns).
+The changed pools are staged in a temp table, so reading their rows and
+replacing their feature rows is one statement each, whatever their number.
+Training and inference then read pool_features by (pool_address, date) range.
+
+  python update_pool_features.py --dsn sqlite:///apyminer.db
+  python update_pool_features.py --dsn postgresql://... --rebuild
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import psycopg2
+    import psycopg2.extras
+except ImportError:  # only needed for Postgres targets
+    psycopg2 = None
+
+# profiling helpers are shared with the model CLI
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'model'))
+import profiling
+
+# Rows before a pool's first changed date that its 7-day windows still cover
+WINDOW_ROWS = 6
+
+FEATURE_COLUMNS = ['pool_address', 'date', 'tx_count', 'unique_users', 'tx_count_7d_avg', 'tx_count_3d_avg',
+                   'tx_count_7d_std', 'tx_count_cumulative', 'days_since_start', 'tx_growth_rate']
+
+# Valid in both PostgreSQL and SQLite
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pool_features (
+    pool_address        VARCHAR(42) NOT NULL,
+    date                DATE NOT NULL,
+    tx_count            INTEGER NOT NULL,
+    unique_users        INTEGER NOT NULL,
+    tx_count_7d_avg     DOUBLE PRECISION NOT NULL,
+    tx_count_3d_avg     DOUBLE PRECISION NOT NULL,
+    tx_count_7d_std     DOUBLE PRECISION NOT NULL,
+    tx_count_cumulative BIGINT NOT NULL,
+    days_since_start    INTEGER NOT NULL,
+    tx_growth_rate      DOUBLE PRECISION NOT NULL,
+    updated_at          TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (pool_address, date)
+);
+CREATE INDEX IF NOT EXISTS idx_pool_features_date ON pool_features(date);
+CREATE TABLE IF NOT EXISTS feature_state (
+    key     VARCHAR(64) PRIMARY KEY,
+    value   TEXT
+);
+"""
+
+
+class Database:
+    """DB-API connection to Postgres or SQLite; queries are written with ? placeholders."""
+
+    def __init__(self, dsn):
+        if dsn.startswith('sqlite:///'):
+            self.conn = sqlite3.connect(dsn[len('sqlite:///'):])
+            self.placeholder = '?'
+        else:
+            if psycopg2 is None:
+                raise RuntimeError("Postgres targets need psycopg2 (pip install psycopg2-binary)")
+            self.conn = psycopg2.connect(dsn)
+            self.placeholder = '%s'
+
+    def execute(self, sql, params=()):
+        cur = self.conn.cursor()
+        cur.execute(sql.replace('?', self.placeholder), params)
+        return cur
+
+    def executemany(self, sql, rows):
+        cur = self.conn.cursor()
+        if self.placeholder == '%s':
+            # executemany is one round trip per row in psycopg2
+            psycopg2.extras.execute_batch(cur, sql.replace('?', '%s'), list(rows), page_size=1000)
+        else:
+            cur.executemany(sql, rows)
+        return cur
+
+    def frame(self, sql, params=()):
+        cur = self.execute(sql, params)
+        return pd.DataFrame(cur.fetchall(), columns=[d[0] for d in cur.description])
+
+    def init_schema(self):
+        for statement in SCHEMA.split(';'):
+            if statement.strip():
+                self.execute(statement)
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def read_state(db, key):
+    row = db.execute("SELECT value FROM feature_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def write_state(db, key, value):
+    db.execute("DELETE FROM feature_state WHERE key = ?", (key,))
+    db.execute("INSERT INTO feature_state (key, value) VALUES (?, ?)", (key, value))
+
+
+def changed_pools(db, since, processed):
+    """{pool_address: earliest changed date} of daily_metrics rows updated after `since`, the new
+    watermark, and the row keys (pool_address, date, updated_at, tx_count, unique_users).
+
+    Rows whose key is in `processed` were handled by an earlier run (the overlap window
+    re-selects them) and are skipped; a row written again gets a new updated_at or new
+    values (timestamps can be as coarse as a second), so it is not.
+    """
+    where, params = "", ()
+    if since is not None:
+        where, params = "WHERE updated_at > ?", (since,)
+    df = db.frame(f"SELECT pool_address, date, updated_at, tx_count, unique_users FROM daily_metrics {where}", params)
+    if df.empty:
+        return {}, None, []
+    keys = list(zip(df['pool_address'].tolist(), df['date'].astype(str).tolist(), df['updated_at'].astype(str).tolist(),
+                    df['tx_count'].astype(int).tolist(), df['unique_users'].astype(int).tolist()))
+    new = df[[key not in processed for key in keys]]
+    pools = new.groupby('pool_address')['date'].min().astype(str).to_dict()
+    return pools, str(df['updated_at'].max()), keys
+
+
+def stage_pools(db, pools):
+    """Load {pool_address: since} into the session's changed_pools temp table, with the date of
+    the WINDOW_ROWS-th daily_metrics row before `since` (where each pool's windows start)."""
+    db.execute("CREATE TEMPORARY TABLE IF NOT EXISTS changed_pools "
+               "(pool_address VARCHAR(42) PRIMARY KEY, since DATE NOT NULL, start DATE)")
+    db.execute("DELETE FROM changed_pools")
+    db.executemany("INSERT INTO changed_pools (pool_address, since, start) VALUES (?, ?, ?)",
+                   ((pool, since, since) for pool, since in pools.items()))
+    # through the (pool_address, date) index rather than by ranking each pool's whole history
+    db.execute(
+        "UPDATE changed_pools SET start = COALESCE(("
+        "  SELECT MIN(w.date) FROM (SELECT m.date FROM daily_metrics m"
+        "    WHERE m.pool_address = changed_pools.pool_address AND m.date < changed_pools.since"
+        "    ORDER BY m.date DESC LIMIT ?) w"
+        "), since)", (WINDOW_ROWS,),
+    )
+
+
+def pool_tails(db):
+    """daily_metrics rows of the staged pools from their window start on (those before `since`
+    flagged context), ordered by pool and date, and the (tx_count_cumulative, days_since_start)
+    of each pool's feature row before `since`, indexed by pool_address."""
+    rows = db.frame(
+        "SELECT m.pool_address, m.date, m.tx_count, m.unique_users,"
+        "       CASE WHEN m.date < c.since THEN 1 ELSE 0 END AS context "
+        "FROM changed_pools c JOIN daily_metrics m ON m.pool_address = c.pool_address AND m.date >= c.start "
+        "ORDER BY m.pool_address, m.date",
+    )
+    base = db.frame(
+        "SELECT c.pool_address,"
+        "  (SELECT f.tx_count_cumulative FROM pool_features f WHERE f.pool_address = c.pool_address AND f.date < c.since"
+        "   ORDER BY f.date DESC LIMIT 1) AS tx_count_cumulative,"
+        "  (SELECT f.days_since_start FROM pool_features f WHERE f.pool_address = c.pool_address AND f.date < c.since"
+        "   ORDER BY f.date DESC LIMIT 1) AS days_since_start "
+        "FROM changed_pools c",
+    )
+    return rows, base.set_index('pool_address')
+
+
+def compute_features(rows, base):
+    """Feature rows for the non-context rows, matching the v_pool_features definitions.
+
+    rows are the pools' metrics ordered by pool and date, the context ones of which only
+    feed the windows; base holds the (tx_count_cumulative, days_since_start) of the
+    feature row before them per pool, missing if the pool starts here.
+    """
+    pool = rows['pool_address']
+    tx = rows['tx_count'].astype(np.float64)
+    by_pool = tx.groupby(pool, sort=False)
+
+    def rolling(window, stat):
+        # AVG / STDDEV OVER (PARTITION BY pool_address ROWS BETWEEN n PRECEDING AND CURRENT ROW)
+        return getattr(by_pool.rolling(window, min_periods=1), stat)().reset_index(level=0, drop=True)
+
+    df = pd.DataFrame({
+        'pool_address': pool,
+        'date': rows['date'].astype(str),
+        'tx_count': rows['tx_count'].astype(np.int64),
+        'unique_users': rows['unique_users'].astype(np.int64),
+        'tx_count_7d_avg': rolling(7, 'mean'),
+        'tx_count_3d_avg': rolling(3, 'mean'),
+        'tx_count_7d_std': rolling(7, 'std').fillna(0),  # STDDEV is the sample std
+    })
+    prev = by_pool.shift(1)
+    df['tx_growth_rate'] = np.where(prev > 0, (tx - prev) / prev, 0.0)
+
+    df = df[rows['context'].to_numpy() == 0].copy()
+    seed = base.reindex(df['pool_address']).fillna(0).astype(np.int64)
+    by_pool = df.groupby('pool_address', sort=False)
+    df['tx_count_cumulative'] = seed['tx_count_cumulative'].to_numpy() + by_pool['tx_count'].cumsum()
+    df['days_since_start'] = seed['days_since_start'].to_numpy() + by_pool.cumcount() + 1
+    return df
+
+
+def update(db, rebuild=False, overlap_minutes=10):
+    """Bring pool_features up to date with daily_metrics; returns (pools, rows) written."""
+    since = None if rebuild else read_state(db, 'daily_metrics_updated_at')
+    processed = set()
+    if since is not None:
+        # rows committed late by a transaction that started earlier carry an older updated_at, so the
+        # window reaches back overlap_minutes; the keys handled there last time are skipped
+        since = (datetime.fromisoformat(since) - timedelta(minutes=overlap_minutes)).isoformat(sep=' ')
+        processed = {tuple(key) for key in json.loads(read_state(db, 'processed_keys') or '[]')}
+
+    with profiling.stage("changes"):
+        pools, watermark, keys = changed_pools(db, since, processed)
+    if watermark is not None:
+        # remember the keys the next run's overlap window will select again (bounded by the window)
+        tail = (datetime.fromisoformat(watermark) - timedelta(minutes=overlap_minutes)).isoformat(sep=' ')
+        tail_keys = [key for key in keys if key[2] > tail]
+    if not pools:
+        if watermark is not None:
+            write_state(db, 'daily_metrics_updated_at', watermark)
+            write_state(db, 'processed_keys', json.dumps(tail_keys))
+            db.conn.commit()
+        return 0, 0
+
+    with profiling.stage("compute") as s:
+        stage_pools(db, pools)
+        rows, base = pool_tails(db)
+        df = compute_features(rows, base)
+        s.frame(df)
+
+    with profiling.stage("write"):
+        if rebuild:
+            db.execute("DELETE FROM pool_features")
+        else:
+            db.execute("DELETE FROM pool_features WHERE EXISTS (SELECT 1 FROM changed_pools c "
+                       "WHERE c.pool_address = pool_features.pool_address AND pool_features.date >= c.since)")
+        db.executemany(
+            f"INSERT INTO pool_features ({', '.join(FEATURE_COLUMNS)}) VALUES ({', '.join('?' * len(FEATURE_COLUMNS))})",
+            df[FEATURE_COLUMNS].astype(object).itertuples(index=False, name=None),
+        )
+        write_state(db, 'daily_metrics_updated_at', watermark)
+        write_state(db, 'processed_keys', json.dumps(tail_keys))
+        db.conn.commit()
+    return len(pools), len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dsn", default=os.environ.get('DATABASE_URL'),
+                        help="Postgres DSN or sqlite:///path.db (default: $DATABASE_URL)")
+    parser.add_argument("--rebuild", action="store_true", help="recompute every pool from its first day")
+    parser.add_argument("--overlap_minutes", type=int, default=10,
+                        help="re-check rows updated this long before the last run")
+    profiling.add_arguments(parser)
+    args = parser.parse_args()
+    profiling.configure(args)
+    if not args.dsn:
+        parser.error("--dsn or DATABASE_URL is required")
+
+    print("=" * 80)
+    print("POOL FEATURE TABLE UPDATER")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    db = Database(args.dsn)
+    try:
+        db.init_schema()
+        pools, rows = update(db, args.rebuild, args.overlap_minutes)
+        print(f"   🏊 {pools:,} pools changed, {rows:,} feature rows written")
+        print(f"\n✅ Updated in {time.perf_counter() - start:.1f}s")
+    finally:
+        db.close()
+        profiling.report()
+
+if __name__ == "__main__":
+    main()
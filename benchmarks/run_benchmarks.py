@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+PIPELINE BENCHMARKS
+===================
+Times and memory-profiles the hot paths of the model, the data processors and
+the API on synthetic data, writes the results as JSON, and flags regressions
+against a saved baseline.
+
+    python run_benchmarks.py --pools 500 --days 120 --output results.json
+    python run_benchmarks.py --save_baseline            # writes baseline.json
+    python run_benchmarks.py --baseline baseline.json   # exit code 1 on regression
+
+Each benchmark runs `--repeat` timed iterations (no tracing) plus one extra
+iteration under tracemalloc to record peak Python/numpy allocation.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import synthetic_data
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR / "model"))
+sys.path.insert(0, str(REPO_DIR / "apy-data-miner"))
+sys.path.insert(0, str(REPO_DIR / "dashboard" / "backend"))
+
+import hermetik_model
+import process_stablecoin_transactions as processor
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+
+class Benchmark:
+    """A named callable with an untimed setup that returns the call's arguments."""
+
+    def __init__(self, name, func, setup=lambda: ()):
+        self.name = name
+        self.func = func
+        self.setup = setup
+
+    def run_once(self):
+        args = self.setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            self.func(*args)
+            return time.perf_counter() - start
+
+    def peak_memory(self):
+        args = self.setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            tracemalloc.start()
+            self.func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return peak
+
+
+def build_benchmarks(work_dir, n_pools, n_days, n_raw_pools, n_raw_days, seed):
+    """Prepare synthetic inputs (and a trained model) in work_dir and list the benchmarks."""
+    df_dataset = synthetic_data.make_pool_dataset(n_pools, n_days, seed)
+    df_raw = synthetic_data.make_raw_transactions(n_raw_pools, n_raw_days, seed)
+    df_dataset.to_csv(work_dir / "pool_dataset_latest.csv", index=False)
+
+    # hermetik_model reads and writes its files relative to the working directory
+    os.chdir(work_dir)
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        hermetik_model.train_model(max_lag=7, forecast_horizon=1)
+
+        df_filtered = hermetik_model.filter_dataset(df_dataset)
+        df_features = hermetik_model.build_features(df_filtered.copy(), 7, False)
+        df_daily = processor.calculate_daily_metrics(df_raw)
+        df_daily = processor.add_pool_metadata(df_daily)
+
+    from fastapi.testclient import TestClient
+    from app import main as api
+
+    api.DATA_DIR = work_dir
+    api.MODEL_DIR = work_dir
+    client = TestClient(api.app)
+
+    def clear_api_caches():
+        for cache in (api.model_cache, api.pool_ids_cache, api.pool_table_cache, api.dataset_cache, api.version_cache):
+            cache.clear()
+        return ()
+
+    def post_predict():
+        response = client.post("/api/predict", json={"max_lag": 7, "forecast_horizon": 1, "top_n": 10})
+        response.raise_for_status()
+
+    return [
+        Benchmark("model.filter_dataset", hermetik_model.filter_dataset, lambda: (df_dataset,)),
+        Benchmark("model.build_features", lambda df: hermetik_model.build_features(df, 7, False),
+                  lambda: (df_filtered.copy(),)),
+        Benchmark("model.build_targets", lambda df: hermetik_model.build_targets(df, 1),
+                  lambda: (df_features.copy(),)),
+        Benchmark("model.predict", lambda: hermetik_model.predict(7, 1)),
+        Benchmark("miner.calculate_daily_metrics", processor.calculate_daily_metrics, lambda: (df_raw,)),
+        Benchmark("miner.calculate_rolling_metrics", processor.calculate_rolling_metrics, lambda: (df_daily,)),
+        Benchmark("api.predict_cold", post_predict, clear_api_caches),
+        Benchmark("api.predict_warm", post_predict),
+    ]
+
+
+def run(benchmarks, repeat, only=None):
+    results = {}
+    for bench in benchmarks:
+        if only and not any(pattern in bench.name for pattern in only):
+            continue
+        bench.run_once()  # warm-up
+        times = [bench.run_once() for _ in range(repeat)]
+        peak = bench.peak_memory()
+        results[bench.name] = {
+            "median_s": statistics.median(times),
+            "min_s": min(times),
+            "mean_s": statistics.fmean(times),
+            "repeats": repeat,
+            "peak_mem_mb": peak / 2**20,
+        }
+        print(f"  {bench.name:<34} median {results[bench.name]['median_s'] * 1000:>9.2f} ms"
+              f"   peak {results[bench.name]['peak_mem_mb']:>8.2f} MB")
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Return the benchmarks whose median time or peak memory grew by more than threshold."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        for key in ("median_s", "peak_mem_mb"):
+            if previous[key] > 0 and current[key] > previous[key] * (1 + threshold):
+                regressions.append((name, key, previous[key], current[key]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model, processor and API hot paths.")
+    parser.add_argument("--pools", type=int, default=200, help="pools in the synthetic pool dataset")
+    parser.add_argument("--days", type=int, default=90, help="days in the synthetic pool dataset")
+    parser.add_argument("--raw_pools", type=int, default=30, help="pools in the synthetic raw transactions")
+    parser.add_argument("--raw_days", type=int, default=30, help="days in the synthetic raw transactions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="run benchmarks whose name contains any of these")
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    parser.add_argument("--baseline", type=Path, help="compare against this results JSON")
+    parser.add_argument("--save_baseline", action="store_true", help=f"write results to {DEFAULT_BASELINE}")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    params = {"pools": args.pools, "days": args.days, "raw_pools": args.raw_pools,
+              "raw_days": args.raw_days, "seed": args.seed}
+    output = args.output.resolve() if args.output else None
+    baseline_path = args.baseline.resolve() if args.baseline else None
+
+    print("=" * 80)
+    print("PIPELINE BENCHMARKS")
+    print("=" * 80)
+    print(f"   {params}")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            benchmarks = build_benchmarks(Path(tmp), args.pools, args.days, args.raw_pools, args.raw_days, args.seed)
+            results = run(benchmarks, args.repeat, args.only)
+        finally:
+            os.chdir(cwd)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "params": params,
+        },
+        "results": results,
+    }
+
+    for path in filter(None, [output, DEFAULT_BASELINE if args.save_baseline else None]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+        print(f"\n💾 Saved results: {path}")
+
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"]["params"] != params:
+            print(f"\n⚠️  Baseline was recorded with {baseline['meta']['params']}; comparison may be meaningless")
+
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for name, key, before, after in regressions:
+                print(f"   {name:<34} {key:<12} {before:.4g} -> {after:.4g} ({after / before - 1:+.0%})")
+            sys.exit(1)
+        print(f"\n✅ No regressions over {args.threshold:.0%} against {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
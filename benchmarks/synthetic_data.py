@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+SYNTHETIC DATASET GENERATOR
+===========================
+Synthetic data that mimics the project's CSV layouts, from benchmark-sized
+frames up to 10x-100x production scale (~6k pools x 365 days).
+
+- pool dataset:      pool_dataset_latest.csv (one row per pool per day)
+- raw transactions:  stablecoin_txs_YYYY-MM-DD.csv
+                     (blockNumber,transactionHash,poolAddress,date)
+
+Pools have heavy-tailed activity with a random-walk trend, weekly seasonality
+and occasional bursts; some pools appear or disappear mid-range and some miss
+individual days. Fee tiers and pool types follow infrastructure/schema.sql.
+Both outputs are generated one day at a time from the same seeded stream, so
+memory is O(pools) and the raw transactions of a seed aggregate exactly to the
+tx_count column of the pool dataset for that seed.
+
+Usage:
+    python synthetic_data.py pool_dataset --pools 60000 --days 365 --output synthetic/pool_dataset_latest.csv
+    python synthetic_data.py raw_transactions --pools 6000 --days 30 --output_dir synthetic/static
+"""
+
+import argparse
+import time
+import warnings
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+START_DATE = "2025-01-01"
+START_BLOCK = 21_525_000  # first Ethereum block of 2025-01-01 (approx.)
+BLOCKS_PER_DAY = 7_200
+PRODUCTION_POOLS = 6_000
+PRODUCTION_DAYS = 365
+
+# schema.sql: fee_tier 500 = 0.05%, 3000 = 0.3%, 10000 = 1%; pool_type CHECK constraint
+FEE_TIERS = np.array([500, 3000, 10000])
+POOL_TYPES = np.array(["stablecoin", "eth_paired", "other"])
+SYMBOLS = np.array(["USDC", "USDT", "DAI", "WETH", "WBTC", "FRAX", "USDE", "PYUSD", "GHO", "LINK"])
+
+ROLLING_DAYS = 7
+TARGET_HORIZONS = (3, 7)
+
+
+def random_hex(rng, n, n_bytes):
+    """n random 0x-prefixed hex strings of n_bytes bytes (vectorized)."""
+    raw = rng.bytes(n * n_bytes).hex().encode()
+    return np.char.add("0x", np.frombuffer(raw, dtype=f"S{2 * n_bytes}").astype(str))
+
+
+class PoolUniverse:
+    """Per-pool attributes drawn once: metadata, activity level, lifetime and dropout rate."""
+
+    def __init__(self, n_pools, n_days, seed=0):
+        rng = np.random.default_rng(seed)
+        self.n_pools = n_pools
+        self.n_days = n_days
+        self.seed = seed
+
+        token0 = rng.choice(SYMBOLS, n_pools)
+        token1 = rng.choice(SYMBOLS, n_pools)
+        fee = rng.choice(FEE_TIERS, n_pools, p=[0.5, 0.4, 0.1])
+        meta = pd.DataFrame({
+            "poolAddress": random_hex(rng, n_pools, 20),
+            "pool_name": np.char.add(np.char.add(token0, "/"), token1),
+            "token0Symbol": token0,
+            "token1Symbol": token1,
+            "fee": fee,
+            "fee_percentage": fee / 1_000_000,
+            "poolType": rng.choice(POOL_TYPES, n_pools, p=[0.3, 0.5, 0.2]),
+        })
+        # Rows are emitted per day in address order, like the exported dataset
+        order = np.argsort(meta["poolAddress"].to_numpy())
+        self.meta = meta.iloc[order].reset_index(drop=True)
+
+        # Heavy-tailed mean daily activity (lognormal body, Pareto tail for the top pools)
+        base = rng.lognormal(mean=2.5, sigma=1.5, size=n_pools)
+        whales = rng.random(n_pools) < 0.01
+        base[whales] *= rng.pareto(1.5, whales.sum()) + 10
+        self.base_tx = base
+
+        # Lifetimes: some pools launch after the start, some go quiet before the end
+        self.first_day = np.where(rng.random(n_pools) < 0.2, rng.integers(0, n_days, n_pools), 0)
+        self.last_day = np.where(rng.random(n_pools) < 0.15, rng.integers(0, n_days, n_pools), n_days - 1)
+        self.last_day = np.maximum(self.last_day, self.first_day)
+
+        # Most pools report every day; a minority miss days at random
+        self.dropout = np.where(rng.random(n_pools) < 0.2, rng.uniform(0.01, 0.2, n_pools), 0.0)
+
+    def dates(self):
+        return pd.date_range(START_DATE, periods=self.n_days).strftime("%Y-%m-%d").to_numpy()
+
+
+def iter_daily_counts(universe):
+    """Yield (day, tx counts, present mask) one day at a time."""
+    rng = np.random.default_rng(universe.seed + 1)
+    trend = np.zeros(universe.n_pools)
+    for day in range(universe.n_days):
+        trend += rng.normal(0, 0.05, universe.n_pools)
+        season = 1 + 0.1 * np.sin(2 * np.pi * day / 7)
+        burst = np.where(rng.random(universe.n_pools) < 0.01, rng.lognormal(1.0, 0.5, universe.n_pools), 1.0)
+        counts = rng.poisson(universe.base_tx * np.exp(trend) * season * burst)
+
+        alive = (universe.first_day <= day) & (day <= universe.last_day)
+        present = alive & (rng.random(universe.n_pools) >= universe.dropout)
+        yield day, np.where(present, counts, 0), present
+
+
+def iter_pool_dataset(n_pools=200, n_days=90, seed=0, universe=None):
+    """Yield the pool dataset one day (one DataFrame) at a time.
+
+    Rolling statistics use the last ROLLING_DAYS observed rows per pool, like
+    the v_pool_features view; targets look TARGET_HORIZONS days ahead by date.
+    """
+    universe = universe or PoolUniverse(n_pools, n_days, seed)
+    n_pools = universe.n_pools
+    dates = universe.dates()
+    users_rng = np.random.default_rng(universe.seed + 2)
+
+    window = np.full((n_pools, ROLLING_DAYS), np.nan)  # last observed counts, newest last
+    cumulative = np.zeros(n_pools, dtype=np.int64)
+    n_observed = np.zeros(n_pools, dtype=np.int64)
+    prev_count = np.full(n_pools, np.nan)
+
+    lookahead = max(TARGET_HORIZONS)
+    pending = deque()
+    source = iter_daily_counts(universe)
+    for item in source:
+        pending.append(item)
+        if len(pending) <= lookahead:
+            continue
+        yield _dataset_day(universe, dates, pending, window, cumulative, n_observed, prev_count, users_rng)
+        pending.popleft()
+    while pending:
+        yield _dataset_day(universe, dates, pending, window, cumulative, n_observed, prev_count, users_rng)
+        pending.popleft()
+
+
+def _dataset_day(universe, dates, pending, window, cumulative, n_observed, prev_count, users_rng):
+    day, counts, present = pending[0]
+
+    window[present] = np.roll(window[present], -1, axis=1)
+    window[present, -1] = counts[present]
+    cumulative[present] += counts[present]
+    n_observed[present] += 1
+
+    rows = np.flatnonzero(present)
+    tx = counts[rows]
+    recent = window[rows]
+    prev = prev_count[rows]
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # std of a single observation
+        growth = np.where(prev > 0, (tx - prev) / prev, 0.0)
+        std_7d = np.nanstd(recent, axis=1, ddof=1)
+    prev_count[present] = counts[present]
+
+    df = universe.meta.iloc[rows].reset_index(drop=True)
+    df.insert(1, "date", dates[day])
+    df["tx_count"] = tx
+    df["unique_users"] = users_rng.binomial(tx, 0.85)
+    df["tx_count_3d_avg"] = np.nanmean(recent[:, -3:], axis=1)
+    df["tx_count_7d_avg"] = np.nanmean(recent, axis=1)
+    df["tx_count_7d_std"] = np.nan_to_num(std_7d)
+    df["tx_count_cumulative"] = cumulative[rows]
+    df["days_since_start"] = n_observed[rows] - 1
+    df["day_number"] = n_observed[rows]
+    df["tx_growth_rate"] = growth
+    for horizon in TARGET_HORIZONS:
+        if horizon < len(pending):
+            _, future_counts, future_present = pending[horizon]
+            target = np.where(future_present[rows], future_counts[rows], np.nan)
+        else:
+            target = np.full(len(rows), np.nan)
+        df[f"target_tx_{horizon}d_ahead"] = target
+    return df
+
+
+def iter_raw_transactions(n_pools=50, n_days=30, seed=0, chunk_rows=1_000_000, universe=None):
+    """Yield (date, DataFrame) chunks of raw transactions, at most chunk_rows rows each."""
+    universe = universe or PoolUniverse(n_pools, n_days, seed)
+    dates = universe.dates()
+    addresses = universe.meta["poolAddress"].to_numpy()
+    rng = np.random.default_rng(universe.seed + 3)
+
+    for day, counts, _ in iter_daily_counts(universe):
+        pool_idx = np.repeat(np.arange(universe.n_pools), counts)
+        for start in range(0, len(pool_idx), chunk_rows):
+            chunk_idx = pool_idx[start:start + chunk_rows]
+            n = len(chunk_idx)
+            block = START_BLOCK + day * BLOCKS_PER_DAY + rng.integers(0, BLOCKS_PER_DAY, n)
+            order = np.argsort(block, kind="stable")
+            yield dates[day], pd.DataFrame({
+                "blockNumber": block[order],
+                "transactionHash": random_hex(rng, n, 32),
+                "poolAddress": addresses[chunk_idx[order]],
+                "date": dates[day],
+            })
+
+
+def make_pool_dataset(n_pools=200, n_days=90, seed=0):
+    """The whole pool dataset in memory, sorted by (date, poolAddress)."""
+    return pd.concat(iter_pool_dataset(n_pools, n_days, seed), ignore_index=True)
+
+
+def make_raw_transactions(n_pools=50, n_days=30, seed=0):
+    """All raw transactions in memory, like the concatenated stablecoin_txs_*.csv files."""
+    return pd.concat([chunk for _, chunk in iter_raw_transactions(n_pools, n_days, seed)], ignore_index=True)
+
+
+def write_pool_dataset(path, n_pools, n_days, seed=0):
+    """Stream the pool dataset to one CSV, a day at a time."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    n_rows = 0
+    with open(path, "w", newline="") as f:
+        for df in iter_pool_dataset(n_pools, n_days, seed):
+            df.to_csv(f, header=n_rows == 0, index=False)
+            n_rows += len(df)
+    return n_rows
+
+
+def write_raw_transactions(output_dir, n_pools, n_days, seed=0, chunk_rows=1_000_000):
+    """Stream raw transactions to one stablecoin_txs_YYYY-MM-DD.csv per day."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    n_rows = 0
+    current_date, f = None, None
+    try:
+        for date, chunk in iter_raw_transactions(n_pools, n_days, seed, chunk_rows):
+            if date != current_date:
+                if f is not None:
+                    f.close()
+                f = open(output_dir / f"stablecoin_txs_{date}.csv", "w", newline="")
+                chunk.to_csv(f, index=False)
+                current_date = date
+            else:
+                chunk.to_csv(f, header=False, index=False)
+            n_rows += len(chunk)
+    finally:
+        if f is not None:
+            f.close()
+    return n_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic pool datasets and raw transactions.")
+    parser.add_argument("command", choices=["pool_dataset", "raw_transactions"])
+    parser.add_argument("--pools", type=int, default=PRODUCTION_POOLS)
+    parser.add_argument("--days", type=int, default=PRODUCTION_DAYS)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply --pools (10 = 10x production)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=Path("synthetic/pool_dataset_latest.csv"))
+    parser.add_argument("--output_dir", type=Path, default=Path("synthetic/static"))
+    parser.add_argument("--chunk_rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    n_pools = int(args.pools * args.scale)
+    start = time.perf_counter()
+    print(f"🧪 Generating {args.command} for {n_pools:,} pools x {args.days} days (seed {args.seed})...")
+
+    if args.command == "pool_dataset":
+        n_rows = write_pool_dataset(args.output, n_pools, args.days, args.seed)
+        print(f"   ✅ Wrote {n_rows:,} rows to {args.output}")
+    else:
+        n_rows = write_raw_transactions(args.output_dir, n_pools, args.days, args.seed, args.chunk_rows)
+        print(f"   ✅ Wrote {n_rows:,} transactions to {args.output_dir}/stablecoin_txs_*.csv")
+
+    print(f"   ⏱️  {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
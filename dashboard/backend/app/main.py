@@ -1,12 +1,32 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 from typing import Optional
+from email.utils import formatdate, parsedate_to_datetime
 import pandas as pd
 import numpy as np
 import joblib
+import pyarrow as pa
+import asyncio
+import hashlib
+import io
 import json
+import os
+import sys
+import time
+from datetime import date
 from pathlib import Path
+from app.metrics import MODEL_LOAD, finish_request, record_cache, render_metrics, stage, start_request
+from app.shared_data import SharedStore
+
+# The pool id dictionary is shared with the trainer (model/pool_ids.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent / "model"))
+from pool_ids import PoolIds
+from pool_store import PoolStore
+from prediction_store import PredictionStore, evaluate
+from ranking import segment_top_k, top_k
+import user_sketch
 
 app = FastAPI(title="APY Prediction API", version="1.0.0")
 
@@ -17,21 +37,103 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified"],
 )
 
 # Paths
 MODEL_DIR = Path(__file__).parent.parent.parent.parent / "model"
 DATA_DIR = Path(__file__).parent.parent.parent.parent
 
+# Directory published by `python -m app.shared_data serve`; when set, workers map the
+# dataset and latest feature matrices from it instead of parsing the CSV themselves
+SHARED_DIR = os.environ.get("APY_SHARED_DIR")
+shared_store = SharedStore(Path(SHARED_DIR)) if SHARED_DIR else None
+
+# Optional embedded SQLite copy of the dataset (model/pool_store.py), rebuilt when the CSV
+# changes; when set, pool lists, histories and date ranges are indexed queries instead of
+# scans of the parsed CSV
+DB_PATH = os.environ.get("APY_DB_PATH")
+pool_store = PoolStore(Path(DB_PATH)) if DB_PATH else None
+
+# Seconds a client may reuse a response before revalidating it with its ETag
+CACHE_MAX_AGE = 60
+
+# Rows per chunk written by the streaming export
+EXPORT_CHUNK_ROWS = 10_000
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# Push channel: seconds between input-version checks, SSE keep-alives, and
+# the number of undelivered events a slow client may queue before being resynced
+PUSH_POLL_SECONDS = 30
+PUSH_HEARTBEAT_SECONDS = 15
+PUSH_QUEUE_SIZE = 16
+
+# Dataset columns /api/predict can segment its top-K by
+SEGMENT_COLUMNS = ("poolType", "fee", "fee_percentage")
+
+# Rolling-mean windows (days) of the growth-rate features
+ROLLING_WINDOWS = (3, 5, 7, 14)
+
+# /api/score request limits: body size, scenarios per request and days per series
+SCORE_MAX_BODY_BYTES = 64 * 1024 * 1024
+SCORE_MAX_SCENARIOS = 50_000
+SCORE_MAX_SERIES_DAYS = 366
+
+# Longest window /api/pool/{address}/unique_users merges sketches over
+UNIQUE_USERS_MAX_DAYS = 366
+
 # Global model cache
 model_cache = {}
-contracts_cache = {}
+# Pool id dictionaries, keyed by model directory
+pool_ids_cache = {}
+# Per-pool metadata arrays indexed by contract id, keyed by dataset path
+pool_table_cache = {}
+
+# Dataset column -> PoolPrediction field joined onto predictions by contract id
+POOL_METADATA_FIELDS = {
+    "pool_name": "pool_name",
+    "token0Symbol": "token0_symbol",
+    "token1Symbol": "token1_symbol",
+    "fee": "fee",
+    "poolType": "pool_type",
+}
+
+# Parsed dataset and file content hashes, keyed by path and invalidated on (mtime, size) change
+dataset_cache = {}
+version_cache = {}
 
 
 class PredictionRequest(BaseModel):
     max_lag: int = 7
     forecast_horizon: int = 1
-    top_n: int = 10
+    top_n: int = Field(10, ge=1)
+    # also return the top_n pools within each value of this column
+    segment_by: Optional[str] = None
+
+
+class ScenarioSeries(BaseModel):
+    # daily tx counts, oldest first; the scenario is scored on the last day
+    tx_count: list[float]
+    # date of the last day (default: today)
+    date: Optional[str] = None
+    # existing pool the scenario is based on, for its contract id
+    pool_address: Optional[str] = None
+    fee_percentage: Optional[float] = None
+    tx_count_cumulative: Optional[float] = None
+    day_number: Optional[float] = None
+
+
+class ScenarioRequest(BaseModel):
+    max_lag: int = 7
+    forecast_horizon: int = 1
+    # hypothetical histories, turned into features by the same rules as the dataset
+    series: list[ScenarioSeries] = []
+    # ready-made feature rows, column-oriented: {feature: one value per row}
+    features: Optional[dict[str, list[Optional[float]]]] = None
 
 
 class PoolPrediction(BaseModel):
@@ -40,6 +142,11 @@ class PoolPrediction(BaseModel):
     predicted_growth_rate: float
     current_tx_count: Optional[float] = None
     fee_percentage: Optional[float] = None
+    pool_name: Optional[str] = None
+    token0_symbol: Optional[str] = None
+    token1_symbol: Optional[str] = None
+    fee: Optional[float] = None
+    pool_type: Optional[str] = None
 
 
 class PredictionResponse(BaseModel):
@@ -47,44 +154,169 @@ class PredictionResponse(BaseModel):
     prediction_date: str
     forecast_horizon: int
     total_pools: int
+    segments: Optional[dict[str, list[PoolPrediction]]] = None
 
 
-def load_contracts_mapping(max_lag: int) -> dict:
-    """Load contracts mapping from JSON."""
-    if max_lag in contracts_cache:
-        return contracts_cache[max_lag]
+def file_stamp(path: Path) -> tuple:
+    """Cheap change detector for a file: (mtime_ns, size)."""
+    stat = path.stat()
+    return (stat.st_mtime_ns, stat.st_size)
 
-    contracts_path = MODEL_DIR / f"contracts_{max_lag}.json"
-    if not contracts_path.exists():
-        return {}
 
-    with open(contracts_path, "r") as f:
-        contracts = json.load(f)
+def file_version(path: Path) -> str:
+    """Content hash of a file, recomputed only when its (mtime, size) changes."""
+    stamp = file_stamp(path)
+    cached = version_cache.get(str(path))
+    if cached and cached[0] == stamp:
+        return cached[1]
 
-    # Reverse mapping: int -> address
-    reverse_contracts = {v: k for k, v in contracts.items()}
-    contracts_cache[max_lag] = reverse_contracts
-    return reverse_contracts
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    version_cache[str(path)] = (stamp, digest.hexdigest())
+    return digest.hexdigest()
 
 
-def load_model(max_lag: int, forecast_horizon: int):
-    """Load trained model from disk."""
-    cache_key = f"{forecast_horizon}_{max_lag}"
-    if cache_key in model_cache:
-        return model_cache[cache_key]
+def get_data_path() -> Path:
+    """Locate pool_dataset_latest.csv at the repo root or in the apy-data-miner exports."""
+    data_path = DATA_DIR / "pool_dataset_latest.csv"
+    if not data_path.exists():
+        data_path = DATA_DIR / "apy-data-miner" / "exports" / "pool_dataset_latest.csv"
 
+    if not data_path.exists():
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    return data_path
+
+
+def get_model_path(max_lag: int, forecast_horizon: int) -> Path:
     model_path = MODEL_DIR / f"growth_model_{forecast_horizon}_{max_lag}.pkl"
     if not model_path.exists():
         raise HTTPException(
             status_code=404,
             detail=f"Model not found. Train first with: python hermetik_model.py train --forecast_horizon {forecast_horizon} --max_lag {max_lag}"
         )
+    return model_path
+
+
+def load_dataset(data_path: Path) -> pd.DataFrame:
+    """Read the dataset CSV, reusing the parsed frame until the file changes."""
+    stamp = file_stamp(data_path)
+    if shared_store is not None:
+        df = shared_store.dataset(stamp)
+        record_cache("shared_dataset", df is not None)
+        if df is not None:
+            return df
+
+    cached = dataset_cache.get(str(data_path))
+    record_cache("dataset", bool(cached and cached[0] == stamp))
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    with stage("csv_load"):
+        df = pd.read_csv(data_path)
+    dataset_cache[str(data_path)] = (stamp, df)
+    return df
+
+
+def get_pool_store(data_path: Path) -> Optional[PoolStore]:
+    """The embedded store, synced with the dataset CSV; None when APY_DB_PATH is not set."""
+    if pool_store is None:
+        return None
+    with stage("store_sync"):
+        pool_store.sync(data_path)
+    return pool_store
+
+
+def cache_validators(paths: list[Path], *params) -> tuple[str, float]:
+    """Build a strong ETag and Last-Modified time from the files a response depends on.
+
+    The ETag covers the content hash of every file plus the request parameters,
+    so it changes whenever the dataset, model or query changes.
+    """
+    parts = [file_version(p) for p in paths] + [str(p) for p in params]
+    etag = '"' + hashlib.sha1("|".join(parts).encode()).hexdigest() + '"'
+    last_modified = max(p.stat().st_mtime for p in paths)
+    return etag, last_modified
+
 
-    model = joblib.load(model_path)
-    model_cache[cache_key] = model
+def cache_headers(etag: str, last_modified: float) -> dict:
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": f"public, max-age={CACHE_MAX_AGE}, must-revalidate",
+    }
+
+
+def is_not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since and count the outcome as an HTTP cache lookup."""
+    not_modified = check_conditional(request, etag, last_modified)
+    record_cache("http_conditional", not_modified)
+    return not_modified
+
+
+def check_conditional(request: Request, etag: str, last_modified: float) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since (RFC 9110 13.2.2 precedence)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+
+    return False
+
+
+def get_pool_ids() -> PoolIds:
+    """Pool id dictionary shared with the trainer; it picks up appended pools by itself."""
+    pool_ids = pool_ids_cache.get(MODEL_DIR)
+    if pool_ids is None:
+        pool_ids = pool_ids_cache[MODEL_DIR] = PoolIds.open(MODEL_DIR)
+    return pool_ids
+
+
+def encode_pools(addresses) -> np.ndarray:
+    """Stable pool ids, assigning ids to new pools; -1 for new pools if MODEL_DIR is read-only."""
+    pool_ids = get_pool_ids()
+    try:
+        return pool_ids.assign(addresses)
+    except OSError:
+        return pool_ids.lookup(addresses)
+
+
+def load_model(max_lag: int, forecast_horizon: int):
+    """Load trained model from disk, reloading it when the pickle is replaced."""
+    cache_key = f"{forecast_horizon}_{max_lag}"
+    model_path = get_model_path(max_lag, forecast_horizon)
+    stamp = file_stamp(model_path)
+    cached = model_cache.get(cache_key)
+    record_cache("model", bool(cached and cached[0] == stamp))
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    start = time.perf_counter()
+    with stage("model_load"):
+        model = joblib.load(model_path)
+    MODEL_LOAD.labels(cache_key).observe(time.perf_counter() - start)
+    model_cache[cache_key] = (stamp, model)
     return model
 
 
+def feature_columns(max_lag: int) -> list[str]:
+    """Model input columns, in training order."""
+    cols = ['contract', 'date', 'tx_count', 'fee_percentage', 'tx_count_cumulative',
+            'growth_rate', 'day_number', 'tx_transform']
+    cols += [f'lag_{k}' for k in range(1, max_lag + 1)]
+    cols += [f'rolling_mean_{i}d' for i in ROLLING_WINDOWS]
+    return cols
+
+
 def build_features(df_features: pd.DataFrame, max_lag: int = 7) -> pd.DataFrame:
     """Build features for prediction (mirrors hermetik_model.py logic)."""
     df_features = df_features.copy()
@@ -108,32 +340,18 @@ def build_features(df_features: pd.DataFrame, max_lag: int = 7) -> pd.DataFrame:
         )
 
     # Rolling means
-    rolling_list = [3, 5, 7, 14]
-    for i in rolling_list:
+    for i in ROLLING_WINDOWS:
         df_features[f'rolling_mean_{i}d'] = (
             df_features
             .groupby('poolAddress', group_keys=False)['growth_rate']
             .transform(lambda s: s.shift(1).rolling(window=i, min_periods=1).mean())
         )
 
-    # Load contracts mapping
-    contracts_path = MODEL_DIR / f"contracts_{max_lag}.json"
-    if contracts_path.exists():
-        with open(contracts_path, "r") as f:
-            contracts_dic = json.load(f)
-        df_features['contract'] = df_features['poolAddress'].map(contracts_dic).fillna(-1).astype(int)
-    else:
-        raise HTTPException(status_code=404, detail="Contracts mapping not found. Train model first.")
+    # Stable pool ids from the shared dictionary
+    df_features['contract'] = encode_pools(df_features['poolAddress'])
 
     # Select columns
-    cols = ['contract', 'date', 'tx_count', 'fee_percentage', 'tx_count_cumulative',
-            'growth_rate', 'day_number', 'tx_transform']
-    for k in range(1, max_lag + 1):
-        cols.append(f'lag_{k}')
-    for i in rolling_list:
-        cols.append(f'rolling_mean_{i}d')
-
-    df_features = df_features[cols].copy()
+    df_features = df_features[feature_columns(max_lag)].copy()
 
     # Convert date to ordinal
     df_features['date'] = pd.to_datetime(df_features['date']).map(pd.Timestamp.toordinal)
@@ -142,6 +360,28 @@ def build_features(df_features: pd.DataFrame, max_lag: int = 7) -> pd.DataFrame:
     return df_features
 
 
+def series_features(tx_count: np.ndarray, max_lag: int = 7) -> dict[str, np.ndarray]:
+    """Growth features of the last day of many series at once, as build_features computes them.
+
+    tx_count is a (series, days) matrix, right-aligned and NaN-padded on the left
+    for shorter series. Only the last max(max_lag, 14) + 2 days are used.
+    """
+    tx_transform = np.log(tx_count + 1)
+    growth = np.full_like(tx_transform, np.nan)
+    growth[:, 1:] = np.diff(tx_transform, axis=1)
+
+    features = {'tx_count': tx_count[:, -1], 'growth_rate': growth[:, -1], 'tx_transform': tx_transform[:, -1]}
+    for k in range(1, max_lag + 1):
+        features[f'lag_{k}'] = growth[:, -1 - k]
+    for i in ROLLING_WINDOWS:
+        # mean of the previous i days, ignoring missing ones (rolling with min_periods=1)
+        window = growth[:, -1 - i:-1]
+        present = (~np.isnan(window)).sum(axis=1)
+        total = np.nansum(window, axis=1)
+        features[f'rolling_mean_{i}d'] = np.divide(total, present, out=np.full(len(window), np.nan), where=present > 0)
+    return features
+
+
 def filter_dataset(df_dataset: pd.DataFrame) -> pd.DataFrame:
     """Keep pools that have entries for every day."""
     dates = df_dataset['date'].unique()
@@ -154,6 +394,25 @@ def filter_dataset(df_dataset: pd.DataFrame) -> pd.DataFrame:
     return df_dataset[df_dataset['poolAddress'].isin(intersec)]
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and time them per route template, with an optional slow-request log."""
+    spans = start_request()
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    endpoint = route.path if route is not None else "unmatched"
+    finish_request(request.method, endpoint, response.status_code, time.perf_counter() - start, spans)
+    return response
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: request counts/latency, stage timings, cache hit rates, model loads."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/")
 async def root():
     return {"message": "APY Prediction API", "version": "1.0.0"}
@@ -181,85 +440,311 @@ async def list_models():
     return {"models": available}
 
 
-@app.post("/api/predict", response_model=PredictionResponse)
-async def predict(request: PredictionRequest):
-    """Get pool growth predictions."""
-    # Load data
-    data_path = DATA_DIR / "pool_dataset_latest.csv"
-    if not data_path.exists():
-        # Try apy-data-miner exports
-        data_path = DATA_DIR / "apy-data-miner" / "exports" / "pool_dataset_latest.csv"
+def prediction_inputs(max_lag: int, forecast_horizon: int) -> list[Path]:
+    """Files a prediction depends on; used to derive its cache validators.
+
+    The pool id dictionary is not one of them: ids are append-only, so the ids of
+    the dataset's pools follow from the dataset itself, and scoring a request
+    (which may assign them) must not change the validators of the next one.
+    """
+    return [get_data_path(), get_model_path(max_lag, forecast_horizon)]
 
-    if not data_path.exists():
-        raise HTTPException(status_code=404, detail="Dataset not found")
 
-    df = pd.read_csv(data_path)
-    original_df = df.copy()
+def latest_features(data_path: Path, df: pd.DataFrame, max_lag: int) -> pd.DataFrame:
+    """Feature rows for the most recent date, from shared memory when published."""
+    if shared_store is not None:
+        df_latest = shared_store.latest_features(file_stamp(data_path), max_lag)
+        record_cache("shared_features", df_latest is not None)
+        if df_latest is not None:
+            return df_latest
 
     # Filter and build features
-    df = filter_dataset(df)
-    df_features = build_features(df, request.max_lag)
+    with stage("filter_dataset"):
+        df = filter_dataset(df)
+    with stage("build_features"):
+        df_features = build_features(df, max_lag)
 
     # Get most recent date for prediction
     pred_date = df_features["date"].max()
-    df_pred = df_features[df_features["date"] == pred_date].copy()
+    return df_features[df_features["date"] == pred_date]
+
+
+def score_pools(data_path: Path, max_lag: int, forecast_horizon: int) -> tuple[pd.DataFrame, pd.DataFrame, int]:
+    """Load the dataset and score every pool on the most recent date (unranked).
+
+    Returns the dataset and the scored feature rows; the latter keep the index of
+    the dataset, so rows can be joined back to it (e.g. for pool addresses of
+    pools unknown to the model).
+    """
+    df = load_dataset(data_path)
+    df_pred = latest_features(data_path, df, max_lag).copy()
 
     if df_pred.empty:
         raise HTTPException(status_code=400, detail="No data available for prediction")
+    pred_date = df_pred["date"].iloc[0]
 
     # Load model and predict
-    model = load_model(request.max_lag, request.forecast_horizon)
-    preds = model.predict(df_pred)
+    model = load_model(max_lag, forecast_horizon)
+    with stage("model_predict"):
+        preds = model.predict(df_pred)
     df_pred.loc[:, "predictions"] = preds
+    return df, df_pred, pred_date
+
+
+def rank_top(df_pred: pd.DataFrame, k: Optional[int] = None) -> pd.DataFrame:
+    """The k best scored rows (all rows if k is None), best first, with a 1-based 'rank'.
+
+    Uses a partial selection, so only the k survivors are sorted; ties keep row order.
+    """
+    with stage("rank"):
+        order, ranks = top_k(df_pred['predictions'].to_numpy(), len(df_pred) if k is None else k)
+        df_top = df_pred.iloc[order].copy()
+        df_top['rank'] = ranks
+    return df_top
+
+
+def compute_predictions(data_path: Path, max_lag: int, forecast_horizon: int) -> tuple[pd.DataFrame, pd.DataFrame, int]:
+    """Load the dataset and score every pool on the most recent date, ranked best first."""
+    df, df_pred, pred_date = score_pools(data_path, max_lag, forecast_horizon)
+    return df, rank_top(df_pred), pred_date
+
+
+class PoolTable:
+    """Pool addresses and metadata as arrays indexed directly by contract id.
+
+    Every array has one extra trailing slot holding None, which ids unknown to
+    the table gather from, so joining any number of predictions is a single
+    fancy-indexing operation per column.
+    """
+
+    def __init__(self, columns: dict[str, np.ndarray]):
+        self.columns = columns
+        self.size = len(columns["pool_address"]) - 1
+
+    def gather(self, ids) -> dict[str, np.ndarray]:
+        ids = np.asarray(ids, dtype=np.int64)
+        slots = np.where((ids >= 0) & (ids < self.size), ids, self.size)
+        return {name: values[slots] for name, values in self.columns.items()}
+
+
+def load_pool_table(data_path: Path, df: pd.DataFrame) -> PoolTable:
+    """Metadata table for the dataset, rebuilt when the dataset or the pool id dictionary grows."""
+    pool_ids = get_pool_ids()
+    key = (file_stamp(data_path), len(pool_ids))
+    cached = pool_table_cache.get(data_path)
+    record_cache("pool_table", bool(cached and cached[0] == key))
+    if cached and cached[0] == key:
+        return cached[1]
+
+    with stage("pool_table"):
+        size = key[1]
+        # latest row per pool supplies its metadata
+        latest = df.sort_values('date', kind='stable').drop_duplicates('poolAddress', keep='last')
+        ids = pool_ids.lookup(latest['poolAddress'])
+        known = ids >= 0
+
+        columns = {"pool_address": np.append(pool_ids.addresses(np.arange(size)), None)}
+        for column, field in POOL_METADATA_FIELDS.items():
+            values = np.full(size + 1, None, dtype=object)
+            if column in latest.columns:
+                series = latest[column].astype(object)
+                values[ids[known]] = series.where(series.notna(), None).to_numpy()[known]
+            columns[field] = values
+        table = PoolTable(columns)
+
+    pool_table_cache[data_path] = (key, table)
+    return table
+
+
+def to_pool_predictions(df_top: pd.DataFrame, table: PoolTable) -> list[dict]:
+    """Response rows for ranked predictions, joined to pool metadata with one gather per column."""
+    with stage("serialize"):
+        contract_ids = df_top['contract'].to_numpy()
+        meta = table.gather(contract_ids)
+        unknown = np.flatnonzero(pd.isna(meta["pool_address"]))
+        meta["pool_address"][unknown] = [f"Unknown ({int(contract_ids[i])})" for i in unknown]
+
+        def nullable(values):
+            values = np.asarray(values, dtype=np.float64)
+            return np.where(np.isnan(values), None, values).tolist()
+
+        columns = {
+            "rank": df_top['rank'].to_numpy().tolist(),
+            "predicted_growth_rate": df_top['predictions'].to_numpy(dtype=np.float64).tolist(),
+            "current_tx_count": nullable(df_top['tx_count']),
+            "fee_percentage": nullable(df_top['fee_percentage']),
+            **{name: values.tolist() for name, values in meta.items()},
+        }
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*columns.values())]
 
-    # Rank predictions
-    df_pred['rank'] = df_pred['predictions'].rank(ascending=False).astype(int)
-    df_pred = df_pred.sort_values('rank')
-
-    # Get contract address mapping
-    reverse_contracts = load_contracts_mapping(request.max_lag)
-
-    # Build response
-    predictions = []
-    for i, row in df_pred.head(request.top_n).iterrows():
-        contract_id = int(row['contract'])
-        pool_address = reverse_contracts.get(contract_id, f"Unknown ({contract_id})")
-
-        predictions.append(PoolPrediction(
-            rank=int(row['rank']),
-            pool_address=pool_address,
-            predicted_growth_rate=float(row['predictions']),
-            current_tx_count=float(row['tx_count']) if pd.notna(row['tx_count']) else None,
-            fee_percentage=float(row['fee_percentage']) if pd.notna(row.get('fee_percentage')) else None,
-        ))
+
+@app.post("/api/predict", response_model=PredictionResponse)
+async def predict(request: PredictionRequest, http_request: Request, response: Response):
+    """Get pool growth predictions, optionally also the top pools within each segment."""
+    if request.segment_by is not None and request.segment_by not in SEGMENT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"segment_by must be one of {', '.join(SEGMENT_COLUMNS)}")
+
+    # Answer from the client's cached copy when neither the data nor the model changed
+    validator_paths = prediction_inputs(request.max_lag, request.forecast_horizon)
+    etag, last_modified = cache_validators(
+        validator_paths, "predict", request.max_lag, request.forecast_horizon, request.top_n, request.segment_by
+    )
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(http_request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    # Load data, build features and score all pools; only the top ones are ranked
+    df, df_pred, pred_date = score_pools(validator_paths[0], request.max_lag, request.forecast_horizon)
+    table = load_pool_table(validator_paths[0], df)
+    predictions = to_pool_predictions(rank_top(df_pred, request.top_n), table)
+
+    segments = None
+    if request.segment_by is not None:
+        if request.segment_by not in df.columns:
+            raise HTTPException(status_code=400, detail=f"Dataset has no {request.segment_by} column")
+        with stage("rank"):
+            selected = segment_top_k(
+                df_pred['predictions'].to_numpy(), df.loc[df_pred.index, request.segment_by].to_numpy(), request.top_n
+            )
+        segments = {
+            str(segment): to_pool_predictions(df_pred.iloc[order].assign(rank=ranks), table)
+            for segment, (order, ranks) in selected.items()
+        }
 
     # Convert ordinal date back to string
-    from datetime import date
     pred_date_str = date.fromordinal(int(pred_date)).isoformat()
 
     return PredictionResponse(
         predictions=predictions,
         prediction_date=pred_date_str,
         forecast_horizon=request.forecast_horizon,
-        total_pools=len(df_pred)
+        total_pools=len(df_pred),
+        segments=segments,
     )
 
 
-@app.get("/api/pools")
-async def list_pools():
-    """List all available pools with metadata."""
-    data_path = DATA_DIR / "pool_dataset_latest.csv"
-    if not data_path.exists():
-        data_path = DATA_DIR / "apy-data-miner" / "exports" / "pool_dataset_latest.csv"
+def scenario_features(series: list[ScenarioSeries], max_lag: int) -> pd.DataFrame:
+    """Feature rows for hypothetical series, built for all of them in one pass."""
+    # the last day, its max_lag / 14 previous growth rates and the day before those
+    width = max(max_lag, max(ROLLING_WINDOWS)) + 2
+    tails = [s.tx_count[-width:] for s in series]
+    lengths = np.fromiter((len(t) for t in tails), dtype=np.int64, count=len(tails))
+
+    # right-align every series in a NaN-padded (series, width) matrix
+    tx_count = np.full((len(series), width), np.nan)
+    rows = np.repeat(np.arange(len(series)), lengths)
+    cols = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(width - lengths, lengths)
+    tx_count[rows, cols] = np.fromiter((v for t in tails for v in t), dtype=np.float64, count=int(lengths.sum()))
+
+    columns = series_features(tx_count, max_lag)
+    addresses = [s.pool_address for s in series]
+    contract = np.full(len(series), -1, dtype=np.int64)
+    known = [i for i, a in enumerate(addresses) if a]
+    if known:
+        contract[known] = get_pool_ids().lookup([addresses[i] for i in known])
+    columns['contract'] = contract
+
+    today = date.today().toordinal()
+    columns['date'] = np.array([date.fromisoformat(s.date).toordinal() if s.date else today for s in series])
+    for name in ('fee_percentage', 'tx_count_cumulative', 'day_number'):
+        columns[name] = np.array([getattr(s, name) for s in series], dtype=np.float64)
+    return pd.DataFrame(columns)[feature_columns(max_lag)]
+
+
+def check_scenarios(scenarios: ScenarioRequest) -> None:
+    """Reject requests over the size limits or with malformed series / feature rows."""
+    rows = len(scenarios.series)
+    if scenarios.features:
+        lengths = {len(values) for values in scenarios.features.values()}
+        if len(lengths) > 1:
+            raise HTTPException(status_code=400, detail="Every feature column must have the same number of rows")
+        rows += lengths.pop()
+        unknown = set(scenarios.features) - set(feature_columns(scenarios.max_lag))
+        missing = set(feature_columns(scenarios.max_lag)) - set(scenarios.features)
+        if unknown or missing:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Feature columns must be exactly {feature_columns(scenarios.max_lag)}"
+                       f" (missing: {sorted(missing)}, unknown: {sorted(unknown)})"
+            )
+    if rows == 0:
+        raise HTTPException(status_code=400, detail="Provide series or features to score")
+    if rows > SCORE_MAX_SCENARIOS:
+        raise HTTPException(status_code=413, detail=f"At most {SCORE_MAX_SCENARIOS} scenarios per request")
+    for i, s in enumerate(scenarios.series):
+        if not 1 <= len(s.tx_count) <= SCORE_MAX_SERIES_DAYS:
+            raise HTTPException(status_code=400, detail=f"series[{i}].tx_count must have 1 to {SCORE_MAX_SERIES_DAYS} days")
+        if s.date is not None:
+            parse_date_param(s.date, f"series[{i}].date")
+
+
+@app.post("/api/score")
+async def score_scenarios(request: Request):
+    """Score hypothetical pools: daily series and/or feature rows, in one model call."""
+    if int(request.headers.get("content-length") or 0) > SCORE_MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail=f"Request body over {SCORE_MAX_BODY_BYTES} bytes")
+    body = await request.body()
+    if len(body) > SCORE_MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail=f"Request body over {SCORE_MAX_BODY_BYTES} bytes")
+    try:
+        with stage("parse"):
+            scenarios = ScenarioRequest.model_validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    check_scenarios(scenarios)
+
+    model = load_model(scenarios.max_lag, scenarios.forecast_horizon)
+    frames = []
+    if scenarios.series:
+        with stage("build_features"):
+            frames.append(scenario_features(scenarios.series, scenarios.max_lag))
+    if scenarios.features:
+        # fast path: feature columns go to the model as they are
+        frames.append(pd.DataFrame(
+            {name: np.array(scenarios.features[name], dtype=np.float64) for name in feature_columns(scenarios.max_lag)}
+        ))
+    df_scenarios = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    with stage("model_predict"):
+        preds = model.predict(df_scenarios)
+
+    with stage("serialize"):
+        preds = np.asarray(preds, dtype=np.float64)
+        n_series = len(scenarios.series)
+        return Response(
+            content=json.dumps({
+                "forecast_horizon": scenarios.forecast_horizon,
+                "max_lag": scenarios.max_lag,
+                "series": preds[:n_series].tolist(),
+                "features": preds[n_series:].tolist(),
+            }),
+            media_type="application/json",
+        )
 
-    if not data_path.exists():
-        raise HTTPException(status_code=404, detail="Dataset not found")
 
-    df = pd.read_csv(data_path)
+@app.get("/api/pools")
+async def list_pools(request: Request, response: Response):
+    """List all available pools with metadata."""
+    data_path = get_data_path()
+    etag, last_modified = cache_validators([data_path], "pools")
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    store = get_pool_store(data_path)
+    if store is not None:
+        with stage("store_query"):
+            df_latest = store.latest()
+        latest_date = df_latest['date'].max()
+    else:
+        df = load_dataset(data_path)
 
-    # Get unique pools with their latest stats
-    latest_date = df['date'].max()
-    df_latest = df[df['date'] == latest_date]
+        # Get unique pools with their latest stats
+        latest_date = df['date'].max()
+        df_latest = df[df['date'] == latest_date]
 
     pools = []
     for _, row in df_latest.iterrows():
@@ -277,17 +762,22 @@ async def list_pools():
 
 
 @app.get("/api/pool/{pool_address}/history")
-async def pool_history(pool_address: str):
+async def pool_history(pool_address: str, request: Request, response: Response):
     """Get historical data for a specific pool."""
-    data_path = DATA_DIR / "pool_dataset_latest.csv"
-    if not data_path.exists():
-        data_path = DATA_DIR / "apy-data-miner" / "exports" / "pool_dataset_latest.csv"
-
-    if not data_path.exists():
-        raise HTTPException(status_code=404, detail="Dataset not found")
-
-    df = pd.read_csv(data_path)
-    df_pool = df[df['poolAddress'] == pool_address].sort_values('date')
+    data_path = get_data_path()
+    etag, last_modified = cache_validators([data_path], "history", pool_address)
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    store = get_pool_store(data_path)
+    if store is not None:
+        with stage("store_query"):
+            df_pool = store.history(pool_address).sort_values('date')
+    else:
+        df = load_dataset(data_path)
+        df_pool = df[df['poolAddress'] == pool_address].sort_values('date')
 
     if df_pool.empty:
         raise HTTPException(status_code=404, detail="Pool not found")
@@ -308,6 +798,406 @@ async def pool_history(pool_address: str):
     }
 
 
+@app.get("/api/pool/{pool_address}/unique_users")
+async def pool_unique_users(pool_address: str, request: Request, response: Response,
+                            days: int = 7, end_date: Optional[str] = None):
+    """Distinct users of a pool over the `days` days ending at end_date (default: the pool's latest day).
+
+    Merged from the daily HyperLogLog sketches (model/user_sketch.py), so any window
+    is answered without raw transactions; relative_error is the sketch's standard error.
+    """
+    if not 1 <= days <= UNIQUE_USERS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"days must be between 1 and {UNIQUE_USERS_MAX_DAYS}")
+    end_date = parse_date_param(end_date, "end_date")
+
+    data_path = get_data_path()
+    etag, last_modified = cache_validators([data_path], "unique_users", pool_address, days, end_date)
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    store = get_pool_store(data_path)
+    if store is not None:
+        with stage("store_query"):
+            df_pool = store.frame(end=end_date, pools=[pool_address], columns=["date", "user_sketch"])
+    else:
+        df = load_dataset(data_path)
+        df_pool = df[df['poolAddress'] == pool_address]
+        if end_date is not None:
+            df_pool = df_pool[df_pool['date'] <= end_date]
+
+    if df_pool.empty:
+        raise HTTPException(status_code=404, detail="Pool not found")
+    if 'user_sketch' not in df_pool.columns or df_pool['user_sketch'].isna().all():
+        raise HTTPException(status_code=404, detail="Dataset has no user sketches; reprocess it with the stablecoin processors")
+
+    end = date.fromisoformat(end_date or df_pool['date'].max())
+    start = date.fromordinal(end.toordinal() - days + 1).isoformat()
+    df_window = df_pool[df_pool['date'] >= start]
+    with stage("sketch_merge"):
+        estimate = user_sketch.estimate(user_sketch.merge(user_sketch.decode(df_window['user_sketch'])))
+
+    return {
+        "pool_address": pool_address,
+        "start_date": start,
+        "end_date": end.isoformat(),
+        "days": days,
+        "days_with_data": len(df_window),
+        "unique_users": int(round(float(estimate))),
+        "relative_error": user_sketch.RELATIVE_ERROR,
+    }
+
+
+def parse_date_param(value: Optional[str], name: str) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO date (YYYY-MM-DD)")
+
+
+def export_columns(df: pd.DataFrame, df_pred: pd.DataFrame, include_history: bool,
+                   start_date: Optional[str], end_date: Optional[str],
+                   df_history: Optional[pd.DataFrame] = None) -> dict:
+    """Column arrays for the export, one row per pool (or per pool-day with history).
+
+    History rows come from df_history when given (e.g. already limited to the
+    date range by the pool store), otherwise from df. Only numpy columns and an
+    int index array are materialised; rows are turned into output records chunk
+    by chunk in `iter_export_chunks`.
+    """
+    pool_address = df.loc[df_pred.index, 'poolAddress'].to_numpy()
+    columns = {
+        "pool_address": pool_address,
+        "rank": df_pred['rank'].to_numpy(),
+        "predicted_growth_rate": df_pred['predictions'].to_numpy(),
+    }
+    if not include_history:
+        return columns
+
+    df = df if df_history is None else df_history
+    mask = df['poolAddress'].isin(pool_address).to_numpy()
+    if start_date is not None:
+        mask &= (df['date'] >= start_date).to_numpy()
+    if end_date is not None:
+        mask &= (df['date'] <= end_date).to_numpy()
+    rows = np.flatnonzero(mask)
+
+    # Pool position in rank order for each history row, then order rows by (rank, date)
+    pool_pos = pd.Index(pool_address).get_indexer(df['poolAddress'].to_numpy()[rows])
+    dates = df['date'].to_numpy()[rows]
+    order = np.lexsort((dates, pool_pos))
+    rows, pool_pos = rows[order], pool_pos[order]
+
+    history = {name: values[pool_pos] for name, values in columns.items()}
+    history["date"] = dates[order]
+    for col in ['tx_count', 'unique_users', 'tx_count_cumulative']:
+        if col in df.columns:
+            history[col] = df[col].to_numpy()[rows]
+    return history
+
+
+def iter_export_chunks(columns: dict, fmt: str):
+    """Encode export columns as NDJSON, CSV or Arrow IPC, EXPORT_CHUNK_ROWS rows at a time."""
+    n_rows = len(columns["pool_address"])
+    sink = io.BytesIO()
+    writer = None
+
+    for start in range(0, max(n_rows, 1), EXPORT_CHUNK_ROWS):
+        chunk = pd.DataFrame({name: values[start:start + EXPORT_CHUNK_ROWS] for name, values in columns.items()})
+        if fmt == "ndjson":
+            if len(chunk):
+                yield chunk.to_json(orient="records", lines=True, double_precision=15).rstrip("\n").encode() + b"\n"
+        elif fmt == "csv":
+            yield chunk.to_csv(index=False, header=start == 0).encode()
+        else:
+            batch = pa.RecordBatch.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pa.ipc.new_stream(sink, batch.schema)
+            writer.write_batch(batch)
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+
+    if writer is not None:
+        writer.close()
+        yield sink.getvalue()
+
+
+@app.get("/api/export")
+async def export_predictions(
+    request: Request,
+    format: str = "ndjson",
+    max_lag: int = 7,
+    forecast_horizon: int = 1,
+    include_history: bool = False,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+):
+    """Stream predictions for every pool, optionally joined with their daily history."""
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(EXPORT_MEDIA_TYPES)}")
+    start_date = parse_date_param(start_date, "start_date")
+    end_date = parse_date_param(end_date, "end_date")
+
+    validator_paths = prediction_inputs(max_lag, forecast_horizon)
+    etag, last_modified = cache_validators(
+        validator_paths, "export", format, max_lag, forecast_horizon, include_history, start_date, end_date
+    )
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    df, df_pred, pred_date = compute_predictions(validator_paths[0], max_lag, forecast_horizon)
+    df_history = None
+    store = get_pool_store(validator_paths[0]) if include_history else None
+    if store is not None:
+        with stage("store_query"):
+            df_history = store.frame(
+                start=start_date, end=end_date,
+                columns=['poolAddress', 'date', 'tx_count', 'unique_users', 'tx_count_cumulative'],
+            )
+    columns = export_columns(df, df_pred, include_history, start_date, end_date, df_history)
+
+    extension = "arrows" if format == "arrow" else format
+    headers["Content-Disposition"] = (
+        f'attachment; filename="predictions_{forecast_horizon}_{max_lag}_'
+        f'{date.fromordinal(int(pred_date)).isoformat()}.{extension}"'
+    )
+    return StreamingResponse(
+        iter_export_chunks(columns, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers=headers,
+    )
+
+
+def backtest_records(frame: pd.DataFrame, date_columns: list[str]) -> list[dict]:
+    """JSON records of an evaluation frame, with ordinal dates as ISO strings."""
+    if frame.empty:
+        return []
+    frame = frame.copy()
+    for col in date_columns:
+        frame[col] = [date.fromordinal(int(d)).isoformat() for d in frame[col]]
+    return json.loads(frame.to_json(orient="records", double_precision=6))
+
+
+@app.get("/api/backtest")
+async def backtest(
+    request: Request,
+    response: Response,
+    max_lag: int = 7,
+    forecast_horizon: int = 1,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    top_n: int = 10,
+):
+    """Realized-vs-predicted error and top-N hit rate of stored predictions, per date and per model version."""
+    start_date = parse_date_param(start_date, "start_date")
+    end_date = parse_date_param(end_date, "end_date")
+    if top_n < 1:
+        raise HTTPException(status_code=400, detail="top_n must be at least 1")
+
+    store = PredictionStore(MODEL_DIR / "predictions")
+    versions = {
+        code: meta for code, meta in store.versions().items()
+        if meta["forecast_horizon"] == forecast_horizon and meta["max_lag"] == max_lag
+    }
+    if not versions:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No stored predictions. Run: python hermetik_model.py predict --forecast_horizon {forecast_horizon} --max_lag {max_lag}"
+        )
+
+    data_path = get_data_path()
+    etag, last_modified = cache_validators(
+        [data_path, store.root / "rows.json"], "backtest", max_lag, forecast_horizon, start_date, end_date, top_n
+    )
+    headers = cache_headers(etag, last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+    df_pred = store.read(
+        versions=versions,
+        start=date.fromisoformat(start_date).toordinal() if start_date else None,
+        end=date.fromisoformat(end_date).toordinal() if end_date else None,
+    )
+    pools = get_pool_store(data_path)
+    if pools is not None:
+        # realized growth needs the requested dates and forecast_horizon days after them
+        realized_end = date.fromordinal(date.fromisoformat(end_date).toordinal() + forecast_horizon).isoformat() if end_date else None
+        with stage("store_query"):
+            df = pools.frame(start=start_date, end=realized_end, columns=['poolAddress', 'date', 'tx_count'])
+    else:
+        df = load_dataset(data_path)
+    with stage("backtest"):
+        per_date, summary = evaluate(df_pred, df, get_pool_ids(), forecast_horizon, top_n)
+
+    return {
+        "model_versions": {str(code): meta for code, meta in versions.items()},
+        "top_n": top_n,
+        "dates": backtest_records(per_date, ["date"]),
+        "summary": backtest_records(summary, ["first_date", "last_date"]),
+    }
+
+
+def sse_event(event: str, event_id: str, payload: dict) -> bytes:
+    data = json.dumps(payload, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n".encode()
+
+
+class PredictionChannel:
+    """Latest ranking of one (max_lag, forecast_horizon) model and the clients subscribed to it.
+
+    Predictions are recomputed once per dataset/model version; the resulting
+    diff is encoded once and the same bytes are queued for every subscriber.
+    """
+
+    def __init__(self, max_lag: int, forecast_horizon: int):
+        self.max_lag = max_lag
+        self.forecast_horizon = forecast_horizon
+        self.version = None
+        self.prediction_date = None
+        self.ranking = {}  # pool_address -> (rank, predicted_growth_rate)
+        self.snapshot_event = None
+        self.subscribers = set()
+        self.lock = asyncio.Lock()
+
+    def _compute(self):
+        """Blocking part of a refresh; returns None when the inputs are unchanged."""
+        try:
+            paths = prediction_inputs(self.max_lag, self.forecast_horizon)
+            etag, _ = cache_validators(paths, "stream", self.max_lag, self.forecast_horizon)
+            version = etag.strip('"')
+            if version == self.version:
+                return None
+            df, df_pred, pred_date = compute_predictions(paths[0], self.max_lag, self.forecast_horizon)
+        except HTTPException:
+            return None
+
+        addresses = df.loc[df_pred.index, 'poolAddress'].tolist()
+        ranking = dict(zip(addresses, zip(df_pred['rank'].tolist(), df_pred['predictions'].tolist())))
+        return version, date.fromordinal(int(pred_date)).isoformat(), ranking
+
+    async def refresh(self):
+        """Recompute predictions if the inputs changed and broadcast the diff."""
+        async with self.lock:
+            result = await asyncio.to_thread(self._compute)
+            if result is None:
+                return
+            version, prediction_date, ranking = result
+
+            changed = [
+                [address, rank, score]
+                for address, (rank, score) in ranking.items()
+                if self.ranking.get(address) != (rank, score)
+            ]
+            removed = [address for address in self.ranking if address not in ranking]
+            diff_event = sse_event("diff", version, {
+                "version": version,
+                "previous_version": self.version,
+                "prediction_date": prediction_date,
+                "total_pools": len(ranking),
+                "changed": changed,
+                "removed": removed,
+            })
+            previous_version = self.version
+
+            self.version = version
+            self.prediction_date = prediction_date
+            self.ranking = ranking
+            self.snapshot_event = sse_event("snapshot", version, {
+                "version": version,
+                "prediction_date": prediction_date,
+                "total_pools": len(ranking),
+                "predictions": [[address, rank, score] for address, (rank, score) in ranking.items()],
+            })
+            if previous_version is not None:
+                self.broadcast(diff_event)
+
+    def broadcast(self, event: bytes):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Client fell behind: drop its backlog and resync it with the full snapshot
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self.snapshot_event)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=PUSH_QUEUE_SIZE)
+        if self.snapshot_event is not None:
+            queue.put_nowait(self.snapshot_event)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+
+class PredictionBroadcaster:
+    """Polls input versions for every channel that has subscribers."""
+
+    def __init__(self):
+        self.channels = {}
+        self.task = None
+
+    def channel(self, max_lag: int, forecast_horizon: int) -> PredictionChannel:
+        key = (max_lag, forecast_horizon)
+        if key not in self.channels:
+            self.channels[key] = PredictionChannel(max_lag, forecast_horizon)
+        return self.channels[key]
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(PUSH_POLL_SECONDS)
+            for channel in list(self.channels.values()):
+                if channel.subscribers:
+                    await channel.refresh()
+
+
+broadcaster = PredictionBroadcaster()
+
+
+@app.on_event("startup")
+async def start_broadcaster():
+    broadcaster.task = asyncio.create_task(broadcaster.run())
+
+
+@app.on_event("shutdown")
+async def stop_broadcaster():
+    if broadcaster.task is not None:
+        broadcaster.task.cancel()
+
+
+@app.get("/api/stream")
+async def stream_predictions(request: Request, max_lag: int = 7, forecast_horizon: int = 1):
+    """Server-sent events: a `snapshot` of all ranks on connect, then a `diff` per new version."""
+    get_model_path(max_lag, forecast_horizon)
+    channel = broadcaster.channel(max_lag, forecast_horizon)
+    await channel.refresh()
+    queue = channel.subscribe()
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    yield await asyncio.wait_for(queue.get(), PUSH_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+        finally:
+            channel.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,96 @@
+"""Prometheus metrics and per-stage timing spans for the API.
+
+Stages are timed with `with stage("build_features"):`. Every span feeds the
+`apy_stage_duration_seconds` histogram and, while a request is in flight, is
+also appended to that request's breakdown, which the slow-request log prints.
+
+Set APY_SLOW_REQUEST_MS to log requests slower than that many milliseconds.
+Under several workers set PROMETHEUS_MULTIPROC_DIR (done by
+`python -m app.shared_data serve`) so /metrics aggregates all processes.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+REQUESTS = Counter(
+    "apy_http_requests_total", "HTTP requests handled", ["method", "endpoint", "status"]
+)
+REQUEST_LATENCY = Histogram(
+    "apy_http_request_duration_seconds", "Time until response headers are sent",
+    ["method", "endpoint"], buckets=LATENCY_BUCKETS,
+)
+STAGE_LATENCY = Histogram(
+    "apy_stage_duration_seconds", "Time spent per pipeline stage", ["stage"], buckets=LATENCY_BUCKETS
+)
+CACHE_LOOKUPS = Counter(
+    "apy_cache_lookups_total", "Cache lookups by cache and result (hit/miss)", ["cache", "result"]
+)
+MODEL_LOAD = Histogram(
+    "apy_model_load_seconds", "Time to load a model pickle from disk", ["model"], buckets=LATENCY_BUCKETS
+)
+
+SLOW_REQUEST_SECONDS = float(os.environ.get("APY_SLOW_REQUEST_MS", "0")) / 1000
+slow_request_log = logging.getLogger("apy.slow_requests")
+
+# (stage, seconds) spans recorded for the request being handled in this context
+request_stages: ContextVar = ContextVar("request_stages", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.labels(name).observe(elapsed)
+        spans = request_stages.get()
+        if spans is not None:
+            spans.append((name, elapsed))
+
+
+def record_cache(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def start_request() -> list:
+    spans = []
+    request_stages.set(spans)
+    return spans
+
+
+def finish_request(method: str, endpoint: str, status: int, elapsed: float, spans: list):
+    REQUESTS.labels(method, endpoint, str(status)).inc()
+    REQUEST_LATENCY.labels(method, endpoint).observe(elapsed)
+
+    if SLOW_REQUEST_SECONDS and elapsed >= SLOW_REQUEST_SECONDS:
+        breakdown = ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in spans)
+        slow_request_log.warning(
+            "slow request %s %s -> %s in %.1fms [%s]",
+            method, endpoint, status, elapsed * 1000, breakdown or "no stages",
+        )
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Prometheus text exposition, aggregated across workers in multiprocess mode."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,221 @@
+"""Shared-memory dataset and feature matrices for multi-worker serving.
+
+One loader process parses pool_dataset_latest.csv, builds the latest-day
+feature matrix for every trained max_lag, and publishes both as Arrow IPC
+files in a shared directory (tmpfs by default). API workers memory-map those
+files, so every worker reads the same physical pages instead of parsing the
+CSV and holding its own pandas copy.
+
+Usage:
+    python -m app.shared_data serve --workers 4 --port 8000
+    python -m app.shared_data publish      # one-off publish, e.g. from cron
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+DEFAULT_SHARED_DIR = Path("/dev/shm/apy-shared") if Path("/dev/shm").is_dir() else Path("/tmp/apy-shared")
+MANIFEST = "manifest.json"
+# Published versions kept on disk; older files are unlinked (safe while still mapped)
+KEEP_VERSIONS = 2
+
+
+def write_table(df: pd.DataFrame, path: Path, preserve_index: bool = False):
+    """Write a frame as an Arrow IPC file laid out for zero-copy reads.
+
+    Numeric columns keep NaN as a value (no validity bitmap), so pandas can
+    wrap the mapped buffers directly instead of copying them.
+    """
+    arrays = {}
+    if preserve_index:
+        arrays["__row__"] = pa.array(df.index.to_numpy())
+    for col in df.columns:
+        values = df[col]
+        if values.dtype == object:
+            arrays[col] = pa.array(values, type=pa.large_string(), from_pandas=True)
+        else:
+            arrays[col] = pa.array(values.to_numpy(), from_pandas=False)
+    table = pa.table(arrays)
+
+    tmp_path = path.with_suffix(".tmp")
+    with pa.OSFile(str(tmp_path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def read_table(path: Path) -> pd.DataFrame:
+    """Memory-map an Arrow IPC file as a DataFrame backed by the mapped buffers."""
+    table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    df = table.to_pandas(
+        split_blocks=True,
+        types_mapper=lambda t: pd.ArrowDtype(t) if pa.types.is_large_string(t) else None,
+    )
+    if "__row__" in df.columns:
+        df = df.set_index("__row__")
+        df.index.name = None
+    return df
+
+
+def trained_lags(model_dir: Path) -> list[int]:
+    lags = set()
+    for m in model_dir.glob("growth_model_*.pkl"):
+        parts = m.stem.replace("growth_model_", "").split("_")
+        if len(parts) == 2:
+            lags.add(int(parts[1]))
+    return sorted(lags)
+
+
+def publish(data_path: Path, shared_dir: Path, max_lags: list[int]) -> dict:
+    """Parse the dataset once and publish it plus the latest feature matrices."""
+    from app.main import build_features, file_stamp, filter_dataset
+
+    shared_dir.mkdir(parents=True, exist_ok=True)
+    stamp = file_stamp(data_path)
+    version = f"{stamp[0]}_{stamp[1]}"
+
+    df = pd.read_csv(data_path)
+    write_table(df, shared_dir / f"dataset_{version}.arrow")
+    manifest = {
+        "version": version,
+        "dataset_stamp": list(stamp),
+        "dataset": f"dataset_{version}.arrow",
+        "features": {},
+    }
+
+    df_filtered = filter_dataset(df)
+    # Pool ids are append-only, so published features stay valid as new pools get ids
+    for max_lag in max_lags:
+        df_features = build_features(df_filtered, max_lag)
+        df_latest = df_features[df_features["date"] == df_features["date"].max()]
+        name = f"features_{max_lag}_{version}.arrow"
+        write_table(df_latest, shared_dir / name, preserve_index=True)
+        manifest["features"][str(max_lag)] = {"file": name}
+
+    manifest_path = shared_dir / MANIFEST
+    history = []
+    if manifest_path.exists():
+        with open(manifest_path, "r") as f:
+            history = json.load(f).get("history", [])
+    manifest["history"] = ([version] + [v for v in history if v != version])[:KEEP_VERSIONS]
+
+    tmp_path = shared_dir / (MANIFEST + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, manifest_path)
+
+    # Unlink files of versions that dropped out of the history
+    for path in shared_dir.glob("*.arrow"):
+        if not any(path.stem.endswith(v) for v in manifest["history"]):
+            path.unlink(missing_ok=True)
+    return manifest
+
+
+class SharedStore:
+    """Worker-side view of the published files, remapped when the manifest changes."""
+
+    def __init__(self, shared_dir: Path):
+        self.shared_dir = shared_dir
+        self.manifest_stamp = None
+        self.manifest = None
+        self.tables = {}
+
+    def _refresh(self):
+        manifest_path = self.shared_dir / MANIFEST
+        try:
+            stat = manifest_path.stat()
+        except FileNotFoundError:
+            self.manifest = None
+            return
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self.manifest_stamp:
+            with open(manifest_path, "r") as f:
+                self.manifest = json.load(f)
+            self.manifest_stamp = stamp
+            self.tables = {}
+
+    def _table(self, name: str) -> pd.DataFrame:
+        if name not in self.tables:
+            self.tables[name] = read_table(self.shared_dir / name)
+        return self.tables[name]
+
+    def dataset(self, data_stamp: tuple):
+        """Mapped dataset, or None if nothing was published for this CSV version."""
+        self._refresh()
+        if self.manifest is None or tuple(self.manifest["dataset_stamp"]) != data_stamp:
+            return None
+        return self._table(self.manifest["dataset"])
+
+    def latest_features(self, data_stamp: tuple, max_lag: int):
+        """Mapped latest-day feature rows (indexed by dataset row), or None if stale."""
+        self._refresh()
+        if self.manifest is None or tuple(self.manifest["dataset_stamp"]) != data_stamp:
+            return None
+        entry = self.manifest["features"].get(str(max_lag))
+        if entry is None:
+            return None
+        return self._table(entry["file"])
+
+
+def watch(data_path: Path, shared_dir: Path, max_lags: list[int], interval: float, published_stamp: tuple):
+    """Republish whenever the dataset file changes."""
+    from app.main import file_stamp
+
+    last = published_stamp
+    while True:
+        try:
+            stamp = file_stamp(data_path)
+            if stamp != last:
+                publish(data_path, shared_dir, max_lags)
+                last = stamp
+        except FileNotFoundError:
+            pass
+        time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish the dataset to shared memory for API workers.")
+    parser.add_argument("command", choices=["serve", "publish"])
+    parser.add_argument("--shared_dir", type=Path, default=DEFAULT_SHARED_DIR)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--interval", type=float, default=30.0, help="seconds between dataset change checks")
+    args = parser.parse_args()
+
+    from app.main import MODEL_DIR, get_data_path
+
+    data_path = get_data_path()
+    max_lags = trained_lags(MODEL_DIR)
+    manifest = publish(data_path, args.shared_dir, max_lags)
+    if args.command == "publish":
+        return
+
+    loader = multiprocessing.Process(
+        target=watch,
+        args=(data_path, args.shared_dir, max_lags, args.interval, tuple(manifest["dataset_stamp"])),
+        daemon=True,
+    )
+    loader.start()
+
+    import uvicorn
+    os.environ["APY_SHARED_DIR"] = str(args.shared_dir)
+
+    # Let /metrics aggregate the Prometheus samples of every worker
+    metrics_dir = args.shared_dir / "metrics"
+    metrics_dir.mkdir(exist_ok=True)
+    for stale in metrics_dir.glob("*.db"):
+        stale.unlink()
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", str(metrics_dir))
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+/api/predict caching and request validation.
+
+A revalidation of its own response must be answered with 304.
+
+The first request against a fresh model directory assigns the pool ids
+(creating pool_ids.bin), which must not change the ETag of the next request.
+A top_n below 1 is rejected by request validation.
+Skipped when the API dependencies, the trained model or the dataset are missing.
+"""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+from app import main
+
+MODEL = "growth_model_1_7.pkl"
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    try:
+        main.get_data_path()
+    except Exception:
+        pytest.skip("pool_dataset_latest.csv not found")
+    if not (main.MODEL_DIR / MODEL).exists():
+        pytest.skip(f"{MODEL} not trained")
+
+    # a model directory without pool_ids.bin, as on a fresh deployment
+    shutil.copy(main.MODEL_DIR / MODEL, tmp_path / MODEL)
+    monkeypatch.setattr(main, "MODEL_DIR", tmp_path)
+    monkeypatch.setattr(main, "pool_ids_cache", {})
+    return TestClient(main.app)
+
+
+def test_revalidation_returns_304(client):
+    body = {"max_lag": 7, "forecast_horizon": 1, "top_n": 3}
+    first = client.post("/api/predict", json=body)
+    assert first.status_code == 200
+    assert (Path(main.MODEL_DIR) / "pool_ids.bin").exists()
+
+    again = client.post("/api/predict", json=body)
+    assert again.headers["etag"] == first.headers["etag"]
+
+    revalidated = client.post("/api/predict", json=body, headers={"If-None-Match": first.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == first.headers["etag"]
+
+
+def test_top_n_must_be_positive(client):
+    for top_n in (0, -1):
+        response = client.post("/api/predict", json={"max_lag": 7, "forecast_horizon": 1, "top_n": top_n})
+        assert response.status_code == 422
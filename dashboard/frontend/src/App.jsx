@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import axios from 'axios'
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, BarChart, Bar, Area, AreaChart } from 'recharts'
 import { TrendingUp, TrendingDown, Activity, RefreshCw, Layers, Clock, BarChart3, ArrowUpRight, Shield, Zap } from 'lucide-react'
@@ -20,15 +20,35 @@ function App() {
     topN: 10
   })
 
+  // ETag of the last prediction response per settings combination
+  const predictionEtags = useRef({})
+
+  // Full ranking pushed by /api/stream: pool_address -> { rank, predicted_growth_rate }
+  const rankingRef = useRef(new Map())
+  const poolsRef = useRef([])
+  const topNRef = useRef(settings.topN)
+  topNRef.current = settings.topN
+
   const fetchPredictions = async () => {
     setLoading(true)
     setError(null)
     try {
+      const settingsKey = `${settings.maxLag}_${settings.forecastHorizon}_${settings.topN}`
+      const cached = predictionEtags.current[settingsKey]
       const response = await axios.post(`${API_URL}/api/predict`, {
         max_lag: settings.maxLag,
         forecast_horizon: settings.forecastHorizon,
         top_n: settings.topN
+      }, {
+        headers: cached ? { 'If-None-Match': cached.etag } : {},
+        validateStatus: (status) => status === 200 || status === 304
       })
+      if (response.status === 304) {
+        // Dataset and model unchanged: reuse the cached payload
+        response.data = cached.data
+      } else if (response.headers.etag) {
+        predictionEtags.current[settingsKey] = { etag: response.headers.etag, data: response.data }
+      }
       setPredictions(response.data.predictions)
       setPredictionMeta({
         date: response.data.prediction_date,
@@ -45,6 +65,7 @@ function App() {
     try {
       const response = await axios.get(`${API_URL}/api/pools`)
       setPools(response.data.pools)
+      poolsRef.current = response.data.pools
     } catch (err) {
       console.error('Failed to fetch pools:', err)
     }
@@ -67,6 +88,59 @@ function App() {
     fetchPools()
   }, [])
 
+  // Subscribe to pushed prediction snapshots/diffs instead of polling /api/predict
+  useEffect(() => {
+    const source = new EventSource(
+      `${API_URL}/api/stream?max_lag=${settings.maxLag}&forecast_horizon=${settings.forecastHorizon}`
+    )
+    const ranking = rankingRef.current
+
+    const showRanking = (payload) => {
+      const poolMeta = new Map(poolsRef.current.map((pool) => [pool.pool_address, pool]))
+      const top = [...ranking.entries()]
+        .sort((a, b) => a[1].rank - b[1].rank)
+        .slice(0, topNRef.current)
+        .map(([address, entry]) => ({
+          rank: entry.rank,
+          pool_address: address,
+          predicted_growth_rate: entry.predicted_growth_rate,
+          current_tx_count: poolMeta.get(address)?.tx_count ?? null,
+          fee_percentage: poolMeta.get(address)?.fee_percentage ?? null
+        }))
+      setPredictions(top)
+      setPredictionMeta({
+        date: payload.prediction_date,
+        horizon: settings.forecastHorizon,
+        totalPools: payload.total_pools
+      })
+    }
+
+    source.addEventListener('snapshot', (event) => {
+      const payload = JSON.parse(event.data)
+      ranking.clear()
+      payload.predictions.forEach(([address, rank, score]) => {
+        ranking.set(address, { rank, predicted_growth_rate: score })
+      })
+      showRanking(payload)
+    })
+
+    source.addEventListener('diff', async (event) => {
+      const payload = JSON.parse(event.data)
+      payload.changed.forEach(([address, rank, score]) => {
+        ranking.set(address, { rank, predicted_growth_rate: score })
+      })
+      payload.removed.forEach((address) => ranking.delete(address))
+      // New dataset: refresh pool metadata (revalidated via ETag) before re-rendering
+      await fetchPools()
+      showRanking(payload)
+    })
+
+    return () => {
+      source.close()
+      ranking.clear()
+    }
+  }, [settings.maxLag, settings.forecastHorizon])
+
   const formatGrowthRate = (rate) => {
     const percentage = (Math.exp(rate) - 1) * 100
     return percentage.toFixed(2)
@@ -3,9 +3,27 @@ import pandas as pd
 import joblib
 import argparse
 import json
+import math
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
 from pathlib import Path
 import lightgbm as lgb
 from sklearn.model_selection import train_test_split
+import profiling
+from pool_ids import PoolIds, normalize
+from ranking import merge_top_k, segment_top_k, top_k
+from prediction_store import PredictionStore, evaluate
+from pool_store import PoolStore
+
+# LightGBM parameters shared by full training, out-of-core training and refresh
+MODEL_PARAMS = {
+    "objective": "huber",
+    "metric": "huber",
+    "alpha": 0.9,
+}
 
 def write_to_json(file_name, dataset):
      with open(file_name, "w", encoding="utf-8") as f:
@@ -17,8 +35,8 @@ def open_json(file_name):
 
 #----------------------------------------------------------------------
 # Takes a data frame of liquidity pool logs and builds a dataframe of features for the model.
-# To maintain consistency for the contract column, we save the contract dictionary
-# to a json file.
+# To maintain consistency for the contract column, pool ids come from the
+# shared, append-only pool id dictionary (pool_ids.py).
 #----------------------------------------------------------------------
 def build_features(df_features, max_lag=7, train=False):
     # we transform tx count using log. The log(tx_count) difference between days is then used to approximate growth rate
@@ -38,28 +56,22 @@ def build_features(df_features, max_lag=7, train=False):
             .shift(k)
         )
 
-    # get rolling means of grwoth rate to use as features
+    # get rolling means of grwoth rate to use as features (grouped rolling, no per-pool python calls)
     rolling_list = [3, 5, 7, 14]
+    prev_growth = df_features.groupby('poolAddress')['growth_rate'].shift(1)
     for i in rolling_list:
         df_features[f'rolling_mean_{i}d'] = (
-            df_features
-            .groupby('poolAddress', group_keys=False)['growth_rate']
-            .transform(lambda s: s.shift(1).rolling(window=i, min_periods=1).mean())
+            prev_growth
+            .groupby(df_features['poolAddress'])
+            .rolling(window=i, min_periods=1)
+            .mean()
+            .reset_index(level=0, drop=True)
         )
     
-    # transform pool address to an int so it can be used by the model. save the contracts dictionary if the features are for training. load a saved dictionary if for prediciton
-    if train:
-        contracts = df_features['poolAddress'].unique()
-        contracts_dic = {v: i for i, v in enumerate(contracts)}
-        df_features['contract'] = df_features['poolAddress'].map(contracts_dic)
-        write_to_json(f"contracts_{max_lag}.json", contracts_dic)
-    else:
-        try:
-            contracts_dic = open_json(f"contracts_{max_lag}.json")
-        except:
-            print("Contracts mapping not found")
-            return 0
-        df_features['contract'] = df_features['poolAddress'].map(contracts_dic).fillna(-1).astype(int)
+    # transform pool address to an int so it can be used by the model. ids come from the append-only pool id
+    # dictionary (pool_ids.bin) shared with the API, so they stay stable across retrains. pools seen for the
+    # first time get the next id, whether the features are for training or prediction.
+    df_features['contract'] = get_pool_ids().assign(df_features['poolAddress'])
     
     # get all desired columns
     cols = ['contract', 'date', 'tx_count', 'fee_percentage', 'tx_count_cumulative', 'growth_rate', 'day_number', 'tx_transform'] 
@@ -76,6 +88,15 @@ def build_features(df_features, max_lag=7, train=False):
 
     return df_features
 
+# pool id dictionary of the working directory (where the models live)
+_pool_ids = {}
+
+def get_pool_ids():
+    model_dir = Path('.').resolve()
+    if model_dir not in _pool_ids:
+        _pool_ids[model_dir] = PoolIds.open(model_dir)
+    return _pool_ids[model_dir]
+
 #----------------------------------------------------------------------
 # create targets/labels for model training
 # forecast horizon indicates how many days in the future we calculate growth
@@ -86,7 +107,8 @@ def build_targets(df_features, forecast_horizon):
     df_features['target'] = (
         df_features
         .groupby('contract')['tx_transform']
-        .transform(lambda s: s.shift(forecast_horizon) - s)
+        .shift(forecast_horizon)
+        - df_features['tx_transform']
     )
 
     df_features = df_features.dropna(subset=['target'])
@@ -108,20 +130,43 @@ def filter_dataset(df_dataset):
     df_dataset = df_dataset[df_dataset['poolAddress'].isin(intersec)]
     return df_dataset
 
+#----------------------------------------------------------------------
+# Load pool_dataset_latest.csv, or read it through the embedded pool store at
+# db (pool_store.py), which is rebuilt from the CSV whenever the CSV changes.
+# With the store, the date range (start/end), complete=True (only pools with an
+# entry every day, like filter_dataset) and columns are applied by the query
+# instead of after reading everything.
+#----------------------------------------------------------------------
+def load_dataset(db=None, start=None, end=None, complete=False, columns=None):
+    if db is None:
+        return pd.read_csv('pool_dataset_latest.csv', usecols=columns)
+    store = PoolStore(db)
+    with profiling.stage("sync_store"):
+        store.sync('pool_dataset_latest.csv')
+    return store.frame(start=start, end=end, complete=complete, columns=columns)
+
 #----------------------------------------------------------------------
 # Train and save a volume growth prediction model.
 #----------------------------------------------------------------------
-def train_model(max_lag=7, forecast_horizon=1):
+def train_model(max_lag=7, forecast_horizon=1, db=None):
     try:
-        df_dataset = pd.read_csv('pool_dataset_latest.csv')
+        with profiling.stage("load") as s:
+            df_dataset = load_dataset(db, complete=True)
+            s.frame(df_dataset)
     except:
         print("File Not Found.")
         return 0
 
     #build features and targets for the model
-    df_dataset = filter_dataset(df_dataset)
-    df_dataset = build_features(df_dataset, max_lag, True)
-    df_dataset = build_targets(df_dataset, forecast_horizon)
+    with profiling.stage("filter") as s:
+        df_dataset = filter_dataset(df_dataset)
+        s.frame(df_dataset)
+    with profiling.stage("features") as s:
+        df_dataset = build_features(df_dataset, max_lag, True)
+        s.frame(df_dataset)
+    with profiling.stage("targets") as s:
+        df_dataset = build_targets(df_dataset, forecast_horizon)
+        s.frame(df_dataset)
 
     feature_cols = [c for c in df_dataset.columns if c not in ['target']]
     X = df_dataset[feature_cols]
@@ -130,63 +175,557 @@ def train_model(max_lag=7, forecast_horizon=1):
     #split the data between training and validation.
     X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.1, shuffle=False)
 
-    params = {
-        "objective": "huber",
-        "metric": "huber",
-        "alpha": 0.9,
-    }
-
-    model = lgb.LGBMRegressor(**params)
+    model = lgb.LGBMRegressor(**MODEL_PARAMS)
 
-    model.fit(
-        X_train, y_train,
-        eval_set = [(X_val, y_val)],
-        callbacks=[lgb.early_stopping(stopping_rounds=10)]
-    )
+    with profiling.stage("fit"):
+        model.fit(
+            X_train, y_train,
+            eval_set = [(X_val, y_val)],
+            callbacks=[lgb.early_stopping(stopping_rounds=10)]
+        )
 
     # save model
-    joblib.dump(model, f"growth_model_{forecast_horizon}_{max_lag}.pkl")
+    with profiling.stage("save"):
+        joblib.dump(model, f"growth_model_{forecast_horizon}_{max_lag}.pkl")
+        write_model_meta(forecast_horizon, max_lag, {"full_train": date.today().isoformat(), "refreshes": 0})
+
+#----------------------------------------------------------------------
+# Model metadata sidecar (growth_model_{h}_{lag}.json): when the model was
+# last fully trained and how many refreshes it has had since.
+#----------------------------------------------------------------------
+def write_model_meta(forecast_horizon, max_lag, meta):
+    write_to_json(f"growth_model_{forecast_horizon}_{max_lag}.json", meta)
+
+def read_model_meta(forecast_horizon, max_lag):
+    try:
+        return open_json(f"growth_model_{forecast_horizon}_{max_lag}.json")
+    except FileNotFoundError:
+        # models trained before the sidecar existed: fall back to the pickle's mtime
+        mtime = os.path.getmtime(f"growth_model_{forecast_horizon}_{max_lag}.pkl")
+        return {"full_train": datetime.fromtimestamp(mtime).date().isoformat(), "refreshes": 0}
+
+def huber_loss(y, preds, alpha=MODEL_PARAMS["alpha"]):
+    diff = np.abs(np.asarray(y) - preds)
+    return float(np.mean(np.where(diff <= alpha, 0.5 * diff ** 2, alpha * (diff - 0.5 * alpha))))
+
+#----------------------------------------------------------------------
+# Warm-start refresh of a trained model on recent days.
+# Loads growth_model_{h}_{lag}.pkl and either continues boosting from it
+# (mode "boost") or refits its leaf values (mode "refit"). It trains on the
+# refresh_days of data before valid_days of early-stopping validation. The
+# final guard_days, which boosting never sees, decide whether the refreshed
+# model replaces the saved one: only if its loss there is no worse than the
+# current model's (within tolerance). Once the last full train
+# is full_retrain_days old, refresh runs a full train instead.
+#----------------------------------------------------------------------
+def refresh_model(max_lag=7, forecast_horizon=1, refresh_days=28, valid_days=3, guard_days=3, rounds=20,
+                  mode="boost", tolerance=0.0, full_retrain_days=7, db=None):
+    model_path = f"growth_model_{forecast_horizon}_{max_lag}.pkl"
+    try:
+        with profiling.stage("load_model"):
+            model = joblib.load(model_path)
+    except FileNotFoundError:
+        print("Model not found, running a full train.")
+        return train_model(max_lag, forecast_horizon, db)
+
+    meta = read_model_meta(forecast_horizon, max_lag)
+    age = (date.today() - date.fromisoformat(meta["full_train"])).days
+    if age >= full_retrain_days:
+        print(f"Last full train was {age} days ago, running a full train.")
+        return train_model(max_lag, forecast_horizon, db)
+
+    # models from train_model are LGBMRegressors, out-of-core and refreshed models are Boosters
+    booster = model.booster_ if isinstance(model, lgb.LGBMModel) else model
+
+    try:
+        with profiling.stage("load") as s:
+            df_dataset = load_dataset(db, complete=True)
+            s.frame(df_dataset)
+    except FileNotFoundError:
+        print("File Not Found.")
+        return 0
+
+    with profiling.stage("filter") as s:
+        df_dataset = filter_dataset(df_dataset)
+        s.frame(df_dataset)
+    with profiling.stage("features") as s:
+        df_dataset = build_features(df_dataset, max_lag, False)
+        s.frame(df_dataset)
+    with profiling.stage("targets") as s:
+        df_dataset = build_targets(df_dataset, forecast_horizon)
+        s.frame(df_dataset)
+
+    dates = np.sort(df_dataset['date'].unique())
+    if len(dates) <= valid_days + guard_days:
+        print("Not enough labelled days to refresh.")
+        return 0
+    guard_start = dates[-guard_days]
+    valid_start = dates[-valid_days - guard_days]
+    train_start = dates[max(0, len(dates) - guard_days - valid_days - refresh_days)]
+
+    feature_cols = [c for c in df_dataset.columns if c not in ['target']]
+    df_train = df_dataset[(df_dataset['date'] >= train_start) & (df_dataset['date'] < valid_start)]
+    df_val = df_dataset[(df_dataset['date'] >= valid_start) & (df_dataset['date'] < guard_start)]
+    df_guard = df_dataset[df_dataset['date'] >= guard_start]
+    X_train, y_train = df_train[feature_cols], df_train['target']
+    X_val, y_val = df_val[feature_cols], df_val['target']
+    X_guard, y_guard = df_guard[feature_cols], df_guard['target']
+
+    with profiling.stage("fit"):
+        if mode == "refit":
+            refreshed = booster.refit(X_train, y_train)
+        else:
+            refreshed = lgb.train(
+                MODEL_PARAMS, lgb.Dataset(X_train, y_train),
+                num_boost_round=rounds,
+                init_model=booster,
+                valid_sets=[lgb.Dataset(X_val, y_val)],
+                callbacks=[lgb.early_stopping(stopping_rounds=10)]
+            )
+
+    # guardrail: keep the current model unless the refreshed one does at least as well on
+    # days early stopping never saw (the validation days picked the refreshed model's rounds)
+    current_loss = huber_loss(y_guard, booster.predict(X_guard))
+    refreshed_loss = huber_loss(y_guard, refreshed.predict(X_guard))
+    print(f"Guardrail huber loss: current = {current_loss:.6f}, refreshed = {refreshed_loss:.6f}")
+    if refreshed_loss > current_loss * (1 + tolerance):
+        print("Refreshed model is worse than the current one. Keeping the current model.")
+        return 0
+
+    with profiling.stage("save"):
+        joblib.dump(refreshed, model_path)
+        meta["refreshes"] = meta.get("refreshes", 0) + 1
+        meta["last_refresh"] = date.today().isoformat()
+        write_model_meta(forecast_horizon, max_lag, meta)
+    print(f"Saved refreshed model: {model_path}")
+    return refreshed
+
+#----------------------------------------------------------------------
+# Out-of-core training on a date-partitioned dataset.
+# A partition directory holds one CSV per day or month
+# (pool_dataset_2025-01.csv, ...) whose names sort in date order. Features
+# are built one partition at a time. Each partition carries a halo of the
+# previous max_lag + 14 days, so the lags and the 14 day rolling means match
+# the in-memory build. It also carries the next forecast_horizon days for the
+# targets. Finished feature blocks are spilled to .npy files and fed to
+# LightGBM through Sequence objects, so memory holds only the halo, the
+# labels and LightGBM's binned matrix.
+#----------------------------------------------------------------------
+PARTITION_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m"}
+
+def list_partitions(partitions_dir):
+    return sorted(Path(partitions_dir).glob("pool_dataset_*.csv"))
+
+def partition_dataset(partitions_dir, partition_by="month", chunk_rows=500_000):
+    if list_partitions(partitions_dir):
+        print(f"{partitions_dir} already contains partitions.")
+        return 0
+
+    out_dir = Path(partitions_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = set()
+    try:
+        for chunk in pd.read_csv('pool_dataset_latest.csv', chunksize=chunk_rows):
+            keys = pd.to_datetime(chunk['date']).dt.strftime(PARTITION_FORMATS[partition_by])
+            for key, part in chunk.groupby(keys):
+                path = out_dir / f"pool_dataset_{key}.csv"
+                part.to_csv(path, mode='a', header=path not in written, index=False)
+                written.add(path)
+    except FileNotFoundError:
+        print("File Not Found.")
+        return 0
+
+    print(f"Wrote {len(written)} partitions to {out_dir}")
+
+# first pass over the partitions: keep pools that have an entry on every date
+# (same rule as filter_dataset) and give them ids in order of appearance.
+def scan_partitions(paths):
+    intersec = None
+    seen = {}
+    for path in paths:
+        df = pd.read_csv(path, usecols=['poolAddress', 'date'])
+        for _, pools in df.groupby('date')['poolAddress']:
+            pools = set(pools.unique())
+            intersec = pools if intersec is None else intersec.intersection(pools)
+        for pool in df['poolAddress'].unique():
+            seen.setdefault(pool, len(seen))
+
+    keep = [pool for pool in seen if pool in (intersec or set())]
+    get_pool_ids().assign(keep)
+    return set(keep)
+
+# yields (feature_cols, X, y) for every partition, in date order
+def iter_partition_features(paths, pools, max_lag, forecast_horizon):
+    halo = pd.Timedelta(days=max_lag + 14)
+    horizon = pd.Timedelta(days=forecast_horizon)
+    window = None   # raw rows still needed: the halo plus rows not yet emitted
+    done_until = None
+
+    for i, path in enumerate(paths):
+        df = pd.read_csv(path)
+        df = df[df['poolAddress'].isin(pools)]
+        df['date'] = pd.to_datetime(df['date'])
+        df = df.sort_values('date', kind='stable')
+        window = df if window is None else pd.concat([window, df], ignore_index=True)
+
+        # rows are final once their target horizon has been loaded (or at the end of the data)
+        ready_until = window['date'].max()
+        if i < len(paths) - 1:
+            ready_until -= horizon
+        if done_until is not None and ready_until <= done_until:
+            continue
+
+        df_block = build_features(window.copy(), max_lag, True)
+        df_block = build_targets(df_block, forecast_horizon)
+        emit = df_block['date'] <= ready_until.toordinal()
+        if done_until is not None:
+            emit &= df_block['date'] > done_until.toordinal()
+        df_block = df_block[emit]
+
+        feature_cols = [c for c in df_block.columns if c not in ['target']]
+        yield feature_cols, df_block[feature_cols].to_numpy(dtype=np.float64), df_block['target'].to_numpy()
+
+        done_until = ready_until
+        window = window[window['date'] > done_until - halo]
+
+# LightGBM Sequence over rows [start, stop) of a spilled feature block
+class BlockSequence(lgb.Sequence):
+    def __init__(self, path, start, stop, batch_size=65536):
+        self.data = np.load(path, mmap_mode='r')
+        self.start = start
+        self.stop = stop
+        self.batch_size = batch_size
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            begin, end, _ = idx.indices(len(self))
+            return np.asarray(self.data[self.start + begin:self.start + end])
+        return np.asarray(self.data[self.start + idx])
+
+    def __len__(self):
+        return self.stop - self.start
+
+def split_sequences(blocks, n_train):
+    train_seqs, val_seqs = [], []
+    offset = 0
+    for path, n_rows in blocks:
+        cut = min(max(n_train - offset, 0), n_rows)
+        if cut > 0:
+            train_seqs.append(BlockSequence(path, 0, cut))
+        if cut < n_rows:
+            val_seqs.append(BlockSequence(path, cut, n_rows))
+        offset += n_rows
+    return train_seqs, val_seqs
+
+def train_model_out_of_core(partitions_dir, max_lag=7, forecast_horizon=1, spill_dir=None):
+    paths = list_partitions(partitions_dir)
+    if not paths:
+        print("No partitions found.")
+        return 0
+
+    with profiling.stage("filter"):
+        pools = scan_partitions(paths)
+
+    with tempfile.TemporaryDirectory(dir=spill_dir) as tmp_dir:
+        blocks, labels = [], []
+        with profiling.stage("features"):
+            for i, (feature_cols, X, y) in enumerate(iter_partition_features(paths, pools, max_lag, forecast_horizon)):
+                if len(X) == 0:
+                    continue
+                path = Path(tmp_dir) / f"block_{i:05d}.npy"
+                np.save(path, X)
+                blocks.append((path, len(X)))
+                labels.append(y)
+
+        if not blocks:
+            print("No training rows.")
+            return 0
+
+        # same split as train_test_split(test_size=0.1, shuffle=False): the last 10% of rows by date
+        y = np.concatenate(labels)
+        n_train = len(y) - math.ceil(len(y) * 0.1)
+        train_seqs, val_seqs = split_sequences(blocks, n_train)
+
+        train_set = lgb.Dataset(train_seqs, label=y[:n_train], feature_name=feature_cols)
+        val_set = lgb.Dataset(val_seqs, label=y[n_train:], reference=train_set)
+
+        with profiling.stage("fit"):
+            model = lgb.train(
+                MODEL_PARAMS, train_set,
+                valid_sets=[val_set],
+                callbacks=[lgb.early_stopping(stopping_rounds=10)]
+            )
+
+    # save model (a Booster; predict() and the API call .predict on it the same way)
+    with profiling.stage("save"):
+        joblib.dump(model, f"growth_model_{forecast_horizon}_{max_lag}.pkl")
+        write_model_meta(forecast_horizon, max_lag, {"full_train": date.today().isoformat(), "refreshes": 0})
+
+#----------------------------------------------------------------------
+# Sharded prediction. Pools are split across worker processes by a hash of
+# their address (every feature is computed within one pool, so a shard needs
+# nothing from the others). Each worker builds the features of its pools,
+# scores them with the model loaded once before the workers start (shared
+# read-only through fork), and returns its rows for pred_date with its local
+# top k; merge_top_k combines those into the same ranking a single process
+# gives.
+#----------------------------------------------------------------------
+def pool_shards(addresses, n_shards):
+    """Shard (0..n_shards-1) of each pool address, the same in every run and process."""
+    return (pd.util.hash_array(normalize(addresses)) % np.uint64(n_shards)).astype(np.intp)
+
+# the job every shard worker reads: set before forking (or by the initializer where fork is unavailable)
+_shard_job = {}
+
+def _init_shard_job(job):
+    _shard_job.update(job)
+
+def _predict_shard(shard):
+    job = _shard_job
+    df_shard = job["dataset"][job["shards"] == shard]
+    if df_shard.empty:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0), {}
+    df_features = build_features(df_shard.copy(), job["max_lag"], False)
+    df_features = df_features[df_features["date"] == job["pred_date"]].sort_index()
+    # one thread per worker: the workers are the parallelism
+    preds = job["model"].predict(df_features, num_threads=1)
+
+    if job["segment_by"] is None:
+        selected = {None: top_k(preds, job["k"])}
+    else:
+        selected = segment_top_k(preds, df_shard.loc[df_features.index, job["segment_by"]], job["k"])
+    candidates = {segment: df_features.index[order].to_numpy() for segment, (order, _) in selected.items()}
+    return df_features.index.to_numpy(), df_features["contract"].to_numpy(), preds, candidates
+
+def predict_sharded(df_dataset, model, max_lag, pred_date, k, segment_by, workers):
+    """(pred_date feature rows with predictions in dataset order, {segment: (order, ranks)}), over `workers` processes."""
+    # ids are assigned here, in dataset order, so workers only look them up and get the single-process ids
+    get_pool_ids().assign(df_dataset['poolAddress'])
+    job = {"dataset": df_dataset, "shards": pool_shards(df_dataset['poolAddress'], workers), "model": model,
+           "max_lag": max_lag, "pred_date": pred_date, "k": k, "segment_by": segment_by}
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        _init_shard_job(job)
+        executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork"))
+    else:
+        executor = ProcessPoolExecutor(workers, initializer=_init_shard_job, initargs=(job,))
+    try:
+        with executor:
+            results = list(executor.map(_predict_shard, range(workers)))
+    finally:
+        _shard_job.clear()
+
+    index = np.concatenate([r[0] for r in results])
+    df_features = pd.DataFrame({
+        "date": pred_date,
+        "contract": np.concatenate([r[1] for r in results]),
+        "predictions": np.concatenate([r[2] for r in results]),
+    }, index=index).sort_index()
+
+    segments = sorted({segment for r in results for segment in r[3]}, key=lambda v: (v is None, v))
+    selected = {}
+    for segment in segments:
+        positions = [df_features.index.get_indexer(r[3][segment]) for r in results if segment in r[3]]
+        if segment is None:
+            selected[None] = merge_top_k(df_features["predictions"], positions, k)
+        else:
+            # merge within the segment's rows, which keep dataset order
+            rows = np.flatnonzero(df_dataset.loc[df_features.index, segment_by].to_numpy() == segment)
+            local = [np.searchsorted(rows, p) for p in positions]
+            order, ranks = merge_top_k(df_features["predictions"].to_numpy()[rows], local, k)
+            selected[segment] = (rows[order], ranks)
+    return df_features, selected
 
 #----------------------------------------------------------------------
 # predict using a trained model.
 # Currently the model takes a file of liquidity pool logs, and makes its 
 # prediction for the day after the most recent day in that log. 
+# Returns the top k pools (k=None ranks every pool), or the top k within each
+# value of segment_by (e.g. poolType or fee). All predictions are appended to
+# the prediction store in store_dir (None to skip). workers > 1 builds
+# features and scores in that many processes (predict_sharded), with the
+# same results.
 #----------------------------------------------------------------------
-def predict(max_lag=7, forecast_horizon=1):
+def predict(max_lag=7, forecast_horizon=1, k=5, segment_by=None, store_dir="predictions", db=None, workers=1):
     try:
-        df_features = pd.read_csv('pool_dataset_latest.csv')
+        with profiling.stage("load") as s:
+            # every date is read: the rolling means depend on the whole history in their last bits
+            df_dataset = load_dataset(db, complete=True)
+            s.frame(df_dataset)
     except:
         print("File Not Found.")
         return 0
-    
-    df_features = filter_dataset(df_features)
-    df_features = build_features(df_features, max_lag, False)
-    pred_date = df_features["date"].max()
-    df_features = df_features[df_features["date"] == pred_date] # extract most recent day
 
+    if segment_by is not None and segment_by not in df_dataset.columns:
+        print(f"Unknown segment column: {segment_by}")
+        return 0
+    
+    with profiling.stage("filter") as s:
+        df_dataset = filter_dataset(df_dataset)
+        s.frame(df_dataset)
     model = joblib.load(f"growth_model_{forecast_horizon}_{max_lag}.pkl") #load a trained model.
-    preds = model.predict(df_features)
-    df_features.loc[:, "predictions"] = preds
+    pred_date = pd.Timestamp(df_dataset['date'].max()).toordinal()
+    k = len(df_dataset) if k is None else k
+
+    if workers > 1:
+        with profiling.stage("sharded_predict") as s:
+            df_features, selected = predict_sharded(df_dataset, model, max_lag, pred_date, k, segment_by, workers)
+            preds = df_features["predictions"].to_numpy()
+            s.frame(df_features)
+    else:
+        with profiling.stage("features") as s:
+            df_features = build_features(df_dataset.copy(), max_lag, False)
+            s.frame(df_features)
+        # extract most recent day, in dataset order (the date sort above does not keep it)
+        df_features = df_features[df_features["date"] == pred_date].sort_index()
+
+        with profiling.stage("predict") as s:
+            preds = model.predict(df_features)
+            df_features.loc[:, "predictions"] = preds
+            s.frame(df_features)
+
+    # keep every pool's prediction in the prediction store for later evaluation
+    if store_dir:
+        with profiling.stage("store"):
+            store = PredictionStore(store_dir)
+            version = store.register(f"growth_model_{forecast_horizon}_{max_lag}.pkl", forecast_horizon, max_lag)
+            store.append(version, int(pred_date), df_features['contract'], preds)
+
+    # select the top k pools (every pool if k is None), overall or within each segment, without sorting
+    # the rest. ties keep dataset order. sharded runs merged their shards' selections already.
+    if workers <= 1:
+        with profiling.stage("rank"):
+            if segment_by is None:
+                selected = {None: top_k(preds, k)}
+            else:
+                selected = segment_top_k(preds, df_dataset.loc[df_features.index, segment_by], k)
+
+    frames = []
+    for segment, (order, ranks) in selected.items():
+        df_segment = df_features.iloc[order][['date', 'contract', 'predictions']].copy()
+        df_segment['rank'] = ranks
+        if segment_by is not None:
+            df_segment[segment_by] = segment
+        frames.append(df_segment)
+
+        title = f"Top {len(order)} pools for predicted growth rate on {date.fromordinal(int(pred_date))}"
+        print(title if segment_by is None else f"{title} ({segment_by} = {segment})")
+        addresses = get_pool_ids().addresses(df_segment['contract'])
+        for rank, pool, pred in zip(ranks, addresses, df_segment['predictions']):
+            print(f'Pool {rank} by volume growth rate: poolAddress = {pool}, predicted growth rate = {pred}')
+
+    df_results = pd.concat(frames)
+    return df_results
 
-    df_features['rank'] = (
-        df_features
-        .groupby('date')['predictions']
-        .rank(ascending=False)
-    )
+#----------------------------------------------------------------------
+# Backfill the prediction store with a track record.
+# Scores every (pool, date) row of the feature matrix between start_date and
+# end_date in one predict call instead of one predict run per day, ranks the
+# pools within each date with a grouped rank (ties keep dataset order, as in
+# predict) and appends every date the store does not hold yet for this model
+# version in a single write. Returns the scored rows with their ranks.
+#----------------------------------------------------------------------
+def backfill(max_lag=7, forecast_horizon=1, start_date=None, end_date=None, store_dir="predictions", db=None):
+    try:
+        with profiling.stage("load") as s:
+            # every date is read: the first backfilled dates need the days before them, and the pools are
+            # the ones predict scores (complete over the whole dataset)
+            df_dataset = load_dataset(db, complete=True)
+            s.frame(df_dataset)
+    except:
+        print("File Not Found.")
+        return 0
 
-    df_results = df_features[['date', 'contract', 'predictions', 'rank']].copy()
-    
-    df_results.sort_values('rank', ascending=True, inplace=True)
+    with profiling.stage("filter") as s:
+        df_dataset = filter_dataset(df_dataset)
+        s.frame(df_dataset)
+    with profiling.stage("features") as s:
+        df_features = build_features(df_dataset.copy(), max_lag, False)
+        start = pd.Timestamp(start_date).toordinal() if start_date else df_features["date"].min()
+        end = pd.Timestamp(end_date).toordinal() if end_date else df_features["date"].max()
+        # dataset order within each date (the date sort in build_features does not keep it)
+        df_features = df_features[df_features["date"].between(start, end)].sort_index()
+        s.frame(df_features)
+    if df_features.empty:
+        print("No rows to backfill in this range.")
+        return 0
 
-    # get top 5 pools.
-    date = df_results.iloc[0]['date']
-    print(f"Top 5 pools for predicted growth rate on {date}")
-    for i in range(5):
-        pool = df_results.iloc[i]['contract']
-        pred = df_results.iloc[i]['predictions']
-        print(f'Pool {i} by volume growth rate: poolAddress = {pool}, predicted growth rate = {pred}')
+    with profiling.stage("predict") as s:
+        model = joblib.load(f"growth_model_{forecast_horizon}_{max_lag}.pkl") #load a trained model.
+        df_features["predictions"] = model.predict(df_features)
+        s.frame(df_features)
 
-    return df_results
+    with profiling.stage("rank"):
+        df_features["rank"] = (
+            df_features
+            .groupby("date")["predictions"]
+            .rank(ascending=False, method="first")
+            .astype(np.int64)
+        )
+
+    if store_dir:
+        with profiling.stage("store"):
+            store = PredictionStore(store_dir)
+            version = store.register(f"growth_model_{forecast_horizon}_{max_lag}.pkl", forecast_horizon, max_lag)
+            written = store.append_dates(version, df_features["date"], df_features["contract"], df_features["predictions"])
+    else:
+        written = 0
+
+    dates = df_features["date"].nunique()
+    print(f"Backfilled {dates} dates from {date.fromordinal(int(df_features['date'].min()))} to "
+          f"{date.fromordinal(int(df_features['date'].max()))}: {len(df_features)} predictions scored, "
+          f"{written} new rows stored")
+    return df_features[["date", "contract", "predictions", "rank"]]
+
+#----------------------------------------------------------------------
+# Evaluate stored predictions against realized growth.
+# Reads past predictions of the model from the prediction store (no
+# recomputation) and joins them to the realized growth in the dataset.
+# Prints the MAE, rank correlation and top-N hit rate per date and per
+# model version.
+#----------------------------------------------------------------------
+def evaluate_predictions(max_lag=7, forecast_horizon=1, start_date=None, end_date=None, top_n=10, store_dir="predictions",
+                         db=None):
+    store = PredictionStore(store_dir)
+    versions = {code: meta for code, meta in store.versions().items()
+                if meta["forecast_horizon"] == forecast_horizon and meta["max_lag"] == max_lag}
+    if not versions:
+        print("No stored predictions for this model.")
+        return 0
+
+    start = pd.Timestamp(start_date).toordinal() if start_date else None
+    end = pd.Timestamp(end_date).toordinal() if end_date else None
+    with profiling.stage("read"):
+        df_pred = store.read(versions, start, end)
+
+    try:
+        with profiling.stage("load") as s:
+            # realized growth needs the stored dates and forecast_horizon days after them
+            end_realized = (pd.Timestamp(end_date) + pd.Timedelta(days=forecast_horizon)).strftime('%Y-%m-%d') if end_date else None
+            df_dataset = load_dataset(db, start=start_date, end=end_realized, columns=['poolAddress', 'date', 'tx_count'])
+            s.frame(df_dataset)
+    except FileNotFoundError:
+        print("File Not Found.")
+        return 0
+
+    with profiling.stage("evaluate"):
+        per_date, summary = evaluate(df_pred, df_dataset, get_pool_ids(), forecast_horizon, top_n)
+    if per_date.empty:
+        print("No stored predictions with realized growth in this range.")
+        return 0
+
+    print(f"{'date':<12} {'version':>8} {'pools':>7} {'mae':>9} {'rank corr':>10} {f'hit@{top_n}':>8}")
+    for row in per_date.itertuples():
+        print(f"{date.fromordinal(int(row.date)).isoformat():<12} {row.version:>8} {row.pools:>7} "
+              f"{row.mae:>9.4f} {row.rank_corr:>10.3f} {row.hit_rate:>8.2%}")
+    print()
+    for row in summary.itertuples():
+        meta = versions[row.version]
+        print(f"Version {row.version} ({meta['model']} {meta['hash']}): {row.dates} dates "
+              f"{date.fromordinal(int(row.first_date))} to {date.fromordinal(int(row.last_date))}, "
+              f"mae = {row.mae:.4f}, rank corr = {row.rank_corr:.3f}, hit@{top_n} = {row.hit_rate:.2%}")
+
+    return per_date, summary
 
 #----------------------------------------------------------------------
 # Arg parser. the current commands are train and predict.
@@ -194,16 +733,62 @@ def predict(max_lag=7, forecast_horizon=1):
 def main():
     parser = argparse.ArgumentParser(description="volume_growth_model.py")
 
-    parser.add_argument("command", choices=["train", "predict"])
+    parser.add_argument("command", choices=["train", "predict", "backfill", "refresh", "partition", "evaluate"])
     parser.add_argument("--forecast_horizon", type=int, default=1)
     parser.add_argument("--max_lag", type=int, default=7)
+    parser.add_argument("--top_k", type=int, default=5, help="predict: number of top pools to report")
+    parser.add_argument("--segment_by", default=None,
+                        help="predict: report the top pools within each value of this column (e.g. poolType, fee)")
+    parser.add_argument("--store_dir", default="predictions",
+                        help="prediction store written by predict and backfill, read by evaluate")
+    parser.add_argument("--no_store", action="store_true", help="predict/backfill: do not record predictions in the store")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="predict: build features and score in this many processes, pools sharded by address hash")
+    parser.add_argument("--start_date", default=None, help="evaluate/backfill: first prediction date (YYYY-MM-DD)")
+    parser.add_argument("--end_date", default=None, help="evaluate/backfill: last prediction date (YYYY-MM-DD)")
+    parser.add_argument("--top_n", type=int, default=10, help="evaluate: size of the top-N used for hit rates")
+    parser.add_argument("--db", default=None,
+                        help="read the dataset through this embedded store (built from pool_dataset_latest.csv)")
+    parser.add_argument("--partitions_dir", default=None,
+                        help="train out-of-core from this date-partitioned dataset (written by the partition command)")
+    parser.add_argument("--partition_by", choices=list(PARTITION_FORMATS), default="month")
+    parser.add_argument("--spill_dir", default=None, help="where to spill feature blocks (default: system temp)")
+    parser.add_argument("--refresh_mode", choices=["boost", "refit"], default="boost",
+                        help="refresh: continue boosting from the saved model, or refit its leaf values")
+    parser.add_argument("--refresh_days", type=int, default=28, help="refresh: days of recent data to train on")
+    parser.add_argument("--valid_days", type=int, default=3, help="refresh: days held out for early stopping")
+    parser.add_argument("--guard_days", type=int, default=3,
+                        help="refresh: most recent days held out to compare the refreshed and current model")
+    parser.add_argument("--refresh_rounds", type=int, default=20, help="refresh: maximum boosting rounds to add")
+    parser.add_argument("--tolerance", type=float, default=0.0,
+                        help="refresh: accepted relative increase in validation loss over the current model")
+    parser.add_argument("--full_retrain_days", type=int, default=7,
+                        help="refresh: run a full train instead once the last one is this many days old")
+    profiling.add_arguments(parser)
 
     args = parser.parse_args()
+    profiling.configure(args)
 
-    if args.command == 'train':
-        train_model(args.max_lag, args.forecast_horizon)
+    if args.command == 'train' and args.partitions_dir:
+        train_model_out_of_core(args.partitions_dir, args.max_lag, args.forecast_horizon, args.spill_dir)
+    elif args.command == 'train':
+        train_model(args.max_lag, args.forecast_horizon, args.db)
     elif args.command == 'predict':
-        predict(args.max_lag, args.forecast_horizon)
+        predict(args.max_lag, args.forecast_horizon, args.top_k, args.segment_by,
+                None if args.no_store else args.store_dir, args.db, args.workers)
+    elif args.command == 'backfill':
+        backfill(args.max_lag, args.forecast_horizon, args.start_date, args.end_date,
+                 None if args.no_store else args.store_dir, args.db)
+    elif args.command == 'evaluate':
+        evaluate_predictions(args.max_lag, args.forecast_horizon, args.start_date, args.end_date,
+                             args.top_n, args.store_dir, args.db)
+    elif args.command == 'refresh':
+        refresh_model(args.max_lag, args.forecast_horizon, args.refresh_days, args.valid_days, args.guard_days,
+                      args.refresh_rounds, args.refresh_mode, args.tolerance, args.full_retrain_days, args.db)
+    elif args.command == 'partition':
+        partition_dataset(args.partitions_dir or 'partitions', args.partition_by)
+
+    profiling.report()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,153 @@
+"""
+POOL ID DICTIONARY
+==================
+Stable integer ids for pool addresses, shared by the trainer and the API.
+
+pool_ids.bin is an append-only array of 20-byte addresses, and a pool's id is
+its record index. Ids never change once assigned, so new pools get the next id
+without retraining. Readers memory-map the file and look addresses up through
+a hash index, vectorized over whole columns:
+
+    ids = PoolIds.open(model_dir)
+    df['contract'] = ids.assign(df['poolAddress'])    # appends unseen pools
+    df['contract'] = ids.lookup(df['poolAddress'])    # -1 for unseen pools
+    addresses = ids.addresses(df['contract'])
+
+Appends take an exclusive flock, so several trainers or API workers can share
+one file.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: single writer only
+    fcntl = None
+
+FILE_NAME = "pool_ids.bin"
+RECORD_BYTES = 20
+
+
+def _legacy_mapping(model_dir, legacy=None) -> dict:
+    """{address: id} of the legacy contracts file, {} when there is none."""
+    paths = [Path(legacy)] if legacy is not None else sorted(Path(model_dir).glob("contracts_*.json"))
+    mappings = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            mappings[path.name] = json.load(f)
+    if len({json.dumps(m, sort_keys=True) for m in mappings.values()}) > 1:
+        raise ValueError(
+            f"Conflicting legacy pool ids in {model_dir} ({', '.join(mappings)}); "
+            "keep only the file the deployed models were trained with, or pass it as legacy"
+        )
+    return next(iter(mappings.values()), {})
+
+
+def normalize(addresses) -> np.ndarray:
+    """Lowercased addresses as an object array (accepts lists, arrays and Series of any string dtype)."""
+    return pd.Series(addresses, copy=False).astype(str).str.lower().to_numpy(dtype=object)
+
+
+class PoolIds:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._stamp = None
+        self._addresses = np.empty(0, dtype=object)
+        self._index = pd.Index(self._addresses)
+
+    @classmethod
+    def open(cls, model_dir, legacy=None):
+        """The dictionary in model_dir, seeded from a legacy contracts_{lag}.json on first use.
+
+        legacy names the contracts file to seed from; by default the one in
+        model_dir is used, and several that map pools differently are an error.
+        """
+        ids = cls(Path(model_dir) / FILE_NAME)
+        if not ids.path.exists():
+            mapping = _legacy_mapping(model_dir, legacy)
+            if mapping:
+                # keep the ids existing models were trained with
+                ids.assign(sorted(mapping, key=mapping.get))
+        return ids
+
+    def _refresh(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._stamp:
+            return
+
+        # ignore a torn trailing record from an interrupted append
+        n = stat.st_size // RECORD_BYTES
+        known = len(self._addresses)
+        if n > known:
+            records = np.memmap(self.path, dtype=np.uint8, mode="r", shape=(n, RECORD_BYTES))
+            hex_new = records[known:].tobytes().hex()
+            width = RECORD_BYTES * 2
+            new = np.array(["0x" + hex_new[i:i + width] for i in range(0, len(hex_new), width)], dtype=object)
+            self._addresses = np.concatenate([self._addresses, new])
+            self._index = pd.Index(self._addresses)
+        self._stamp = stamp
+
+    def __len__(self):
+        self._refresh()
+        return len(self._addresses)
+
+    def lookup(self, addresses) -> np.ndarray:
+        """Ids of the given addresses, -1 where a pool has no id yet."""
+        self._refresh()
+        return self._index.get_indexer(normalize(addresses)).astype(np.int64)
+
+    def assign(self, addresses) -> np.ndarray:
+        """Ids of the given addresses, appending pools that have none yet."""
+        keys = normalize(addresses)
+        ids = self.lookup(keys)
+        if (ids >= 0).all():
+            return ids
+
+        new = pd.unique(keys[ids < 0])
+        payload = b"".join(_encode(a) for a in new)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                # another writer may have added some of them while we waited for the lock
+                self._refresh()
+                missing = self._index.get_indexer(new) < 0
+                if not missing.all():
+                    payload = b"".join(_encode(a) for a in new[missing])
+                size = f.seek(0, os.SEEK_END)
+                if size % RECORD_BYTES:
+                    f.truncate(size - size % RECORD_BYTES)
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+        return self.lookup(keys)
+
+    def addresses(self, ids) -> np.ndarray:
+        """Addresses for the given ids (None for ids that are not assigned)."""
+        self._refresh()
+        ids = np.asarray(ids, dtype=np.int64)
+        out = np.full(len(ids), None, dtype=object)
+        valid = (ids >= 0) & (ids < len(self._addresses))
+        out[valid] = self._addresses[ids[valid]]
+        return out
+
+
+def _encode(address):
+    if len(address) != 2 + RECORD_BYTES * 2 or not address.startswith("0x"):
+        raise ValueError(f"Not a 20-byte hex pool address: {address!r}")
+    return bytes.fromhex(address[2:])
@@ -0,0 +1,226 @@
+"""
+POOL STORE
+==========
+Optional embedded SQLite copy of pool_dataset_latest.csv, laid out like the
+pools / daily_metrics tables of apy-data-miner/infrastructure/schema.sql and
+indexed the same way, so the model CLI and the API can ask for one pool's
+history or the last few days without scanning the whole CSV.
+
+    store = PoolStore("pool_store.db")
+    store.sync("pool_dataset_latest.csv")           # rebuilds only when the CSV changed
+    df = store.history("0x88e6...")
+    df = store.frame(start="2025-10-01", complete=True, columns=["poolAddress", "date", "tx_count"])
+
+Frames come back in the CSV's column layout (poolAddress, date, tx_count,
+...) and row order, with the filter pushed into the query: daily_metrics is clustered on
+(pool_address, date) and indexed on date. `complete` keeps the pools with
+an entry on every date of the dataset, the same rule as filter_dataset.
+
+sync() builds a new database next to the old one and swaps it in with
+os.replace, so readers always see a whole copy.
+"""
+
+import os
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: single writer only
+    fcntl = None
+
+# dataset column -> daily_metrics column
+METRIC_COLUMNS = {
+    "poolAddress": "pool_address",
+    "date": "date",
+    "tx_count": "tx_count",
+    "unique_users": "unique_users",
+    "tx_count_cumulative": "tx_count_cumulative",
+    "day_number": "day_number",
+    "user_sketch": "user_sketch",
+}
+# dataset column -> pools column (taken from each pool's latest row)
+POOL_COLUMNS = {
+    "pool_name": "pool_name",
+    "token0Symbol": "token0_symbol",
+    "token1Symbol": "token1_symbol",
+    "fee": "fee_tier",
+    "fee_percentage": "fee_percentage",
+    "poolType": "pool_type",
+}
+
+# bumped when the tables change, so stores built by older code are rebuilt
+LAYOUT_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE pools (
+    pool_address    TEXT PRIMARY KEY,
+    pool_name       TEXT,
+    token0_symbol   TEXT,
+    token1_symbol   TEXT,
+    fee_tier        INTEGER,
+    fee_percentage  REAL,
+    pool_type       TEXT,
+    first_date      TEXT NOT NULL,
+    last_date       TEXT NOT NULL,
+    complete        INTEGER NOT NULL    -- has an entry on every date of the dataset
+);
+CREATE TABLE daily_metrics (
+    pool_address        TEXT NOT NULL,
+    date                TEXT NOT NULL,
+    tx_count            INTEGER,
+    unique_users        INTEGER,
+    tx_count_cumulative INTEGER,
+    day_number          INTEGER,
+    user_sketch         TEXT,               -- base64 HyperLogLog of the day's users (user_sketch.py)
+    seq                 INTEGER NOT NULL,   -- row position in the CSV
+    PRIMARY KEY (pool_address, date)    -- idx_daily_metrics_pool_date
+) WITHOUT ROWID;
+CREATE TABLE dates (
+    date    TEXT PRIMARY KEY,
+    pools   INTEGER NOT NULL
+);
+CREATE TABLE store_meta (
+    key     TEXT PRIMARY KEY,
+    value   TEXT
+);
+"""
+
+INDEXES = """
+CREATE INDEX idx_daily_metrics_date ON daily_metrics(date);
+CREATE INDEX idx_pools_type ON pools(pool_type);
+CREATE INDEX idx_pools_fee ON pools(fee_tier);
+CREATE INDEX idx_pools_complete ON pools(complete);
+ANALYZE;
+"""
+
+
+class PoolStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._synced = None
+
+    def _connect(self):
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+
+    def _query(self, sql, params=()) -> pd.DataFrame:
+        # sqlite3's own context manager only ends the transaction, it never closes
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def _scalar(self, sql, params=()):
+        conn = self._connect()
+        try:
+            row = conn.execute(sql, params).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def source_stamp(self):
+        """(mtime_ns, size) of the CSV the store was built from, None if never built or built with an older layout."""
+        if not self.path.exists():
+            return None
+        if self._scalar("SELECT value FROM store_meta WHERE key = 'layout'") != str(LAYOUT_VERSION):
+            return None
+        value = self._scalar("SELECT value FROM store_meta WHERE key = 'source_stamp'")
+        return tuple(int(v) for v in value.split(",")) if value else None
+
+    def sync(self, csv_path) -> bool:
+        """Rebuild from csv_path if it changed since the last build; returns whether it rebuilt."""
+        stat = os.stat(csv_path)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp == self._synced:
+            return False
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + ".lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # another process may have rebuilt it while we waited
+                rebuilt = self.source_stamp() != stamp
+                if rebuilt:
+                    self._build(csv_path, stamp)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        self._synced = stamp
+        return rebuilt
+
+    def _build(self, csv_path, stamp):
+        wanted = set(METRIC_COLUMNS) | set(POOL_COLUMNS)
+        df = pd.read_csv(csv_path, usecols=lambda c: c in wanted)
+        for column in wanted - set(df.columns):
+            df[column] = None
+        df = df.drop_duplicates(["poolAddress", "date"], keep="last")
+        df["seq"] = range(len(df))
+
+        n_dates = df["date"].nunique()
+        latest = df.sort_values("date", kind="stable").drop_duplicates("poolAddress", keep="last")
+        span = df.groupby("poolAddress")["date"].agg(["min", "max", "size"])
+        pools = latest[["poolAddress", *POOL_COLUMNS]].rename(columns={"poolAddress": "pool_address", **POOL_COLUMNS})
+        pools = pools.merge(span, left_on="pool_address", right_index=True)
+        pools = pools.rename(columns={"min": "first_date", "max": "last_date"})
+        pools["complete"] = (pools.pop("size") == n_dates).astype(int)
+
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.unlink(missing_ok=True)
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(SCHEMA)
+            with conn:
+                insert(conn, "pools", pools)
+                insert(conn, "daily_metrics", df[[*METRIC_COLUMNS, "seq"]].rename(columns=METRIC_COLUMNS))
+                insert(conn, "dates", df.groupby("date").size().rename("pools").reset_index())
+                conn.execute("INSERT INTO store_meta VALUES ('source_stamp', ?)", (f"{stamp[0]},{stamp[1]}",))
+                conn.execute("INSERT INTO store_meta VALUES ('layout', ?)", (str(LAYOUT_VERSION),))
+            conn.executescript(INDEXES)
+        finally:
+            conn.close()
+        os.replace(tmp_path, self.path)
+
+    def latest_date(self):
+        return self._scalar("SELECT MAX(date) FROM dates")
+
+    def frame(self, start=None, end=None, pools=None, complete=False, columns=None) -> pd.DataFrame:
+        """Dataset rows between start and end (inclusive ISO dates), in the CSV's layout and order."""
+        where, params = [], []
+        if start is not None:
+            where.append("m.date >= ?")
+            params.append(start)
+        if end is not None:
+            where.append("m.date <= ?")
+            params.append(end)
+        if pools is not None:
+            pools = list(pools)
+            where.append(f"m.pool_address IN ({', '.join('?' * len(pools))})")
+            params.extend(pools)
+        if complete:
+            where.append("p.complete = 1")
+
+        selected = {**{f"m.{c}": d for d, c in METRIC_COLUMNS.items()}, **{f"p.{c}": d for d, c in POOL_COLUMNS.items()}}
+        if columns is not None:
+            selected = {expr: name for expr, name in selected.items() if name in columns}
+        sql = (
+            f"SELECT {', '.join(f'{expr} AS {name}' for expr, name in selected.items())} "
+            "FROM daily_metrics m JOIN pools p ON p.pool_address = m.pool_address"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + " ORDER BY m.seq"
+        )
+        return self._query(sql, params)
+
+    def history(self, pool_address, start=None, end=None) -> pd.DataFrame:
+        return self.frame(start, end, pools=[pool_address])
+
+    def latest(self) -> pd.DataFrame:
+        """Rows of the most recent date."""
+        latest_date = self.latest_date()
+        return self.frame(start=latest_date, end=latest_date)
+
+
+def insert(conn, table, df):
+    rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+    conn.executemany(f"INSERT INTO {table} ({', '.join(df.columns)}) VALUES ({', '.join('?' * len(df.columns))})", rows)
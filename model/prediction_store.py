@@ -0,0 +1,215 @@
+"""
+PREDICTION STORE
+================
+Append-only columnar history of model predictions, keyed by (model version,
+date, pool id), so past model calls can be evaluated against realized growth
+without rerunning the pipeline.
+
+    predictions/
+        models.json       version code -> model file, content hash, horizon, lag
+        rows.json         committed row count
+        version.i32  date.i32  contract.i32  prediction.f32
+
+Each column is a raw little-endian array that readers memory-map. Writers
+append under a lock and then publish the new row count. Readers only look at
+committed rows, so an interrupted append is never visible and is overwritten
+by the next one. Storing the same (version, date) twice is a no-op.
+
+    store = PredictionStore("predictions")
+    version = store.register("growth_model_1_7.pkl", forecast_horizon=1, max_lag=7)
+    store.append(version, pred_date, contract_ids, predictions)
+    store.append_dates(version, dates, contract_ids, predictions)      # a backfill: many dates, one write
+    df = store.read(versions=[version], start=..., end=...)
+    per_date, summary = evaluate(df, df_dataset, pool_ids, forecast_horizon=1, top_n=10)
+"""
+
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows: single writer only
+    fcntl = None
+
+COLUMNS = {
+    "version": np.dtype("<i4"),
+    "date": np.dtype("<i4"),
+    "contract": np.dtype("<i4"),
+    "prediction": np.dtype("<f4"),
+}
+SUFFIXES = {"<i4": "i32", "<f4": "f32"}
+
+
+def model_version_hash(model_path) -> str:
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+class PredictionStore:
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _path(self, column):
+        return self.root / f"{column}.{SUFFIXES[COLUMNS[column].str]}"
+
+    @contextmanager
+    def _lock(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.root / ".lock", "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_json(self, name, default):
+        try:
+            with open(self.root / name, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    def _write_json(self, name, data):
+        tmp_path = self.root / (name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, self.root / name)
+
+    def rows(self) -> int:
+        return self._read_json("rows.json", {"rows": 0})["rows"]
+
+    def versions(self) -> dict:
+        """{version code: {"model", "hash", "forecast_horizon", "max_lag"}}"""
+        return {int(code): meta for code, meta in self._read_json("models.json", {}).items()}
+
+    def register(self, model_path, forecast_horizon, max_lag) -> int:
+        """Version code for the model file's current contents, added on first sight."""
+        model_hash = model_version_hash(model_path)
+        with self._lock():
+            versions = self.versions()
+            for code, meta in versions.items():
+                if (meta["hash"], meta["forecast_horizon"], meta["max_lag"]) == (model_hash, forecast_horizon, max_lag):
+                    return code
+            code = max(versions, default=-1) + 1
+            versions[code] = {
+                "model": Path(model_path).name,
+                "hash": model_hash,
+                "forecast_horizon": forecast_horizon,
+                "max_lag": max_lag,
+            }
+            self._write_json("models.json", {str(c): m for c, m in versions.items()})
+        return code
+
+    def column(self, name, rows=None) -> np.ndarray:
+        rows = self.rows() if rows is None else rows
+        if rows == 0:
+            return np.empty(0, dtype=COLUMNS[name])
+        return np.memmap(self._path(name), dtype=COLUMNS[name], mode="r", shape=(rows,))
+
+    def append(self, version, date, contracts, predictions) -> int:
+        """Store one model call (every pool scored for one date); returns the rows written."""
+        return self.append_dates(version, np.full(len(contracts), date), contracts, predictions)
+
+    def append_dates(self, version, dates, contracts, predictions) -> int:
+        """Store the model's predictions for many dates at once (aligned rows); returns the rows written.
+
+        Dates already stored for the version are skipped, as in append().
+        """
+        dates = np.asarray(dates, dtype=COLUMNS["date"])
+        batch = {
+            "version": np.full(len(dates), version, dtype=COLUMNS["version"]),
+            "date": dates,
+            "contract": np.asarray(contracts, dtype=COLUMNS["contract"]),
+            "prediction": np.asarray(predictions, dtype=COLUMNS["prediction"]),
+        }
+        with self._lock():
+            rows = self.rows()
+            if rows:
+                stored = np.unique(self.column("date", rows)[self.column("version", rows) == version])
+                new = ~np.isin(dates, stored)
+                batch = {name: values[new] for name, values in batch.items()}
+            if len(batch["date"]) == 0:
+                return 0
+            for name, values in batch.items():
+                with open(self._path(name), "ab") as f:
+                    # drop anything past the committed rows (an interrupted append)
+                    f.truncate(rows * COLUMNS[name].itemsize)
+                    f.write(values.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._write_json("rows.json", {"rows": rows + len(batch["date"])})
+        return len(batch["date"])
+
+    def read(self, versions=None, start=None, end=None) -> pd.DataFrame:
+        """Stored rows for the given version codes and inclusive ordinal date range."""
+        rows = self.rows()
+        version, date = self.column("version", rows), self.column("date", rows)
+        mask = np.ones(rows, dtype=bool)
+        if versions is not None:
+            mask &= np.isin(version, list(versions))
+        if start is not None:
+            mask &= date >= start
+        if end is not None:
+            mask &= date <= end
+        idx = np.flatnonzero(mask)
+        return pd.DataFrame({name: np.asarray(self.column(name, rows)[idx]) for name in COLUMNS})
+
+
+def realized_growth(df_dataset, pool_ids, forecast_horizon) -> pd.DataFrame:
+    """Realized target (log tx growth over the horizon) per (contract, ordinal date), as in build_targets."""
+    df = pd.DataFrame({
+        "contract": pool_ids.lookup(df_dataset["poolAddress"]),
+        "date": pd.to_datetime(df_dataset["date"]).map(pd.Timestamp.toordinal).to_numpy(),
+        "tx_transform": np.log(df_dataset["tx_count"].to_numpy(dtype=np.float64) + 1),
+    })
+    df = df[df["contract"] >= 0].drop_duplicates(["contract", "date"], keep="last")
+    future = df.assign(date=df["date"] - forecast_horizon)
+    df = df.merge(future, on=["contract", "date"], suffixes=("", "_ahead"))
+    df["realized"] = df["tx_transform_ahead"] - df["tx_transform"]
+    return df[["contract", "date", "realized"]]
+
+
+def evaluate(df_pred, df_dataset, pool_ids, forecast_horizon, top_n=10):
+    """Realized-vs-predicted metrics per (version, date) and per version.
+
+    hit_rate is the share of the predicted top_n pools that are also in the
+    realized top_n. Dates whose horizon has not been observed yet are skipped.
+    """
+    df = df_pred.merge(realized_growth(df_dataset, pool_ids, forecast_horizon), on=["contract", "date"])
+    if df.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    groups = df.groupby(["version", "date"])
+    df["predicted_rank"] = groups["prediction"].rank(ascending=False, method="first")
+    df["realized_rank"] = groups["realized"].rank(ascending=False, method="first")
+    df["error"] = (df["prediction"] - df["realized"]).abs()
+    df["hit"] = (df["predicted_rank"] <= top_n) & (df["realized_rank"] <= top_n)
+
+    groups = df.groupby(["version", "date"])
+    per_date = pd.DataFrame({
+        "pools": groups.size(),
+        "mae": groups["error"].mean(),
+        "rank_corr": groups[["predicted_rank", "realized_rank"]].corr().xs("predicted_rank", level=2)["realized_rank"],
+        "hit_rate": groups["hit"].sum() / groups.size().clip(upper=top_n),
+    }).reset_index()
+
+    summary = per_date.groupby("version").agg(
+        dates=("date", "size"),
+        first_date=("date", "min"),
+        last_date=("date", "max"),
+        mae=("mae", "mean"),
+        rank_corr=("rank_corr", "mean"),
+        hit_rate=("hit_rate", "mean"),
+    ).reset_index()
+    return per_date, summary
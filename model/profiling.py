@@ -0,0 +1,155 @@
+"""
+PIPELINE PROFILING
+==================
+Opt-in per-stage wall time, CPU time, peak RSS and DataFrame memory for the
+model and data-miner CLIs (`--profile`), plus an optional cProfile dump of
+the whole run (`--profile_output run.prof`).
+
+    with profiling.stage("load") as s:
+        df = pd.read_csv(path)
+        s.frame(df)
+
+Stages are no-ops until enable() is called. Peak RSS is reset at the start
+of every stage where the kernel allows it (Linux /proc/self/clear_refs);
+elsewhere the column shows the process-wide peak so far.
+
+The .prof dump loads in pstats/snakeviz, and flameprof or
+`python -m flameprof run.prof > run.svg` renders it as a flame graph.
+"""
+
+import cProfile
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_enabled = False
+_profiler = None
+_output = None
+_stages = []
+_open = []  # peak RSS of stages currently running, for nesting
+
+
+class StageStats:
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.peak_rss = 0
+        self.frame_bytes = None
+
+    def frame(self, df):
+        """Record the in-memory size of the frame this stage produced."""
+        if _enabled and df is not None and hasattr(df, "memory_usage"):
+            self.frame_bytes = int(df.memory_usage(deep=True).sum())
+
+
+class _NullStage:
+    def frame(self, df):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss():
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def enable(output=None):
+    """Turn stage recording on; with output, also run cProfile and dump to that path."""
+    global _enabled, _profiler, _output
+    _enabled = True
+    _output = output
+    if output:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+@contextmanager
+def stage(name):
+    if not _enabled:
+        yield _NULL_STAGE
+        return
+
+    stats = StageStats(name, len(_open))
+    _stages.append(stats)
+    _reset_peak_rss()
+    _open.append(0)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield stats
+    finally:
+        stats.wall = time.perf_counter() - wall_start
+        stats.cpu = time.process_time() - cpu_start
+        # an inner stage resets the counter, so fold its peak back into ours
+        stats.peak_rss = max(_peak_rss(), _open.pop())
+        if _open:
+            _open[-1] = max(_open[-1], stats.peak_rss)
+
+
+def report():
+    """Print the per-stage summary table and write the cProfile dump, if any."""
+    global _profiler
+    if not _enabled:
+        return
+
+    if _profiler is not None:
+        _profiler.disable()
+        _profiler.dump_stats(_output)
+        _profiler = None
+
+    print("\n⏱️  Profile summary")
+    print(f"   {'stage':<20} {'wall s':>9} {'cpu s':>9} {'peak RSS MB':>12} {'frame MB':>10}")
+    print(f"   {'-' * 20} {'-' * 9} {'-' * 9} {'-' * 12} {'-' * 10}")
+    for s in _stages:
+        frame = f"{s.frame_bytes / 2**20:>10.1f}" if s.frame_bytes is not None else f"{'-':>10}"
+        label = "  " * s.depth + s.name
+        print(f"   {label:<20} {s.wall:>9.3f} {s.cpu:>9.3f} {s.peak_rss / 2**20:>12.1f} {frame}")
+    top = [s for s in _stages if s.depth == 0]
+    total_wall = sum(s.wall for s in top)
+    total_cpu = sum(s.cpu for s in top)
+    peak = max((s.peak_rss for s in top), default=0)
+    print(f"   {'total':<20} {total_wall:>9.3f} {total_cpu:>9.3f} {peak / 2**20:>12.1f}")
+
+    if _output:
+        print(f"\n💾 Saved cProfile stats: {os.path.abspath(_output)}")
+
+
+def add_arguments(parser):
+    """Register --profile and --profile_output on an argparse parser."""
+    parser.add_argument("--profile", action="store_true",
+                        help="print wall time, CPU time, peak RSS and DataFrame memory per stage")
+    parser.add_argument("--profile_output", default=None,
+                        help="also write a cProfile dump of the run here (implies --profile)")
+
+
+def configure(args):
+    """Enable profiling if the parsed arguments ask for it."""
+    if args.profile or args.profile_output:
+        enable(args.profile_output)
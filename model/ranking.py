@@ -0,0 +1,70 @@
+"""
+TOP-K RANKING
+=============
+Top-K selection over prediction scores without sorting every pool, shared by
+the model CLI and the API.
+
+A partition finds the k-th best score in O(n), and only the k survivors are
+sorted. Ties keep input order (the earlier row ranks higher), including at
+the cut-off, so results don't depend on the partition's internal ordering.
+NaN scores rank last.
+
+    order, ranks = top_k(preds, 10)
+    by_type = segment_top_k(preds, df['poolType'], 5)   # {segment: (order, ranks)}
+    order, ranks = merge_top_k(preds, [shard_a_order, shard_b_order], 10)
+
+merge_top_k combines the top_k of disjoint shards of the rows: the global top
+k is always among the shards' top k, and with the same tie rule (earlier row
+first) the merge returns exactly what top_k over all rows would.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def top_k(scores, k):
+    """Positions of the k highest scores, best first, and their ranks (1..k)."""
+    keys = np.asarray(scores, dtype=np.float64)
+    keys = np.where(np.isnan(keys), -np.inf, keys)
+    n = len(keys)
+    k = max(0, min(int(k), n))
+    if k == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    if k < n:
+        kth = np.partition(keys, n - k)[n - k]
+        above = np.flatnonzero(keys > kth)
+        # fill the remaining slots with the earliest rows tied at the cut-off
+        ties = np.flatnonzero(keys == kth)[:k - len(above)]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(n)
+
+    order = candidates[np.lexsort((candidates, -keys[candidates]))]
+    return order.astype(np.int64), np.arange(1, k + 1, dtype=np.int64)
+
+
+def segment_top_k(scores, segments, k):
+    """top_k within every segment (e.g. poolType or fee tier), from one grouping pass.
+
+    Returns {segment value: (positions, ranks)} ordered by segment value; rows
+    with a missing segment are skipped.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    codes, uniques = pd.factorize(np.asarray(segments), sort=True)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+
+    result = {}
+    for j, segment in enumerate(uniques):
+        rows = order[bounds[j]:bounds[j + 1]]
+        positions, ranks = top_k(scores[rows], k)
+        result[segment.item() if hasattr(segment, "item") else segment] = (rows[positions], ranks)
+    return result
+
+
+def merge_top_k(scores, candidates, k):
+    """top_k over the union of per-shard top_k positions (into scores); equals top_k(scores, k)."""
+    candidates = np.unique(np.concatenate([np.asarray(c, dtype=np.int64) for c in candidates] or [np.empty(0, np.int64)]))
+    positions, ranks = top_k(np.asarray(scores, dtype=np.float64)[candidates], k)
+    return candidates[positions], ranks
@@ -0,0 +1,259 @@
+"""
+UNIQUE USER SKETCHES
+====================
+HyperLogLog sketches of the distinct users of a pool-day, so distinct users
+over any window (7 days, 30 days, a custom range) come from merging daily
+sketches instead of rescanning raw transactions.
+
+    keys, sketches = build(raw_df, ['poolAddress', 'date'], 'transactionHash')
+    df['user_sketch'] = encode(sketches)               # stored next to the daily metrics
+    estimate(merge(decode(df['user_sketch'])))         # distinct users over those rows
+    windowed(df['poolAddress'], df['date'], sketches, 7)
+    metrics_df = add_user_sketches(metrics_df, raw_df, [7, 30])   # all of the above
+
+A sketch is REGISTERS one-byte registers. Merging is the register-wise max, so
+merging daily sketches gives exactly the sketch of the combined users, no matter
+how the days are grouped. Estimates have a relative standard error of about
+1.04 / sqrt(REGISTERS) = 2.3% (within 4.6% for ~95% of windows), and are
+much tighter below a few hundred users.
+
+String user keys are hashed with pandas' fixed-key SipHash, and binary keys
+(rows of uint64 words, such as a transaction hash's 32 bytes) are folded and
+mixed, so sketches built in different runs or processes merge as long as they
+key users the same way. Encoded sketches are base64 of the zlib-compressed
+registers; days with few users compress to a few dozen bytes.
+
+build() keeps sketches sparse (SparseSketches: only the non-empty registers,
+at most one per user), and windowed() / encode() expand CHUNK_ROWS sketches at
+a time, so memory follows the transaction count rather than 2 KB per pool-day.
+"""
+
+import base64
+import zlib
+
+import numpy as np
+import pandas as pd
+
+PRECISION = 11
+REGISTERS = 1 << PRECISION
+RELATIVE_ERROR = 1.04 / np.sqrt(REGISTERS)
+
+# hash bits left after the register index; ranks run 0 (empty) .. _Q + 1
+_Q = 64 - PRECISION
+
+# sketches expanded to dense registers at once by windowed() / encode() (8 MB)
+CHUNK_ROWS = 4_096
+
+
+def hash_users(users) -> np.ndarray:
+    """64-bit hashes of user keys: strings (lowercased, so address case does not matter)
+    or a (users, words) array / frame of binary keys."""
+    if isinstance(users, pd.DataFrame) or np.ndim(users) == 2:
+        words = np.asarray(users, dtype=np.uint64)
+        return pd.util.hash_array(np.bitwise_xor.reduce(words, axis=1))
+    values = pd.Series(users, copy=False).astype(str).str.lower().to_numpy(dtype=object)
+    return pd.util.hash_array(values)
+
+
+class SparseSketches:
+    """n sketches kept as their non-empty registers.
+
+    cells holds row * REGISTERS + register in ascending order and ranks the
+    matching register values, so a sketch of u users takes at most u entries.
+    """
+
+    def __init__(self, n, cells, ranks):
+        self.n = n
+        self.cells = cells
+        self.ranks = ranks
+
+    def __len__(self):
+        return self.n
+
+    def take(self, positions) -> "SparseSketches":
+        """Sketches at the given rows, in that order; -1 gives an empty sketch."""
+        positions = np.asarray(positions, dtype=np.int64)
+        starts = np.searchsorted(self.cells, positions * REGISTERS)
+        lengths = np.where(positions >= 0, np.searchsorted(self.cells, (positions + 1) * REGISTERS) - starts, 0)
+        total = int(lengths.sum())
+        # entry j of new row i comes from starts[i] + j
+        offsets = np.cumsum(lengths) - lengths
+        source = np.repeat(starts - offsets, lengths) + np.arange(total)
+        registers = self.cells[source] % REGISTERS
+        cells = np.repeat(np.arange(len(positions), dtype=np.int64) * REGISTERS, lengths) + registers
+        return SparseSketches(len(positions), cells, self.ranks[source])
+
+    def dense(self, start=0, stop=None) -> np.ndarray:
+        """(stop - start, REGISTERS) registers of rows start..stop."""
+        stop = self.n if stop is None else stop
+        lo, hi = np.searchsorted(self.cells, [start * REGISTERS, stop * REGISTERS])
+        registers = empty(stop - start)
+        registers.ravel()[self.cells[lo:hi] - start * REGISTERS] = self.ranks[lo:hi]
+        return registers
+
+
+def build(df, group_columns, user_column):
+    """(keys, sketches): one sketch per distinct group_columns value of df, users taken from user_column.
+
+    user_column may be a list of columns holding binary user keys (see hash_users).
+    """
+    groups = df.groupby(group_columns, sort=False, observed=True)
+    codes = groups.ngroup().to_numpy()
+    keys = groups.size().index.to_frame(index=False).astype(object)
+    hashes = hash_users(df[user_column])
+
+    index = (hashes >> np.uint64(64 - PRECISION)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - PRECISION)) - 1)
+    # rank = leading zeros of the remaining 53 bits + 1; frexp's exponent is the bit length (exact below 2**53)
+    _, bit_length = np.frexp(rest.astype(np.float64))
+    rank = (64 - PRECISION - bit_length + 1).astype(np.uint8)
+
+    # a register holds the highest rank hashed to it: sort by cell then rank, keep each cell's last entry
+    cells = codes.astype(np.int64) * REGISTERS + index
+    order = np.lexsort((rank, cells))
+    cells, rank = cells[order], rank[order]
+    last = np.r_[cells[1:] != cells[:-1], True] if len(cells) else np.empty(0, dtype=bool)
+    return keys, SparseSketches(len(keys), cells[last], rank[last])
+
+
+def empty(n=1) -> np.ndarray:
+    return np.zeros((n, REGISTERS), dtype=np.uint8)
+
+
+def merge(registers) -> np.ndarray:
+    """One sketch of all rows of a (n, REGISTERS) array."""
+    return np.asarray(registers).max(axis=0, initial=0)
+
+
+def _sigma(x):
+    """x + sum_k x^(2^k) 2^(k-1), infinite at x = 1 (Ertl 2017)."""
+    x = np.asarray(x, dtype=np.float64)
+    result, power, weight = x.copy(), x.copy(), 1.0
+    for _ in range(64):
+        power = power * power
+        result += power * weight
+        weight += weight
+    return np.where(x >= 1, np.inf, result)
+
+
+def _tau(x):
+    """(1 - x - sum_k (1 - x^(2^-k))^2 2^-k) / 3 (Ertl 2017)."""
+    x = np.asarray(x, dtype=np.float64)
+    result, root, weight = 1 - x, x.copy(), 1.0
+    for _ in range(64):
+        root = np.sqrt(root)
+        weight *= 0.5
+        result -= (1 - root) ** 2 * weight
+    return np.where((x <= 0) | (x >= 1), 0.0, result / 3)
+
+
+def estimate(registers) -> np.ndarray:
+    """Distinct-user estimate per sketch (a single sketch gives a scalar).
+
+    Uses Ertl's improved estimator, which needs no bias tables or switch to
+    linear counting and stays unbiased from a handful of users upward.
+    """
+    registers = np.asarray(registers)
+    rows = registers.reshape(-1, REGISTERS)
+    offsets = np.arange(len(rows))[:, None] * (_Q + 2)
+    counts = np.bincount((rows + offsets).ravel(), minlength=len(rows) * (_Q + 2)).reshape(len(rows), _Q + 2)
+
+    z = REGISTERS * _tau(1 - counts[:, _Q + 1] / REGISTERS)
+    for k in range(_Q, 0, -1):
+        z = 0.5 * (z + counts[:, k])
+    z = z + REGISTERS * _sigma(counts[:, 0] / REGISTERS)
+    result = REGISTERS ** 2 / (2 * np.log(2)) / z
+    return result.reshape(registers.shape[:-1])
+
+
+def _blocks(registers, start=0, stop=None, chunk_rows=CHUNK_ROWS):
+    """Dense (rows, REGISTERS) blocks of rows start..stop of dense or sparse sketches."""
+    stop = len(registers) if stop is None else stop
+    for lo in range(start, stop, chunk_rows):
+        hi = min(lo + chunk_rows, stop)
+        yield registers.dense(lo, hi) if isinstance(registers, SparseSketches) else np.asarray(registers[lo:hi])
+
+
+def encode(registers) -> list:
+    """Base64 zlib-compressed registers of dense or sparse sketches."""
+    return [base64.b64encode(zlib.compress(row.tobytes())).decode('ascii')
+            for block in _blocks(registers) for row in block]
+
+
+def decode(sketches) -> np.ndarray:
+    """(n, REGISTERS) registers of encoded sketches; missing values decode to empty sketches."""
+    sketches = list(sketches)
+    registers = empty(len(sketches))
+    for i, sketch in enumerate(sketches):
+        if not isinstance(sketch, (str, bytes)) or not sketch:
+            continue
+        raw = zlib.decompress(base64.b64decode(sketch) if isinstance(sketch, str) else sketch)
+        if len(raw) != REGISTERS:
+            raise ValueError(f"sketch has {len(raw)} registers, expected {REGISTERS}")
+        registers[i] = np.frombuffer(raw, dtype=np.uint8)
+    return registers
+
+
+def to_bytes(sketches) -> list:
+    """Encoded sketches as the compressed bytes stored in the database (None stays None)."""
+    return [base64.b64decode(s) if isinstance(s, str) and s else None for s in sketches]
+
+
+def windowed(pools, dates, registers, days, chunk_rows=CHUNK_ROWS) -> np.ndarray:
+    """Distinct users over the `days` calendar days ending at each row, per pool.
+
+    pools/dates/registers are aligned rows with at most one row per (pool, date);
+    registers are dense or sparse sketches. Missing days count as days without users.
+    """
+    group = pd.factorize(pd.Series(pools, copy=False))[0]
+    day = pd.to_datetime(pd.Series(dates, copy=False)).map(pd.Timestamp.toordinal).to_numpy()
+    order = np.lexsort((day, group))
+    group, day = group[order], day[order]
+    if isinstance(registers, SparseSketches):
+        registers = registers.take(order)
+    else:
+        registers = np.asarray(registers)[order]
+
+    # a window of `days` calendar days holds at most `days` rows of a pool, so each
+    # chunk is merged from its own rows plus the days - 1 rows before it
+    halo = days - 1
+    result = np.empty(len(order))
+    for start in range(0, len(order), chunk_rows):
+        stop = min(start + chunk_rows, len(order))
+        lo = max(0, start - halo)
+        base = next(_blocks(registers, lo, stop, chunk_rows + halo))
+        merged = base.copy()
+        g, d = group[lo:stop], day[lo:stop]
+        for shift in range(1, min(days, len(base))):
+            inside = (g[shift:] == g[:-shift]) & (d[shift:] - d[:-shift] < days)
+            rows = np.flatnonzero(inside) + shift
+            merged[rows] = np.maximum(merged[rows], base[rows - shift])
+        result[order[start:stop]] = estimate(merged[start - lo:])
+    return result
+
+
+def add_user_sketches(metrics_df, df, windows, user_columns='transactionHash'):
+    """Attach each pool-day's unique-user sketch and the windowed distinct users merged from them.
+
+    metrics_df has one row per (poolAddress, date) with ISO dates; df holds the raw
+    transactions, its date either parseable or a categorical of ISO dates, and its users
+    in user_columns. Adds user_sketch and unique_users_{days}d for each of `windows`.
+    """
+    dates = df['date']
+    if not isinstance(dates.dtype, pd.CategoricalDtype):
+        dates = pd.to_datetime(dates).dt.strftime('%Y-%m-%d')
+    # same user key as unique_users: the raw files carry no sender address
+    users = [user_columns] if isinstance(user_columns, str) else list(user_columns)
+    raw = pd.DataFrame({'poolAddress': df['poolAddress'].array, 'date': dates.array,
+                        **{c: df[c].to_numpy() for c in users}})
+    keys, sketches = build(raw, ['poolAddress', 'date'], user_columns)
+
+    # days without transactions get an empty sketch
+    position = pd.MultiIndex.from_frame(keys).get_indexer(pd.MultiIndex.from_frame(metrics_df[['poolAddress', 'date']]))
+    sketches = sketches.take(position)
+
+    metrics_df['user_sketch'] = encode(sketches)
+    for days in windows:
+        estimates = windowed(metrics_df['poolAddress'], metrics_df['date'], sketches, days)
+        metrics_df[f'unique_users_{days}d'] = estimates.round().astype(int)
+    return metrics_df